@@ -0,0 +1,190 @@
+"""
+Fuzz check and micro-benchmark of the built-in SNMPv2c codec
+(snmpservice.polling.codec) against pysnmp.
+
+Fuzzing, with random request-ids, communities, OIDs and values of every
+SNMPv2 type:
+- requests encoded by the codec must be byte-for-byte identical to
+  pysnmp's encoding of the same GET, GETNEXT and GETBULK requests,
+- responses encoded by pysnmp must decode to the same request-id, error
+  status, error index and OIDs, and to the values unpack_varbind gives
+  for pysnmp's own decoding,
+- truncated and corrupted responses must decode, or fail with MalformedPDU.
+Exits with status 1 if any case fails.
+
+Then times encoding a GETBULK request and decoding its response, by the
+codec and by pysnmp.
+
+Usage:
+python3 -m benchmarks.codec [--cases N] [--seed N] [--rows N] [--columns N]
+"""
+from snmpservice.polling import codec
+from snmpservice.polling.objects.base import unpack_varbind
+from snmpservice.utils.exceptions import MalformedPDU
+
+from pysnmp.proto import api, rfc1902
+from pyasn1.codec.ber import encoder, decoder
+from argparse import ArgumentParser
+from random import Random
+from timeit import repeat
+import sys
+
+PROTOCOL = api.protoModules[api.protoVersion2c]
+
+REQUESTS = {
+    codec.GET_REQUEST: PROTOCOL.GetRequestPDU,
+    codec.GET_NEXT_REQUEST: PROTOCOL.GetNextRequestPDU,
+    codec.GET_BULK_REQUEST: PROTOCOL.GetBulkRequestPDU,
+}
+
+def random_oid(random: Random) -> tuple:
+    first = random.randint(0, 2)
+    second = random.randint(0, 39) if first < 2 else random.choice((random.randint(0, 127), random.randint(0, 2**32 - 1)))
+    return (first, second, *(
+        random.choice((random.randint(0, 127), random.randint(0, 2**14), random.randint(0, 2**32 - 1)))
+        for _ in range(random.randint(0, 20))
+    ))
+
+def random_bytes(random: Random, longest: int) -> bytes:
+    return bytes(random.getrandbits(8) for _ in range(random.choice((0, random.randint(0, 16), random.randint(0, longest)))))
+
+def random_value(random: Random):
+    kind = random.randrange(13)
+    return (
+        lambda: rfc1902.Integer32(random.randint(-2**31, 2**31 - 1)),
+        lambda: rfc1902.Counter32(random.randint(0, 2**32 - 1)),
+        lambda: rfc1902.Gauge32(random.randint(0, 2**32 - 1)),
+        lambda: rfc1902.TimeTicks(random.randint(0, 2**32 - 1)),
+        lambda: rfc1902.Counter64(random.choice((random.randint(0, 255), random.randint(0, 2**64 - 1)))),
+        lambda: rfc1902.OctetString(random_bytes(random, 300)),
+        lambda: rfc1902.OctetString(random_bytes(random, 300)),
+        lambda: rfc1902.IpAddress(".".join(str(random.randint(0, 255)) for _ in range(4))),
+        lambda: rfc1902.ObjectName(random_oid(random)),
+        lambda: rfc1902.Opaque(random_bytes(random, 64)),
+        lambda: PROTOCOL.Null(""),
+        lambda: random.choice((PROTOCOL.NoSuchObject(""), PROTOCOL.NoSuchInstance(""))),
+        lambda: PROTOCOL.EndOfMibView(""),
+    )[kind]()
+
+def pysnmp_message(pdu, community: bytes) -> bytes:
+    message = PROTOCOL.Message()
+    PROTOCOL.apiMessage.setDefaults(message)
+    PROTOCOL.apiMessage.setCommunity(message, community)
+    PROTOCOL.apiMessage.setPDU(message, pdu)
+    return encoder.encode(message)
+
+def pysnmp_request(pdu_type: int, request_id: int, community: bytes, oids: list,
+                   non_repeaters: int = 0, max_repetitions: int = 0) -> bytes:
+    pdu = REQUESTS[pdu_type]()
+    if pdu_type == codec.GET_BULK_REQUEST:
+        PROTOCOL.apiBulkPDU.setDefaults(pdu)
+        PROTOCOL.apiBulkPDU.setNonRepeaters(pdu, non_repeaters)
+        PROTOCOL.apiBulkPDU.setMaxRepetitions(pdu, max_repetitions)
+    else:
+        PROTOCOL.apiPDU.setDefaults(pdu)
+    PROTOCOL.apiPDU.setRequestID(pdu, request_id)
+    PROTOCOL.apiPDU.setVarBinds(pdu, [(oid, PROTOCOL.Null("")) for oid in oids])
+    return pysnmp_message(pdu, community)
+
+def pysnmp_response(request_id: int, community: bytes, error_status: int, error_index: int, varbinds: list) -> bytes:
+    pdu = PROTOCOL.ResponsePDU()
+    PROTOCOL.apiPDU.setDefaults(pdu)
+    PROTOCOL.apiPDU.setRequestID(pdu, request_id)
+    PROTOCOL.apiPDU.setErrorStatus(pdu, error_status)
+    PROTOCOL.apiPDU.setErrorIndex(pdu, error_index)
+    PROTOCOL.apiPDU.setVarBinds(pdu, varbinds)
+    return pysnmp_message(pdu, community)
+
+def pysnmp_decode(data: bytes) -> tuple:
+    message, _ = decoder.decode(data, asn1Spec=PROTOCOL.Message())
+    pdu = PROTOCOL.apiMessage.getPDU(message)
+    return (
+        int(PROTOCOL.apiPDU.getRequestID(pdu)), int(PROTOCOL.apiPDU.getErrorStatus(pdu)),
+        int(PROTOCOL.apiPDU.getErrorIndex(pdu)), PROTOCOL.apiPDU.getVarBinds(pdu)
+    )
+
+def fuzz_request(random: Random) -> str | None:
+    # Returns a description of the failure, if any.
+    pdu_type = random.choice(list(REQUESTS))
+    request_id = random.randint(-2**31, 2**31 - 1)
+    community = random_bytes(random, 300)
+    oids = [random_oid(random) for _ in range(random.choice((0, 1, random.randint(0, 100))))]
+    non_repeaters, max_repetitions = random.randint(0, 2**31 - 1), random.choice((random.randint(0, 100), random.randint(0, 2**31 - 1)))
+    if pdu_type != codec.GET_BULK_REQUEST:
+        non_repeaters = max_repetitions = 0
+    ours = codec.encode_request(pdu_type, request_id, community, oids, non_repeaters, max_repetitions)
+    theirs = pysnmp_request(pdu_type, request_id, community, oids, non_repeaters, max_repetitions)
+    if ours != theirs:
+        return f"request 0x{pdu_type:02x} id {request_id}, {len(oids)} OIDs: {ours.hex()} != {theirs.hex()}"
+    return None
+
+def fuzz_response(random: Random) -> str | None:
+    # Returns a description of the failure, if any.
+    request_id = random.randint(-2**31, 2**31 - 1)
+    varbinds = [(random_oid(random), random_value(random)) for _ in range(random.choice((0, 1, random.randint(0, 100))))]
+    # pysnmp rejects an error-index past the last varbind.
+    error_status, error_index = random.choice((0, random.randint(0, 18))), random.randint(0, len(varbinds))
+    data = pysnmp_response(request_id, random_bytes(random, 300), error_status, error_index, varbinds)
+
+    ours = codec.decode_response(data)
+    their_id, their_status, their_index, their_varbinds = pysnmp_decode(data)
+    if ours[:3] != (their_id, their_status, their_index):
+        return f"response header {ours[:3]} != {(their_id, their_status, their_index)}"
+    if len(ours[3]) != len(their_varbinds):
+        return f"response has {len(ours[3])} varbinds, pysnmp decoded {len(their_varbinds)}"
+    for (oid, value), (name, their_value) in zip(ours[3], their_varbinds):
+        if oid != tuple(name):
+            return f"OID {oid} != {tuple(name)}"
+        if unpack_varbind((oid, value)) != unpack_varbind((name, their_value)):
+            return f"{type(their_value).__name__} at {name}: {value!r} != {unpack_varbind((name, their_value))[1]!r}"
+
+    # Corrupt the datagram: it must decode or be rejected as malformed.
+    corrupted = bytearray(data[:random.randint(0, len(data))] if random.random() < 0.5 else data)
+    for _ in range(random.randint(0, 3)):
+        if corrupted:
+            corrupted[random.randrange(len(corrupted))] = random.getrandbits(8)
+    try:
+        codec.decode_response(corrupted)
+    except MalformedPDU:
+        pass
+    except Exception as e:
+        return f"corrupted response raised {type(e).__name__}: {e}"
+    return None
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000, help="Random requests, and responses, to check.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=50, help="GETBULK max-repetitions timed.")
+    parser.add_argument("--columns", type=int, default=7, help="Columns in the timed GETBULK.")
+    args = parser.parse_args()
+
+    random = Random(args.seed)
+    failures = [failure for _ in range(args.cases) for failure in (fuzz_request(random), fuzz_response(random)) if failure]
+    print(f"Fuzzed         : {args.cases} requests and {args.cases} responses (seed {args.seed}), {len(failures)} failed")
+    for failure in failures[:10]:
+        print(f"  {failure}")
+
+    # A GETBULK over ifTable/ifXTable-like columns, and its response.
+    columns = [(1, 3, 6, 1, 2, 1, 31, 1, 1, 1, column) for column in range(1, args.columns + 1)]
+    varbinds = [
+        (rfc1902.ObjectName((*column, row)), rfc1902.Counter64(row * 10**9) if index % 2 else rfc1902.OctetString(f"xe-{row}/0/0"))
+        for row in range(1, args.rows + 1) for index, column in enumerate(columns)
+    ]
+    response = pysnmp_response(1234, b"public", 0, 0, varbinds)
+    timings = dict(
+        EncodeCodec=lambda: codec.encode_request(codec.GET_BULK_REQUEST, 1234, "public", columns, 0, args.rows),
+        EncodePysnmp=lambda: pysnmp_request(codec.GET_BULK_REQUEST, 1234, b"public", columns, 0, args.rows),
+        DecodeCodec=lambda: codec.decode_response(response),
+        DecodePysnmp=lambda: pysnmp_decode(response),
+    )
+    results = {name: min(repeat(function, number=10, repeat=5)) / 10 for name, function in timings.items()}
+    print(f"GETBULK        : {len(columns)} columns x {args.rows} rows, {len(response)} byte response")
+    for operation in ("Encode", "Decode"):
+        ours, theirs = results[f"{operation}Codec"], results[f"{operation}Pysnmp"]
+        print(f"{operation:<15}: codec {ours * 10**6:9.1f} us, pysnmp {theirs * 10**6:9.1f} us ({theirs / ours:.1f}x)")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark comparing per-poll CPU time when every SNMP command builds a
+fresh SnmpEngine (the previous behaviour) against borrowing engines from
+snmpservice.polling.engine.SnmpEnginePool.
+
+Each "poll" issues one SNMP GET per DefaultPollStrategy.POLL_OBJECTS entry
+at a local UDP port with nothing listening, using a very short timeout
+and no retries, so the measurement is dominated by the client-side cost
+of engine setup and command dispatch rather than by any agent.
+
+Usage:
+python3 -m benchmarks.engine_pool [--polls N] [--port PORT]
+"""
+from snmpservice.polling.engine import SnmpEnginePool
+from snmpservice.polling.strategies.default import DefaultPollStrategy
+
+from pysnmp.hlapi import (
+    SnmpEngine, CommunityData, UdpTransportTarget, ContextData,
+    ObjectIdentity, ObjectType, getCmd
+)
+from argparse import ArgumentParser
+from time import process_time
+
+def run_command(engine: SnmpEngine, target: UdpTransportTarget, community: CommunityData):
+    # Drain the command generator. Errors (timeouts) are expected and ignored.
+    for _ in getCmd(engine, community, target, ContextData(), ObjectType(ObjectIdentity("1.3.6.1.2.1.1.5.0"))):
+        pass
+
+def fresh_engine_poll(target, community, commands: int):
+    for _ in range(commands):
+        run_command(SnmpEngine(), target, community)
+
+def pooled_engine_poll(pool: SnmpEnginePool, target, community, commands: int):
+    for _ in range(commands):
+        with pool.borrow() as engine:
+            run_command(engine, target, community)
+
+def measure(func, polls: int, *args) -> float:
+    """Returns mean CPU seconds per call of func(*args) over 'polls' calls."""
+    start = process_time()
+    for _ in range(polls):
+        func(*args)
+    return (process_time() - start) / polls
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--port", type=int, default=16161)
+    args = parser.parse_args()
+
+    commands = len(DefaultPollStrategy.POLL_OBJECTS)
+    target = UdpTransportTarget(("127.0.0.1", args.port), timeout=0.01, retries=0)
+    community = CommunityData("public")
+    pool = SnmpEnginePool(size=1)
+
+    fresh = measure(fresh_engine_poll, args.polls, target, community, commands)
+    pooled = measure(pooled_engine_poll, args.polls, pool, target, community, commands)
+    pool.close()
+
+    print(f"Commands per poll : {commands}")
+    print(f"Fresh engines     : {fresh * 1000:8.2f} ms CPU/poll")
+    print(f"Pooled engines    : {pooled * 1000:8.2f} ms CPU/poll")
+    print(f"Speedup           : {fresh / pooled:8.2f}x")
+
+if __name__ == "__main__":
+    main()
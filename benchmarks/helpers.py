@@ -0,0 +1,8 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+def percentile(values: list, fraction: float) -> float:
+    """Returns the value at fraction (0-1) of the sorted values, by nearest rank."""
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))] if values else 0.0
@@ -0,0 +1,148 @@
+"""
+Benchmark of poll throughput and latency against a local simulated SNMP
+agent (benchmarks.snmp_agent), so polls can be measured without network kit.
+
+Polls are spread round-robin over the simulated devices, with up to
+--concurrency in flight, through one of:
+- poller : snmpservice.polling.poller.poll, on a thread pool.
+- async  : snmpservice.polling.poller.poll_async, on one event loop.
+- http   : the /poll/{ip} endpoint, in-process over ASGI (requires httpx),
+           with max_age=0 so results are never served from cache. Requests
+           for a device already being polled still share its poll
+           (X-Cache: COALESCED): they are counted, and left out of the
+           results, which only cover requests that polled the device.
+           Keep --concurrency at most --devices to poll on every request.
+
+Every device is polled --warmup times first, unmeasured, so differential
+polling (snmp_poll_differential) is measured in its steady state. Pass
+--full to re-walk every column on every poll instead, and --no-pushdown
+to walk interface columns for every interface rather than fetching them
+for data interfaces only (snmp_poll_pushdown). --transport selects the
+SNMP transport (snmp_poll_transport): pysnmp's engine, or the built-in
+codec and multiplexed UDP client.
+
+Reports polls/s, p50/p99 latency, PDUs (requests the agent received) per
+poll, and CPU seconds per poll spent by this process (the agent runs in
+its own).
+
+Usage:
+python3 -m benchmarks.poll [--mode poller|async|http] [--profile NAME | --walk FILE] [--devices N]
+                           [--polls N] [--concurrency N] [--loss P] [--delay S] [--full] [--no-pushdown]
+                           [--transport pysnmp|native]
+"""
+from benchmarks.helpers import percentile
+from benchmarks.snmp_agent import SimulatedAgent, add_agent_arguments, load_table
+from snmpservice.polling.poller import poll, poll_async
+from snmpservice.utils.exceptions import DeviceUnreachable, UnexpectedSNMPPollError
+from snmpservice.settings import settings
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from time import perf_counter, process_time
+import asyncio
+import os
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+def run_poller(targets: list, community: str, concurrency: int) -> list:
+    # Returns (latency, ok, coalesced) per target, polled by poller.poll on a thread pool.
+    def _poll(port: int):
+        start = perf_counter()
+        try:
+            poll("127.0.0.1", port, "default", community)
+        except (DeviceUnreachable, UnexpectedSNMPPollError):
+            return perf_counter() - start, False, False
+        return perf_counter() - start, True, False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(_poll, targets))
+
+async def run_async(targets: list, community: str, concurrency: int) -> list:
+    # Returns (latency, ok, coalesced) per target, polled by poller.poll_async.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _poll(port: int):
+        async with semaphore:
+            start = perf_counter()
+            try:
+                await poll_async("127.0.0.1", port, "default", community)
+            except (DeviceUnreachable, UnexpectedSNMPPollError):
+                return perf_counter() - start, False, False
+            return perf_counter() - start, True, False
+
+    return await asyncio.gather(*(_poll(port) for port in targets))
+
+async def run_http(targets: list, community: str, concurrency: int) -> list:
+    # Returns (latency, ok, coalesced) per target, polled through the /poll/{ip} endpoint.
+    # Coalesced requests shared the poll of a concurrent request for the same device.
+    from snmpservice.main import app
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _poll(client, port: int):
+        async with semaphore:
+            start = perf_counter()
+            response = await client.get(f"/poll/127.0.0.1", params=dict(port=port, community=community, max_age=0))
+            return perf_counter() - start, response.status_code == 200, response.headers.get("X-Cache") == "COALESCED"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://snmp-service", timeout=None) as client:
+        return await asyncio.gather(*(_poll(client, port) for port in targets))
+
+def run(mode: str, targets: list, community: str, concurrency: int) -> list:
+    if mode == "poller":
+        return run_poller(targets, community, concurrency)
+    return asyncio.run((run_async if mode == "async" else run_http)(targets, community, concurrency))
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_agent_arguments(parser)
+    parser.add_argument("--mode", choices=("poller", "async", "http"), default="poller")
+    parser.add_argument("--polls", type=int, default=200, help="Measured polls, spread over the devices.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Polls in flight at once.")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured polls of each device first.")
+    parser.add_argument("--full", action="store_true", help="Disable differential polling.")
+    parser.add_argument("--no-pushdown", action="store_true", help="Disable data interface filter pushdown.")
+    parser.add_argument("--transport", choices=("pysnmp", "native"), default=settings.snmp_poll_transport)
+    args = parser.parse_args()
+    if args.mode == "http" and httpx is None:
+        raise SystemExit("--mode http requires httpx: pip3 install httpx")
+    settings.snmp_poll_differential = not args.full
+    settings.snmp_poll_pushdown = not args.no_pushdown
+    settings.snmp_poll_transport = args.transport
+
+    table = load_table(args.profile, args.walk)
+    agent = SimulatedAgent(table, args.community, devices=args.devices, loss=args.loss, delay=args.delay)
+    ports = agent.start()
+    try:
+        # Poll objects print their varbinds. Keep them out of the report.
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            run(args.mode, ports * args.warmup, args.community, args.concurrency)
+            targets = [ports[index % len(ports)] for index in range(args.polls)]
+            pdus, cpu, start = agent.pdus(), process_time(), perf_counter()
+            results = run(args.mode, targets, args.community, args.concurrency)
+            elapsed, cpu, pdus = perf_counter() - start, process_time() - cpu, agent.pdus() - pdus
+    finally:
+        agent.stop()
+
+    coalesced = sum(shared for *_, shared in results)
+    results = [(latency, ok) for latency, ok, shared in results if not shared]
+    latencies = [latency for latency, _ in results]
+    failed = sum(not ok for _, ok in results)
+    print(f"Mode           : {args.mode} ({'full' if args.full else 'differential'} polling"
+          f"{', no pushdown' if args.no_pushdown else ''}, {args.transport} transport)")
+    print(f"Agent          : {args.walk or args.profile}, {len(table)} OIDs, {args.devices} devices, "
+          f"loss {args.loss:.0%}, delay {args.delay * 1000:.0f} ms")
+    print(f"Polls          : {len(results)} at concurrency {args.concurrency}, {failed} failed"
+          f"{f', {coalesced} more requests coalesced (excluded)' if coalesced else ''}")
+    print(f"Throughput     : {len(results) / elapsed:10.1f} polls/s")
+    print(f"Latency p50    : {percentile(latencies, 0.5) * 1000:10.1f} ms")
+    print(f"Latency p99    : {percentile(latencies, 0.99) * 1000:10.1f} ms")
+    print(f"PDUs per poll  : {pdus / len(results):10.1f}")
+    print(f"CPU per poll   : {cpu / len(results) * 1000:10.2f} ms")
+
+if __name__ == "__main__":
+    main()
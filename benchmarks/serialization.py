@@ -0,0 +1,139 @@
+"""
+Micro-benchmark of response serialization for /poll/{ip} and /traps/{ip}
+on synthetic payloads: a poll result with --interfaces interfaces, and a
+page of --traps stored traps.
+
+Each payload is serialized by:
+- fastapi : the previous path. The endpoint's result is validated
+            against its response model and jsonable_encoder'd by
+            FastAPI (fastapi.routing.serialize_response, with the
+            route's own response field), then rendered by JSONResponse.
+            For traps, this includes building the GetTrapsResponse.
+- fast    : snmpservice.utils.responses.fast_response, JSON (orjson if
+            installed, json otherwise).
+- msgpack : fast_response with Accept: application/msgpack, if msgpack
+            is installed.
+
+Reports time per response, speedup over fastapi and body size, and
+exits with status 1 if a fast JSON body decodes to anything other than
+the fastapi body.
+
+Usage:
+python3 -m benchmarks.serialization [--interfaces N] [--traps N] [--repeat N]
+"""
+from snmpservice.main import app
+from snmpservice.polling.strategies.default import (
+    DefaultStrategyModel, DefaultStrategyInterfaceModel, DefaultStrategyLldpModel
+)
+from snmpservice.utils.models.trapping import Trap, GetTrapsResponse
+from snmpservice.utils.responses import fast_response, msgpack, orjson, MSGPACK_MEDIA_TYPE
+from snmpservice.utils.helpers import timestamp
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+import asyncio
+import json
+import sys
+
+def poll_payload(interfaces: int, random: Random) -> dict:
+    # A poll result as DefaultPollStrategy assembles it.
+    model = DefaultStrategyModel(
+        Timestamp=timestamp(), IpAddress="10.0.0.1", HostName="core-1.example.net",
+        DeviceModel="Juniper MX960", SysUpTime=random.randint(0, 2**32 - 1),
+    )
+    model.Interfaces = [
+        DefaultStrategyInterfaceModel(
+            IfIndex=500 + index, IfAdminStatus="up", IfOperStatus=random.choice(("up", "down")),
+            IfName=f"xe-{index // 40}/{index // 4 % 10}/{index % 4}", IfDescr=f"Link to access-{index}",
+            IfSpeed=10**10, IfHCInOctets=random.randint(0, 2**64 - 1), IfHCOutOctets=random.randint(0, 2**64 - 1),
+            InBps=random.random() * 10**9, OutBps=random.random() * 10**9,
+            Neighbour=DefaultStrategyLldpModel(
+                LldpRemHost=f"access-{index}", LldpRemHostIpAddr=f"10.1.{index // 256}.{index % 256}",
+                LldpRemPort="ge-0/0/1"
+            ) if index % 3 else DefaultStrategyLldpModel()
+        )
+        for index in range(interfaces)
+    ]
+    return model.dict()
+
+def stored_traps(count: int, random: Random) -> list:
+    # Traps as TrapDatastore holds them.
+    return [
+        Trap(
+            TrapId=f"{sequence:032x}", IpAddress="10.0.0.1", Timestamp=timestamp(), Sequence=sequence,
+            TrapName=random.choice(("linkUp", "linkDown")),
+            TrapData={"ifIndex": 500 + sequence % 1000, "ifDescr": f"xe-0/0/{sequence % 48}", "ifAdminStatus": "up", "ifOperStatus": "down"},
+        )
+        for sequence in range(1, count + 1)
+    ]
+
+def response_field(path: str):
+    # The response field FastAPI validates the route's results against.
+    route = next(route for route in app.routes if isinstance(route, APIRoute) and route.path == path)
+    return route.secure_cloned_response_field
+
+def timed(function, repeat: int) -> float:
+    # Fastest of 'repeat' calls, in seconds.
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--interfaces", type=int, default=1000, help="Interfaces in the poll result.")
+    parser.add_argument("--traps", type=int, default=1000, help="Stored traps in the /traps/{ip} page.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per serializer. The fastest is reported.")
+    args = parser.parse_args()
+
+    random = Random(0)
+    loop = asyncio.new_event_loop()
+    poll_result, traps = poll_payload(args.interfaces, random), stored_traps(args.traps, random)
+    poll_field, traps_field = response_field("/poll/{ip}"), response_field("/traps/{ip}")
+
+    def _fastapi(field, content_factory):
+        async def _serialize():
+            return JSONResponse(await serialize_response(field=field, response_content=content_factory())).body
+        return lambda: loop.run_until_complete(_serialize())
+
+    payloads = {
+        f"poll ({args.interfaces} interfaces)": dict(
+            fastapi=_fastapi(poll_field, lambda: poll_result),
+            fast=lambda: fast_response(poll_result).body,
+            msgpack=lambda: fast_response(poll_result, MSGPACK_MEDIA_TYPE).body,
+        ),
+        f"traps ({args.traps} traps)": dict(
+            fastapi=_fastapi(traps_field, lambda: GetTrapsResponse(Traps=traps, Next=traps[-1].Sequence, Timestamp=timestamp())),
+            fast=lambda: fast_response(dict(Timestamp=timestamp(), Traps=traps, Next=traps[-1].Sequence)).body,
+            msgpack=lambda: fast_response(dict(Timestamp=timestamp(), Traps=traps, Next=traps[-1].Sequence), MSGPACK_MEDIA_TYPE).body,
+        ),
+    }
+    if msgpack is None:
+        for serializers in payloads.values():
+            del serializers["msgpack"]
+
+    print(f"JSON encoder   : {'orjson' if orjson is not None else 'json (pip3 install orjson for the fastest path)'}")
+    print(f"MessagePack    : {'msgpack' if msgpack is not None else 'not installed (pip3 install msgpack)'}")
+    mismatched = False
+    for payload, serializers in payloads.items():
+        print(f"{payload}:")
+        baseline = None
+        for name, serialize in serializers.items():
+            body = serialize()
+            elapsed = timed(serialize, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {name:<13}: {elapsed * 1000:8.2f} ms ({baseline / elapsed:5.1f}x), {len(body):9d} bytes")
+        if json.loads(serializers["fast"]()) != json.loads(serializers["fastapi"]()):
+            print(f"  fast JSON body differs from fastapi's")
+            mismatched = True
+    loop.close()
+    if mismatched:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
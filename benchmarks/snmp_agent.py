@@ -0,0 +1,280 @@
+"""
+Simulated SNMPv2c agent serving recorded walks, for benchmarking polls
+without real network kit.
+
+The agent answers GET, GETNEXT and GETBULK from a table of OID -> value,
+either one of the built-in device profiles (PROFILES) or a walk recorded
+from a real device with `snmpwalk -v2c -On -c <community> <host> .1`.
+It listens on one UDP port per simulated device, and can drop a fraction
+of requests and delay its responses, to mimic lossy or slow agents.
+
+It runs in its own process, so its CPU time is not counted against the
+process being benchmarked.
+
+Usage:
+python3 -m benchmarks.snmp_agent [--profile NAME | --walk FILE] [--port PORT] [--devices N] [--loss P] [--delay S]
+"""
+from pysnmp.proto import api, rfc1902, rfc1905
+from pyasn1.codec.ber import decoder, encoder
+from pyasn1.error import PyAsn1Error
+
+from argparse import ArgumentParser
+from bisect import bisect_right
+from multiprocessing import get_context
+from random import Random
+from time import monotonic
+import heapq
+import re
+import selectors
+import socket
+
+PROTOCOL = api.protoModules[api.protoVersion2c]
+
+# Largest response the agent sends before answering tooBig instead.
+MAX_RESPONSE_SIZE = 65507
+
+def _device(interfaces: int, neighbours: int, model: str, name_format: str, units: int = 0) -> dict:
+    # Builds the table of a device with the given interfaces and LLDP neighbours,
+    # and 'units' logical interfaces (e.g. ge-0/0/0.100) per interface.
+    table = {
+        "1.3.6.1.2.1.1.3.0": rfc1902.TimeTicks(8640000),
+        "1.3.6.1.2.1.1.5.0": rfc1902.OctetString("sim-" + model.lower()),
+        "1.3.6.1.2.1.47.1.1.1.1.13.1": rfc1902.OctetString(model),
+        "1.3.6.1.2.1.31.1.5.0": rfc1902.TimeTicks(100),
+        "1.0.8802.1.1.2.1.2.1.0": rfc1902.TimeTicks(100),
+    }
+    names = [name_format.format(port=port) for port in range(interfaces)]
+    names += [f"{name}.{unit}" for name in names[:] for unit in range(units)]
+    for ifindex, name in enumerate(names, 1):
+        table.update({
+            f"1.3.6.1.2.1.2.2.1.1.{ifindex}": rfc1902.Integer(ifindex),
+            f"1.3.6.1.2.1.2.2.1.2.{ifindex}": rfc1902.OctetString(name),
+            f"1.3.6.1.2.1.2.2.1.7.{ifindex}": rfc1902.Integer(1),
+            f"1.3.6.1.2.1.2.2.1.8.{ifindex}": rfc1902.Integer(1 if ifindex % 4 else 2),
+            f"1.3.6.1.2.1.31.1.1.1.1.{ifindex}": rfc1902.OctetString(name),
+            f"1.3.6.1.2.1.31.1.1.1.6.{ifindex}": rfc1902.Counter64(ifindex * 10**9),
+            f"1.3.6.1.2.1.31.1.1.1.10.{ifindex}": rfc1902.Counter64(ifindex * 2 * 10**9),
+            f"1.3.6.1.2.1.31.1.1.1.15.{ifindex}": rfc1902.Gauge32(10000),
+        })
+    for neighbour in range(1, neighbours + 1):
+        port = (neighbour - 1) % interfaces + 1
+        index = f"0.{port}.{neighbour}"
+        table.update({
+            f"1.0.8802.1.1.2.1.4.1.1.7.{index}": rfc1902.OctetString(f"et-0/0/{neighbour}"),
+            f"1.0.8802.1.1.2.1.4.1.1.9.{index}": rfc1902.OctetString(f"neighbour-{neighbour}"),
+            f"1.0.8802.1.1.2.1.4.2.1.4.{index}.1.4.10.0.{neighbour // 256}.{neighbour % 256}": rfc1902.Integer(2),
+        })
+    return table
+
+# Built-in device profiles: name -> function building the device's table.
+PROFILES = {
+    "access-48": lambda: _device(48, 4, "EX2300", "ge-0/0/{port}"),
+    "chassis-1000": lambda: _device(1000, 16, "MX960", "xe-{port}/0/0"),
+    "spine-lldp": lambda: _device(128, 512, "QFX5120", "et-0/0/{port}"),
+    "router-units": lambda: _device(48, 16, "MX204", "xe-0/0/{port}", units=20),
+}
+
+# snmpwalk -On output line, e.g. '.1.3.6.1.2.1.1.5.0 = STRING: "sw1"'.
+WALK_LINE_RGX = re.compile(r'^\.?([0-9.]+) = (?:([A-Za-z0-9-]+): ?)?(.*)$')
+
+def _walk_value(kind: str, text: str):
+    # Converts an snmpwalk value to the SNMP type it was recorded as.
+    text = text.strip()
+    if kind in ("STRING", None):
+        return rfc1902.OctetString(text[1:-1] if text.startswith('"') and text.endswith('"') else text)
+    if kind == "Hex-STRING":
+        return rfc1902.OctetString(hexValue=text.replace(" ", ""))
+    if kind == "OID":
+        return rfc1902.ObjectName(text.lstrip("."))
+    if kind == "IpAddress":
+        return rfc1902.IpAddress(text)
+    # Numeric types, e.g. 'up(1)' or 'Timeticks: (8640000) 1 day, 0:00:00.00'.
+    number = int(re.search(r"\((\d+)\)", text).group(1) if "(" in text else text.split()[0])
+    return {
+        "INTEGER": rfc1902.Integer, "Counter32": rfc1902.Counter32, "Counter64": rfc1902.Counter64,
+        "Gauge32": rfc1902.Gauge32, "Timeticks": rfc1902.TimeTicks,
+    }.get(kind, rfc1902.Integer)(number)
+
+def load_walk(path: str) -> dict:
+    """Loads a walk recorded with `snmpwalk -On`. Lines continuing a multi-line value are skipped."""
+    table = {}
+    with open(path) as file:
+        for line in file:
+            if (match := WALK_LINE_RGX.match(line.rstrip("\n"))):
+                oid, kind, text = match.groups()
+                table[oid] = _walk_value(kind, text)
+    return table
+
+def _oid_key(oid: str) -> tuple:
+    return tuple(int(part) for part in oid.split("."))
+
+class SimulatedAgent:
+    """
+    Object running a simulated SNMPv2c agent in a separate process.
+
+    Positional arguments:
+    table     : dict  : OID string -> pysnmp value served by every simulated device.
+    community : str   : Community the agent answers.
+
+    Keyword arguments:
+    devices   : int   : Simulated devices, each on its own UDP port. Default=1.
+    port      : int   : First UDP port. 0 = any free ports. Default=0.
+    loss      : float : Fraction of requests dropped unanswered. Default=0.
+    delay     : float : Seconds each response is delayed by. Default=0.
+
+    Methods:
+    start : Start the agent process. Returns the ports it listens on.
+    pdus  : Return the number of requests received so far.
+    stop  : Stop the agent process.
+    """
+    def __init__(self, table: dict, community: str, devices: int = 1, port: int = 0, loss: float = 0.0, delay: float = 0.0):
+        self._table = table
+        self._community = community
+        self._devices = max(1, devices)
+        self._port = port
+        self._loss = loss
+        self._delay = delay
+        self._process = None
+        self._pdus = None
+
+    def start(self) -> list:
+        context = get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        self._pdus = context.Value("Q", 0)
+        self._process = context.Process(
+            target=_serve, name="SimulatedAgent", daemon=True,
+            args=(self._table, self._community, self._devices, self._port, self._loss, self._delay, self._pdus, sender)
+        )
+        self._process.start()
+        sender.close()
+        return receiver.recv()
+
+    def pdus(self) -> int:
+        return self._pdus.value
+
+    def stop(self):
+        if self._process:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+def _serve(table: dict, community: str, devices: int, port: int, loss: float, delay: float, pdus, conn):
+    # Entrypoint of the agent process.
+    values = {_oid_key(oid): value for oid, value in table.items()}
+    keys = sorted(values)
+    random = Random(0)
+    selector = selectors.DefaultSelector()
+    ports = []
+    for index in range(devices):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", port + index if port else 0))
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+        ports.append(sock.getsockname()[1])
+    conn.send(ports)
+    conn.close()
+
+    def _next(oid: tuple):
+        index = bisect_right(keys, oid)
+        return (keys[index], values[keys[index]]) if index < len(keys) else (oid, rfc1905.endOfMibView)
+
+    delayed = [] # Heap of (due, sequence, sock, data, address).
+    sequence = 0
+    while True:
+        timeout = max(0.0, delayed[0][0] - monotonic()) if delayed else None
+        for key, _ in selector.select(timeout):
+            sock = key.fileobj
+            try:
+                data, address = sock.recvfrom(65535)
+            except BlockingIOError:
+                continue
+            with pdus.get_lock():
+                pdus.value += 1
+            if loss and random.random() < loss:
+                continue
+            response = _respond(data, community, values, _next)
+            if response is None:
+                continue
+            if delay:
+                sequence += 1
+                heapq.heappush(delayed, (monotonic() + delay, sequence, sock, response, address))
+            else:
+                sock.sendto(response, address)
+        while delayed and delayed[0][0] <= monotonic():
+            _, _, sock, response, address = heapq.heappop(delayed)
+            sock.sendto(response, address)
+
+def _respond(data: bytes, community: str, values: dict, _next) -> bytes | None:
+    # Answers one request message, or returns None if it is not one for us.
+    try:
+        message, _ = decoder.decode(data, asn1Spec=PROTOCOL.Message())
+    except PyAsn1Error:
+        return None
+    if str(PROTOCOL.apiMessage.getCommunity(message)) != community:
+        return None
+    request = PROTOCOL.apiMessage.getPDU(message)
+    response = PROTOCOL.apiPDU.getResponse(request)
+    names = [tuple(oid) for oid, _ in PROTOCOL.apiPDU.getVarBinds(request)]
+
+    if request.isSameTypeWith(PROTOCOL.GetRequestPDU()):
+        var_binds = [(oid, values.get(oid, rfc1905.noSuchInstance)) for oid in names]
+    elif request.isSameTypeWith(PROTOCOL.GetNextRequestPDU()):
+        var_binds = [_next(oid) for oid in names]
+    elif request.isSameTypeWith(PROTOCOL.GetBulkRequestPDU()):
+        non_repeaters = int(PROTOCOL.apiBulkPDU.getNonRepeaters(request))
+        max_repetitions = int(PROTOCOL.apiBulkPDU.getMaxRepetitions(request))
+        var_binds = [_next(oid) for oid in names[:non_repeaters]]
+        cursors = names[non_repeaters:]
+        for _ in range(max_repetitions if cursors else 0):
+            row = [_next(oid) for oid in cursors]
+            var_binds.extend(row)
+            cursors = [oid for oid, _ in row]
+            if all(value is rfc1905.endOfMibView for _, value in row):
+                break
+    else:
+        return None
+
+    PROTOCOL.apiPDU.setVarBinds(response, var_binds)
+    PROTOCOL.apiMessage.setPDU(message, response)
+    encoded = encoder.encode(message)
+    if len(encoded) > MAX_RESPONSE_SIZE:
+        PROTOCOL.apiPDU.setVarBinds(response, [(oid, rfc1905.noSuchInstance) for oid in names])
+        PROTOCOL.apiPDU.setErrorStatus(response, "tooBig")
+        PROTOCOL.apiMessage.setPDU(message, response)
+        encoded = encoder.encode(message)
+    return encoded
+
+def load_table(profile: str | None, walk: str | None) -> dict:
+    """Returns the table of the named built-in profile, or of a recorded walk file."""
+    if walk:
+        return load_walk(walk)
+    if profile not in PROFILES:
+        raise SystemExit(f"Unknown profile '{profile}'. Choose from: {', '.join(PROFILES)}")
+    return PROFILES[profile]()
+
+def add_agent_arguments(parser: ArgumentParser):
+    """Adds the simulated agent's options to a benchmark's argument parser."""
+    parser.add_argument("--profile", default="access-48", help=f"Built-in device profile: {', '.join(PROFILES)}.")
+    parser.add_argument("--walk", help="Serve a walk recorded with `snmpwalk -On` instead of a profile.")
+    parser.add_argument("--community", default="public")
+    parser.add_argument("--devices", type=int, default=10, help="Simulated devices, one UDP port each.")
+    parser.add_argument("--loss", type=float, default=0.0, help="Fraction of requests the agent drops.")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds the agent delays each response by.")
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_agent_arguments(parser)
+    parser.add_argument("--port", type=int, default=16161)
+    args = parser.parse_args()
+
+    table = load_table(args.profile, args.walk)
+    agent = SimulatedAgent(table, args.community, devices=args.devices, port=args.port, loss=args.loss, delay=args.delay)
+    ports = agent.start()
+    print(f"Serving {len(table)} OIDs on 127.0.0.1 UDP port(s) {ports[0]}-{ports[-1]}. Ctrl-C to stop.")
+    try:
+        agent._process.join()
+    except KeyboardInterrupt:
+        agent.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark comparing trap ingest throughput of the in-memory TrapDatastore
+against one persisting to a TrapJournal, with and without fsync, and the
+time taken to restore a store from the resulting log on restart.
+
+Traps are stored for a number of subscribed devices round-robin, as the
+trap workers would. "Ingest" is the rate store_trap returns at; "durable"
+also waits for the journal to write (and fsync) every record.
+
+Usage:
+python3 -m benchmarks.trap_store [--traps N] [--devices N] [--batch-size N]
+"""
+from snmpservice.trapping.journal import TrapJournal
+from snmpservice.trapping.store import TrapDatastore
+from snmpservice.utils.models.trapping import Trap
+from snmpservice.utils.helpers import timestamp
+
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import asyncio
+import os
+
+def make_traps(count: int, devices: int) -> list:
+    now = timestamp()
+    return [
+        (f"10.0.{index % devices // 256}.{index % devices % 256}", Trap(
+            TrapId=f"linkDown-{index % 48}-{index}",
+            IpAddress=f"10.0.{index % devices // 256}.{index % devices % 256}",
+            Timestamp=now,
+            TrapName="linkDown",
+            TrapData={"ifIndex": index % 48, "ifName": f"ge-0/0/{index % 48}", "ifOperStatus": "down"},
+        ))
+        for index in range(count)
+    ]
+
+def create_store(devices: int, journal: TrapJournal | None = None) -> TrapDatastore:
+    store = TrapDatastore(max_per_device=0, max_age=0, max_traps=0)
+    if journal:
+        store.open_journal(journal)
+    for index in range(devices):
+        asyncio.run(store.create_subscription(f"10.0.{index // 256}.{index % 256}"))
+    return store
+
+def measure(store: TrapDatastore, traps: list) -> tuple:
+    """Returns (ingest, durable) seconds to store traps."""
+    start = perf_counter()
+    for ip, trap in traps:
+        store.store_trap(ip, trap.copy())
+    ingest = perf_counter() - start
+    store.close_journal()
+    return ingest, perf_counter() - start
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--traps", type=int, default=100000)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=512)
+    args = parser.parse_args()
+
+    traps = make_traps(args.traps, args.devices)
+    results = {"In memory": measure(create_store(args.devices), traps)}
+    with TemporaryDirectory() as directory:
+        for fsync in (False, True):
+            path = os.path.join(directory, f"traps-{fsync}.log")
+            journal = TrapJournal(path, fsync=fsync, batch_size=args.batch_size, flush_interval=0.1, compact_ratio=1e9)
+            results[f"Journal, fsync={fsync}"] = measure(create_store(args.devices, journal), traps)
+
+        size = os.path.getsize(path)
+        start = perf_counter()
+        restored = create_store(0, TrapJournal(path, fsync=False, batch_size=args.batch_size, flush_interval=0.1, compact_ratio=1e9))
+        replay = perf_counter() - start
+        restored.close_journal()
+
+    print(f"Traps stored        : {args.traps} across {args.devices} devices")
+    for name, (ingest, durable) in results.items():
+        print(f"{name:<20}: {args.traps / ingest:10.0f} traps/s ingest, {args.traps / durable:10.0f} traps/s durable")
+    print(f"Replay              : {replay * 1000:8.1f} ms for {size / 2**20:.1f} MiB ({restored.stats()['Traps']} traps restored)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Load generator and throughput benchmark for the trap receiver.
+
+Sender processes fire SNMPv2c linkUp, linkDown and unknown (unparsed)
+traps at the receiver over localhost, each device sending from its own
+loopback address (127.0.x.y) so the receiver sees --devices distinct
+sources. Each parsed trap carries its send time in its ifName, so the
+time from send to TrapDatastore.store_trap can be measured.
+
+Reports traps sent against traps stored, where the missing ones went
+(kernel socket buffer overflows, receive queue drops, storm suppression),
+send-to-store latency percentiles, and this process's CPU time per trap.
+Storm suppression is disabled unless --suppression is passed, so the raw
+ingest path is measured.
+
+As a regression gate, exits with status 1 if fewer than --min-delivery of
+the parseable traps sent were stored, or p99 latency exceeds --max-p99.
+
+Usage:
+python3 -m benchmarks.traps [--rate N] [--burst N] [--duration S] [--senders N] [--devices N]
+                            [--mix UP,DOWN,UNKNOWN] [--shards N] [--suppression]
+                            [--min-delivery F] [--max-p99 MS] [--json]
+"""
+from benchmarks.helpers import percentile
+from snmpservice.settings import settings
+
+from pysnmp.proto import api, rfc1902
+from pyasn1.codec.ber import encoder
+
+from argparse import ArgumentParser
+from multiprocessing import get_context
+from random import Random
+from time import monotonic, monotonic_ns, perf_counter, process_time, sleep
+import asyncio
+import json
+import socket
+import sys
+
+PROTOCOL = api.protoModules[api.protoVersion2c]
+
+TRAP_OIDS = {
+    "linkUp": "1.3.6.1.6.3.1.1.5.4",
+    "linkDown": "1.3.6.1.6.3.1.1.5.3",
+    "unknown": "1.3.6.1.4.1.8072.9999.9999.1", # NET-SNMP test OID, no parser registered.
+}
+
+# Interfaces each device sends traps for.
+INTERFACES = 48
+
+# ifName of every trap sent: the placeholder is overwritten with the send
+# time (monotonic, microseconds) so the trap's Interface identifies when it
+# was sent. It is a data interface name (settings.snmp_poll_data_interfaces).
+STAMP_PLACEHOLDER = b"9" * 16
+IF_NAME = "ge-{stamp}/0/{ifindex}"
+
+def device_address(index: int) -> str:
+    """Loopback address device 'index' sends from."""
+    return f"127.0.{index // 250}.{index % 250 + 1}"
+
+def encode_trap(community: str, trap: str, ifindex: int) -> bytes:
+    """Encodes an SNMPv2c trap with a placeholder send time in its ifName."""
+    pdu = PROTOCOL.SNMPv2TrapPDU()
+    PROTOCOL.apiTrapPDU.setDefaults(pdu)
+    PROTOCOL.apiTrapPDU.setVarBinds(pdu, [
+        (rfc1902.ObjectName("1.3.6.1.2.1.1.3.0"), rfc1902.TimeTicks(0)),
+        (rfc1902.ObjectName("1.3.6.1.6.3.1.1.4.1.0"), rfc1902.ObjectName(TRAP_OIDS[trap])),
+        (rfc1902.ObjectName(f"1.3.6.1.2.1.2.2.1.1.{ifindex}"), rfc1902.Integer(ifindex)),
+        (rfc1902.ObjectName(f"1.3.6.1.2.1.31.1.1.1.1.{ifindex}"),
+         rfc1902.OctetString(IF_NAME.format(stamp=STAMP_PLACEHOLDER.decode(), ifindex=ifindex))),
+    ])
+    message = PROTOCOL.Message()
+    PROTOCOL.apiMessage.setDefaults(message)
+    PROTOCOL.apiMessage.setCommunity(message, community)
+    PROTOCOL.apiMessage.setPDU(message, pdu)
+    return encoder.encode(message)
+
+def _send(index: int, devices: list, port: int, community: str, mix: tuple, rate: float,
+          burst: int, duration: float, start_at: float, conn):
+    # Entrypoint of a sender process. Sends bursts of traps from its devices, round-robin.
+    templates = {
+        trap: [encode_trap(community, trap, ifindex) for ifindex in range(1, INTERFACES + 1)]
+        for trap in TRAP_OIDS
+    }
+    offset = templates["linkUp"][0].index(STAMP_PLACEHOLDER)
+    sockets = []
+    for device in devices:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((device_address(device), 0))
+        sockets.append(sock)
+    random = Random(index)
+    kinds = random.choices(list(TRAP_OIDS), weights=mix, k=4096)
+
+    sent = dict.fromkeys(TRAP_OIDS, 0)
+    errors = 0
+    count = 0
+    while monotonic() < start_at:
+        sleep(0.001)
+    next_burst, end = start_at, start_at + duration
+    while (now := monotonic()) < end:
+        if rate and now < next_burst:
+            sleep(next_burst - now)
+        for _ in range(burst):
+            kind = kinds[count % len(kinds)]
+            template = templates[kind][count % INTERFACES]
+            packet = template[:offset] + b"%016d" % (monotonic_ns() // 1000) + template[offset + 16:]
+            try:
+                sockets[count % len(sockets)].sendto(packet, ("127.0.0.1", port))
+                sent[kind] += 1
+            except OSError:
+                errors += 1
+            count += 1
+        next_burst += burst / rate if rate else 0
+    conn.send((sent, errors))
+    conn.close()
+
+def udp_receive_errors() -> int | None:
+    """Returns the host's UDP RcvbufErrors count (datagrams dropped as a socket buffer was full), if available."""
+    try:
+        with open("/proc/net/snmp") as file:
+            header, values = [line.split() for line in file if line.startswith("Udp:")][:2]
+        return int(values[header.index("RcvbufErrors")])
+    except (OSError, ValueError):
+        return None
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11162)
+    parser.add_argument("--community", default="public")
+    parser.add_argument("--rate", type=float, default=5000, help="Traps/s across all senders. 0 = as fast as possible.")
+    parser.add_argument("--burst", type=int, default=10, help="Traps each sender sends back to back.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send for.")
+    parser.add_argument("--senders", type=int, default=2, help="Sender processes.")
+    parser.add_argument("--devices", type=int, default=100, help="Devices (source addresses) sending traps.")
+    parser.add_argument("--mix", default="45,45,10", help="Relative weights of linkUp, linkDown and unknown traps.")
+    parser.add_argument("--shards", type=int, default=0, help="Receive with this many sharded receiver processes.")
+    parser.add_argument("--suppression", action="store_true", help="Keep storm suppression and flap damping enabled.")
+    parser.add_argument("--drain", type=float, default=5.0, help="Longest to wait for queued traps to be stored, in seconds.")
+    parser.add_argument("--min-delivery", type=float, default=0.0, help="Fail unless this fraction of parseable traps are stored.")
+    parser.add_argument("--max-p99", type=float, default=0.0, help="Fail if p99 send-to-store latency exceeds this, in ms.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+    mix = tuple(float(weight) for weight in args.mix.split(","))
+    if len(mix) != len(TRAP_OIDS):
+        raise SystemExit("--mix takes three weights: linkUp,linkDown,unknown")
+
+    # The trap path's singletons read settings on import.
+    if not args.suppression:
+        settings.snmp_trap_rate_source = settings.snmp_trap_rate_interface = settings.snmp_trap_flap_penalty = 0
+    settings.snmp_trap_shards = args.shards
+    from snmpservice.trapping.store import trap_datastore
+    from snmpservice.trapping.receiver import dispatch_trap_receiver
+    from snmpservice.trapping.sharded import sharded_trap_receiver
+    from snmpservice.trapping.pipeline import trap_pipeline
+    from snmpservice.trapping.suppression import trap_suppressor
+
+    devices = list(range(args.devices))
+    for device in devices:
+        asyncio.run(trap_datastore.create_subscription(device_address(device)))
+    latencies = []
+    def _listener(ip, trap):
+        # Runs on the thread storing the trap.
+        sent = int(trap.TrapData["Interface"][3:19])
+        latencies.append(monotonic_ns() // 1000 - sent)
+    trap_datastore.add_listener(_listener)
+
+    receiver = sharded_trap_receiver.start if args.shards else dispatch_trap_receiver
+    receiver(ip="127.0.0.1", port=args.port, community=args.community)
+
+    context = get_context("spawn")
+    start_at = monotonic() + 2.0 + 0.5 * args.senders + (3.0 if args.shards else 0.0)
+    senders = []
+    for index in range(args.senders):
+        receiver_conn, sender_conn = context.Pipe(duplex=False)
+        process = context.Process(target=_send, name=f"TrapSender-{index}", daemon=True, args=(
+            index, devices[index::args.senders], args.port, args.community, mix,
+            args.rate / args.senders, args.burst, args.duration, start_at, sender_conn
+        ))
+        process.start()
+        sender_conn.close()
+        senders.append((process, receiver_conn))
+
+    while monotonic() < start_at:
+        sleep(0.01)
+    receive_errors, cpu, start = udp_receive_errors(), process_time(), perf_counter()
+
+    sent, send_errors = dict.fromkeys(TRAP_OIDS, 0), 0
+    for process, conn in senders:
+        counts, errors = conn.recv()
+        process.join()
+        send_errors += errors
+        for kind, count in counts.items():
+            sent[kind] += count
+    send_seconds = perf_counter() - start
+
+    # Wait for queued traps to be stored.
+    drain_until, stored = monotonic() + args.drain, -1
+    while stored != len(latencies) and monotonic() < drain_until:
+        stored = len(latencies)
+        sleep(0.25)
+    cpu, elapsed = process_time() - cpu, perf_counter() - start
+    if receive_errors is not None:
+        receive_errors = udp_receive_errors() - receive_errors
+
+    total_sent, parseable = sum(sent.values()), sent["linkUp"] + sent["linkDown"]
+    latencies_ms = [latency / 1000 for latency in latencies]
+    results = dict(
+        Sent=total_sent,
+        SentByTrap=sent,
+        SendErrors=send_errors,
+        SendRate=round(total_sent / send_seconds, 1),
+        Stored=len(latencies),
+        Delivery=round(len(latencies) / parseable, 4) if parseable else 0.0,
+        StoreRate=round(len(latencies) / elapsed, 1),
+        KernelReceiveErrors=receive_errors,
+        QueueDropped=trap_pipeline.stats()["Dropped"],
+        Suppressed=trap_suppressor.stats()["Suppressed"],
+        LatencyMs={name: round(percentile(latencies_ms, fraction), 3)
+                   for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+        CpuMsPerTrap=round(cpu / total_sent * 1000, 4) if total_sent else 0.0,
+    )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"Receiver        : {f'{args.shards} shard(s)' if args.shards else 'in-process'}, "
+              f"{settings.snmp_trap_workers} worker(s), suppression {'on' if args.suppression else 'off'}")
+        print(f"Sent            : {total_sent} ({', '.join(f'{k} {v}' for k, v in sent.items())}), "
+              f"{send_errors} send errors, {results['SendRate']:.0f} traps/s")
+        print(f"Stored          : {results['Stored']} of {parseable} parseable ({results['Delivery']:.2%}), "
+              f"{results['StoreRate']:.0f} traps/s")
+        print(f"Lost            : {receive_errors if receive_errors is not None else '?'} kernel buffer overflows (host-wide), "
+              f"{results['QueueDropped']} queue drops, {results['Suppressed']} suppressed")
+        print(f"Latency         : " + ", ".join(f"{k} {v:.2f} ms" for k, v in results["LatencyMs"].items()))
+        print(f"CPU             : {results['CpuMsPerTrap'] * 1000:.1f} us per trap sent"
+              f"{' (this process only, excludes shards)' if args.shards else ''}")
+
+    failures = []
+    if args.min_delivery and results["Delivery"] < args.min_delivery:
+        failures.append(f"delivery {results['Delivery']:.2%} below {args.min_delivery:.2%}")
+    if args.max_p99 and results["LatencyMs"]["p99"] > args.max_p99:
+        failures.append(f"p99 latency {results['LatencyMs']['p99']:.2f} ms above {args.max_p99:.2f} ms")
+    if failures:
+        print("FAILED: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of varbind decoding (snmpservice.polling.objects.base.unpack_varbind)
+on the varbinds of a built-in device profile or a walk recorded with
+`snmpwalk -On` (see benchmarks.snmp_agent), against the previous decoder
+which converted every value to a string and tried int() on it.
+
+A fraction (--absent) of the varbinds is replaced with noSuchInstance and
+endOfMibView values, as returned at the end of a table or for missing objects.
+OID strings are cached by unpack_varbind, so the varbinds are decoded once
+before timing, as on any poll after the first of a device model.
+
+Reports time per varbind for each decoder, and the varbinds they decode
+differently (e.g. numeric strings, which the previous decoder turned into
+ints, and IpAddresses, which it returned as raw octets).
+
+Usage:
+python3 -m benchmarks.varbinds [--profile NAME | --walk FILE] [--absent F] [--repeat N]
+"""
+from benchmarks.snmp_agent import load_table
+from snmpservice.polling.objects.base import unpack_varbind
+
+from pysnmp.hlapi import ObjectType
+from pysnmp.proto import rfc1902, rfc1905
+from argparse import ArgumentParser
+from collections import Counter
+from random import Random
+from timeit import repeat
+
+def legacy_unpack_varbind(varbind: ObjectType) -> tuple:
+    # The decoder unpack_varbind replaced, for comparison.
+    if isinstance(varbind, (ObjectType, tuple)):
+        oid, value = varbind
+        try:
+            value = int(str(value))
+        except ValueError:
+            value = str(value)
+        if isinstance(value, str) and (value.lower().startswith("no such") or value == ""):
+            return None, None
+        return str(oid), value
+    return None, None
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", default="chassis-1000", help="Built-in device profile, see benchmarks.snmp_agent.")
+    parser.add_argument("--walk", help="Decode a walk recorded with `snmpwalk -On` instead of a profile.")
+    parser.add_argument("--absent", type=float, default=0.02, help="Fraction of varbinds replaced with noSuchInstance/endOfMibView.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per decoder. The fastest is reported.")
+    args = parser.parse_args()
+
+    random = Random(0)
+    sentinels = (rfc1905.noSuchInstance, rfc1905.endOfMibView)
+    varbinds = [
+        (rfc1902.ObjectName(oid), random.choice(sentinels) if random.random() < args.absent else value)
+        for oid, value in load_table(args.profile, args.walk).items()
+    ]
+    types = Counter(type(value).__name__ for _, value in varbinds)
+
+    def _decode(decoder):
+        return [vb for varbind in varbinds if (vb := decoder(varbind)) != (None, None)]
+
+    _decode(unpack_varbind) # Fill the OID string cache.
+    print(f"Varbinds       : {len(varbinds)} from {args.walk or args.profile} "
+          f"({', '.join(f'{name} {count}' for name, count in types.most_common())})")
+    timings = {}
+    for name, decoder in (("previous", legacy_unpack_varbind), ("typed", unpack_varbind)):
+        timings[name] = min(repeat(lambda: _decode(decoder), number=1, repeat=args.repeat)) / len(varbinds)
+        print(f"{name:<15}: {timings[name] * 10**9:10.0f} ns per varbind")
+    print(f"Speedup        : {timings['previous'] / timings['typed']:10.2f}x")
+
+    differences = Counter(
+        type(varbind[1]).__name__ for varbind in varbinds
+        if legacy_unpack_varbind(varbind) != unpack_varbind(varbind)
+    )
+    print(f"Decoded differently: {sum(differences.values())} "
+          f"({', '.join(f'{name} {count}' for name, count in differences.most_common()) or 'none'})")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 from snmpservice.trapping.store import trap_datastore
+from snmpservice.trapping.journal import trap_journal
 from snmpservice.trapping.receiver import dispatch_trap_receiver
+from snmpservice.trapping.sharded import sharded_trap_receiver
+from snmpservice.polling.scheduler import poll_scheduler
 from snmpservice.utils.logger import logger, setup_logger
 from snmpservice.utils.exceptions import *
 from snmpservice.settings import settings
-from snmpservice.routes import poll, subscribe, traps
+from snmpservice.routes import metrics, poll, schedule, stats, subscribe, traps
 
 from fastapi import FastAPI
 from fastapi.responses import PlainTextResponse
@@ -16,15 +19,23 @@ app = FastAPI(
 
 @app.on_event('startup')
 def setup():
-    """Sets up the logger and dispatches a daemon thread for SNMP trap reception."""
+    """
+    Sets up the logger, restores the trap store if snmp_trap_store_path is
+    set, and dispatches a daemon thread for SNMP trap reception, or the trap
+    receiver shard processes if snmp_trap_shards is set.
+    """
     setup_logger(
         loglevel=settings.log_level, 
         filename=settings.log_filename
     )
     logger.info("Logger setup complete.")
     try:
+        if settings.snmp_trap_store_path:
+            logger.info("Restoring trap store...")
+            trap_datastore.open_journal(trap_journal)
         logger.info("Initialising trap receiver...")
-        dispatch_trap_receiver(
+        receiver = sharded_trap_receiver.start if settings.snmp_trap_shards > 0 else dispatch_trap_receiver
+        receiver(
             ip = settings.snmp_trap_ip,
             port = settings.snmp_trap_port,
             community = settings.snmp_trap_community,
@@ -34,9 +45,27 @@ def setup():
         _exit(0) # Hacky way to make multi-threaded process terminate.
     logger.info("TrapEngine setup complete.")
 
+@app.on_event('startup')
+async def start_scheduler():
+    """Starts background polling of scheduled devices on the app's event loop."""
+    poll_scheduler.start()
+
+@app.on_event('shutdown')
+async def stop_scheduler():
+    """Stops background polling, cancelling any scheduled polls in flight."""
+    await poll_scheduler.stop()
+
+@app.on_event('shutdown')
+def close_trap_journal():
+    """Writes any trap store changes still pending to the trap store log."""
+    trap_datastore.close_journal()
+
 app.include_router(poll.router)
+app.include_router(schedule.router)
 app.include_router(subscribe.router)
 app.include_router(traps.router)
+app.include_router(stats.router)
+app.include_router(metrics.router)
 
 @app.get('/debug')
 def debug_endpoint():
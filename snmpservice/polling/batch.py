@@ -0,0 +1,83 @@
+from snmpservice.polling.poller import poll_async
+from snmpservice.utils.logger import logger
+from snmpservice.utils.exceptions import *
+from snmpservice.utils.helpers import is_ipv4_address
+
+from typing import AsyncIterator, Iterable
+import asyncio
+
+class BatchTarget:
+    """
+    Object representing a single device to poll as part of a batch.
+
+    Positional arguments:
+    ip        : str : Target IP address.
+    port      : int : UDP port for the remote device.
+    community : str : SNMP community string to use.
+    """
+    def __init__(self, ip: str, port: int, community: str):
+        self.ip = ip
+        self.port = port
+        self.community = community
+
+async def _poll_target(target: BatchTarget, strategy: str, deadline: float) -> dict:
+    # Polls one target, reporting failures inline using the /poll/{ip} status codes.
+    result = dict(IpAddress=target.ip, Port=target.port, Status=200, Result=None, Error=None)
+    try:
+        if not is_ipv4_address(target.ip):
+            raise InvalidInput("'ip' input must be a valid IP address.")
+        result["Result"] = await asyncio.wait_for(
+            poll_async(ip=target.ip, port=int(target.port), community=target.community, strategy=strategy),
+            timeout=deadline
+        )
+    except InvalidInput as e:
+        result.update(Status=460, Error=f"Invalid Input: {e}")
+    except DeviceUnreachable:
+        result.update(Status=461, Error="Device Unreachable.")
+    except asyncio.TimeoutError:
+        result.update(Status=504, Error=f"Poll exceeded deadline of {deadline}s.")
+    except Exception as e:
+        logger.error(f"[BATCH {target.ip}] Unexpected poll error: {e}")
+        result.update(Status=500, Error=f"Unexpected poll error: {e}")
+    return result
+
+async def poll_batch(targets: Iterable[BatchTarget], strategy: str, concurrency: int, deadline: float) -> AsyncIterator[dict]:
+    """
+    Polls many devices with at most 'concurrency' polls in flight,
+    yielding each device's result as soon as its poll completes.
+
+    Positional arguments:
+    targets     : iterable : BatchTarget objects to poll.
+    strategy    : str      : Poll strategy string, see snmpservice.polling.poller.poll.
+    concurrency : int      : Maximum polls in flight at once.
+    deadline    : float    : Seconds each device's poll may take before it is abandoned.
+
+    Yields:
+    result : dict : {IpAddress, Port, Status, Result, Error}. Status is 200 on success,
+                    otherwise the status /poll/{ip} would have answered with, or 504
+                    if the deadline was exceeded. Per-target errors never abort the batch.
+    """
+    pending = iter(targets)
+    results = asyncio.Queue()
+    done = object() # Sentinel put by each worker when it runs out of targets.
+
+    async def _worker():
+        try:
+            for target in pending:
+                results.put_nowait(await _poll_target(target, strategy, deadline))
+        finally:
+            results.put_nowait(done)
+
+    workers = [asyncio.create_task(_worker()) for _ in range(max(1, concurrency))]
+    try:
+        remaining = len(workers)
+        while remaining:
+            result = await results.get()
+            if result is done:
+                remaining -= 1
+                continue
+            yield result
+    finally:
+        # Consumer went away (e.g. client disconnected). Stop polling.
+        for worker in workers:
+            worker.cancel()
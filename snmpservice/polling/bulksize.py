@@ -0,0 +1,168 @@
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+from threading import Lock
+from time import monotonic
+from typing import List
+
+def table_key(columns: List[str]) -> str:
+    """
+    Returns the key used to identify a walked table: the longest common
+    OID prefix of its columns. e.g. ifTable + ifXTable columns -> "1.3.6.1.2.1"
+    """
+    split = [column.split('.') for column in columns]
+    if not split:
+        return ""
+    prefix = []
+    for arcs in zip(*split):
+        if any(arc != arcs[0] for arc in arcs):
+            break
+        prefix.append(arcs[0])
+    return '.'.join(prefix)
+
+class BulkSizeRecord:
+    """Learned GETBULK sizing for a single (device, table) pair."""
+    def __init__(self, max_repetitions: int, expires: float):
+        self.max_repetitions = max_repetitions
+        self.expires = expires
+        self.walks = 0
+        self.too_big = 0
+        self.timeouts = 0
+        self.last_requests = 0
+        self.last_rows = 0
+
+    def to_dict(self, now: float) -> dict:
+        return dict(
+            MaxRepetitions=self.max_repetitions,
+            Walks=self.walks,
+            TooBig=self.too_big,
+            Timeouts=self.timeouts,
+            LastRequests=self.last_requests,
+            LastRows=self.last_rows,
+            ExpiresIn=round(max(self.expires - now, 0.0), 1),
+        )
+
+class AdaptiveBulkSizer:
+    """
+    Object that learns, per device and table, the largest GETBULK
+    max-repetitions an agent tolerates.
+
+    Sizing starts at 'maximum' and halves (down to 'minimum') each time an
+    agent answers tooBig or times out. Learned values are held in memory for
+    'ttl' seconds after they were last changed, after which the device is
+    probed from 'maximum' again.
+
+    Positional arguments:
+    maximum : int   : Initial (and largest) max-repetitions.
+    minimum : int   : Smallest max-repetitions to back off to.
+    ttl     : float : Seconds a learned value is remembered for.
+
+    Methods:
+    get            : Max-repetitions to use for a device and table.
+    get_for_device : Smallest max-repetitions learned for any table of a device.
+    record_success : Record a completed walk.
+    record_too_big : Record a tooBig response and back off.
+    record_timeout : Record a request timeout and back off.
+    stats          : Learned values and counters, optionally for one device.
+    """
+    def __init__(self, maximum: int, minimum: int = 1, ttl: float = 3600.0):
+        self._maximum = max(1, maximum)
+        self._minimum = max(1, min(minimum, self._maximum))
+        self._ttl = ttl
+        self._records = {}
+        self._lock = Lock()
+        self._next_purge = monotonic() + ttl
+
+    def _record(self, device: str, table: str) -> BulkSizeRecord:
+        # Must be called with self._lock held.
+        now = monotonic()
+        record = self._records.get((device, table))
+        if record is None or record.expires <= now:
+            if now >= self._next_purge:
+                self._purge(now)
+            record = BulkSizeRecord(self._maximum, now + self._ttl)
+            self._records[(device, table)] = record
+        return record
+
+    def _purge(self, now: float):
+        # Drop expired records so devices that are no longer polled do not
+        # accumulate. Must be called with self._lock held.
+        for key, record in list(self._records.items()):
+            if record.expires <= now:
+                self._records.pop(key)
+        self._next_purge = now + self._ttl
+
+    def get(self, device: str, table: str) -> int:
+        """Returns the max-repetitions to use when walking table on device."""
+        with self._lock:
+            return self._record(device, table).max_repetitions
+
+    def get_for_device(self, device: str) -> int:
+        """
+        Returns the smallest max-repetitions learned for any table of device,
+        for requests that are not tied to a known table. Defaults to 'maximum'.
+        """
+        now = monotonic()
+        with self._lock:
+            learned = [
+                record.max_repetitions for (record_device, _), record in self._records.items()
+                if record_device == device and record.expires > now
+            ]
+        return min(learned, default=self._maximum)
+
+    def record_success(self, device: str, table: str, requests: int, rows: int):
+        """Records a completed walk of table on device."""
+        with self._lock:
+            record = self._record(device, table)
+            record.walks += 1
+            record.last_requests = requests
+            record.last_rows = rows
+
+    def _back_off(self, record: BulkSizeRecord, max_repetitions: int) -> int:
+        # Halve from the size that failed, never growing the learned value.
+        backed_off = max(self._minimum, min(record.max_repetitions, max_repetitions // 2))
+        record.max_repetitions = backed_off
+        record.expires = monotonic() + self._ttl
+        return backed_off
+
+    def record_too_big(self, device: str, table: str, max_repetitions: int) -> int:
+        """Records a tooBig response to a request of max_repetitions. Returns the new learned value."""
+        with self._lock:
+            record = self._record(device, table)
+            record.too_big += 1
+            backed_off = self._back_off(record, max_repetitions)
+        logger.debug(f"[AdaptiveBulkSizer] {device} tooBig at {max_repetitions} for {table}. Now {backed_off}.")
+        return backed_off
+
+    def record_timeout(self, device: str, table: str, max_repetitions: int) -> int:
+        """Records a timed-out request of max_repetitions. Returns the new learned value."""
+        with self._lock:
+            record = self._record(device, table)
+            record.timeouts += 1
+            backed_off = self._back_off(record, max_repetitions)
+        logger.debug(f"[AdaptiveBulkSizer] {device} timed out at {max_repetitions} for {table}. Now {backed_off}.")
+        return backed_off
+
+    def stats(self, device: str | None = None) -> dict:
+        """
+        Returns learned sizing for every device, or only for device if given.
+        Expired records are purged.
+
+        Returns:
+        stats : dict : Device -> table key -> BulkSizeRecord.to_dict()
+        """
+        now = monotonic()
+        stats = {}
+        with self._lock:
+            for (record_device, table), record in list(self._records.items()):
+                if record.expires <= now:
+                    self._records.pop((record_device, table))
+                    continue
+                if device is None or record_device == device:
+                    stats.setdefault(record_device, {})[table] = record.to_dict(now)
+        return stats
+
+bulk_sizer = AdaptiveBulkSizer(
+    maximum = settings.snmp_poll_max_repetitions,
+    minimum = settings.snmp_poll_min_repetitions,
+    ttl = settings.snmp_poll_repetitions_ttl,
+)
@@ -0,0 +1,150 @@
+from snmpservice.polling.poller import poll_async
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Tuple
+import asyncio
+
+# Values of PollCacheResult.source
+CACHE_MISS = "MISS"
+CACHE_HIT = "HIT"
+CACHE_COALESCED = "COALESCED"
+
+class PollCacheResult:
+    """
+    Object representing the outcome of PollCache.get_or_poll.
+
+    Properties:
+    result : dict  : Poll result, as returned by poll_async.
+    source : str   : CACHE_MISS (polled for this caller), CACHE_HIT (served
+                     from cache) or CACHE_COALESCED (shared another caller's
+                     in-flight poll).
+    age    : float : Seconds since the result was polled.
+    """
+    def __init__(self, result: dict, source: str, age: float):
+        self.result = result
+        self.source = source
+        self.age = age
+
+class PollCache:
+    """
+    Object caching poll results in front of poll_async, keyed on
+    (ip, port, strategy, community).
+
+    Results are served from cache while younger than 'ttl' seconds, or
+    younger than the caller's max_age if one is given. Concurrent identical
+    requests that miss the cache share a single in-flight poll. Entries are
+    evicted least-recently-used beyond 'max_entries', and are never served
+    once older than 'max_stale' seconds, however large max_age is.
+
+    Positional arguments:
+    ttl         : float : Default maximum age of a cached result, in seconds.
+    max_entries : int   : Maximum results held.
+    max_stale   : float : Age beyond which results are discarded.
+
+    Methods:
+    get_or_poll : Return a cached result or poll the device.
+    stats       : Return cache counters.
+    """
+    def __init__(self, ttl: float, max_entries: int, max_stale: float):
+        self._ttl = ttl
+        self._max_entries = max(1, max_entries)
+        self._max_stale = max(ttl, max_stale)
+        self._entries = OrderedDict() # key -> (result, polled at)
+        self._in_flight = {} # key -> asyncio.Task
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def _lookup(self, key: tuple, max_age: float) -> Tuple[dict, float] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, polled_at = entry
+        age = monotonic() - polled_at
+        if age > self._max_stale:
+            self._entries.pop(key)
+            return None
+        if age > max_age:
+            return None
+        self._entries.move_to_end(key)
+        return result, age
+
+    def _store(self, key: tuple, result: dict, polled_at: float):
+        self._entries[key] = (result, polled_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def _poll(self, key: tuple) -> dict:
+        ip, port, strategy, community = key
+        try:
+            polled_at = monotonic()
+            result = await poll_async(ip=ip, port=port, strategy=strategy, community=community)
+            self._store(key, result, polled_at)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def get_or_poll(self, ip: str, port: int, strategy: str, community: str,
+                          max_age: float | None = None) -> PollCacheResult:
+        """
+        Returns a cached poll result for the device, or polls it.
+
+        Positional arguments:
+        ip        : str : Target IP address to poll.
+        port      : int : UDP port for the remote device.
+        strategy  : str : Poll strategy string.
+        community : str : SNMP community string to use.
+
+        Keyword arguments:
+        max_age : float : Oldest result, in seconds, the caller accepts.
+                          Default=None (use the cache's ttl).
+
+        Returns:
+        PollCacheResult
+
+        Raises:
+        Any exception raised by poll_async. Failed polls are not cached.
+        """
+        key = (ip, port, strategy, community)
+        max_age = self._ttl if max_age is None else max_age
+
+        if (cached := self._lookup(key, max_age)) is not None:
+            self._hits += 1
+            return PollCacheResult(cached[0], CACHE_HIT, cached[1])
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._coalesced += 1
+            source = CACHE_COALESCED
+        else:
+            self._misses += 1
+            source = CACHE_MISS
+            task = asyncio.create_task(self._poll(key))
+            # Mark the task's exception as retrieved, in case every waiter has gone.
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._in_flight[key] = task
+
+        # Shield the shared poll so one caller going away does not cancel it for the others.
+        result = await asyncio.shield(task)
+        logger.debug(f"[PollCache] {source} for {ip}:{port} ({strategy}).")
+        return PollCacheResult(result, source, 0.0)
+
+    def stats(self) -> dict:
+        """Returns a dictionary of cache counters."""
+        return dict(
+            Entries=len(self._entries),
+            InFlight=len(self._in_flight),
+            Hits=self._hits,
+            Misses=self._misses,
+            Coalesced=self._coalesced
+        )
+
+poll_cache = PollCache(
+    ttl = settings.snmp_poll_cache_ttl,
+    max_entries = settings.snmp_poll_cache_max_entries,
+    max_stale = settings.snmp_poll_cache_max_stale,
+)
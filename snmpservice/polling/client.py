@@ -0,0 +1,298 @@
+from snmpservice.polling.codec import (
+    ErrorStatus, GET_REQUEST, GET_BULK_REQUEST, encode_request, decode_response
+)
+from snmpservice.utils.logger import logger
+from snmpservice.utils.exceptions import *
+from snmpservice.settings import settings
+
+from pysnmp.hlapi import CommunityData, UdpTransportTarget
+from pysnmp.proto.errind import requestTimedOut
+from concurrent.futures import Future, InvalidStateError
+from random import randrange
+from threading import Thread, Lock
+from time import monotonic
+from typing import Any, List
+import selectors
+import socket
+
+# Largest SNMP message carried over UDP/IPv4.
+MAX_DATAGRAM = 65507
+
+class TimeoutWheel:
+    """
+    Hashed timing wheel of deadlines. Each of 'slots' buckets holds the
+    deadlines falling in one 'resolution'-long tick (modulo a rotation),
+    so scheduling is O(1) and expiring only visits the ticks elapsed.
+    Entries are never cancelled: callers ignore expired entries that no
+    longer apply.
+
+    Positional arguments:
+    resolution : float : Seconds per tick.
+
+    Keyword arguments:
+    slots      : int   : Buckets in one rotation. Default=512.
+
+    Methods:
+    schedule : Add an entry expiring at deadline.
+    expire   : Remove and return every entry whose deadline has passed.
+    """
+    def __init__(self, resolution: float, slots: int = 512):
+        self._resolution = resolution
+        self._slots = [[] for _ in range(max(1, slots))]
+        self._tick = int(monotonic() / resolution)
+
+    def schedule(self, deadline: float, entry: Any):
+        # Due in the first tick starting after the deadline (so it has passed
+        # when the tick is expired), or the next tick to be expired if sooner.
+        tick = max(int(deadline / self._resolution) + 1, self._tick + 1)
+        self._slots[tick % len(self._slots)].append((deadline, entry))
+
+    def expire(self, now: float) -> List[Any]:
+        expired = []
+        current = int(now / self._resolution)
+        # A lag of more than a rotation visits every slot once.
+        for tick in range(self._tick + 1, min(current, self._tick + len(self._slots)) + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            remaining = []
+            for deadline, entry in slot:
+                if deadline <= now:
+                    expired.append(entry)
+                else:
+                    remaining.append((deadline, entry))
+            self._slots[tick % len(self._slots)] = remaining
+        self._tick = max(self._tick, current)
+        return expired
+
+class PendingRequest:
+    """An outstanding request, resent from 'packet' until answered or out of retries."""
+    __slots__ = ("future", "address", "packet", "timeout", "retries", "attempt", "columns")
+
+    def __init__(self, future: Future, address: tuple, packet: bytes, timeout: float, retries: int, columns: int):
+        self.future = future
+        self.address = address
+        self.packet = packet
+        self.timeout = timeout
+        self.retries = retries
+        self.attempt = 0
+        self.columns = columns # GETBULK columns to split the response into rows of. 0 = GET.
+
+class SnmpClient:
+    """
+    Object sending SNMPv2c GET and GETBULK requests to any number of
+    devices over a single non-blocking UDP socket, with the built-in codec
+    (snmpservice.polling.codec) in place of pysnmp's engine.
+
+    Requests are sent from the caller's thread and matched to responses
+    by request-id (and source address) on a daemon thread, which also
+    resends and times out requests on a TimeoutWheel, following each
+    target's timeout and retries. Any number of requests can be in flight.
+
+    Responses are handed back in the shapes pysnmp's hlapi callbacks use,
+    with raw OID tuples and native values (see codec.decode_response).
+    Only SNMPv2c is supported.
+
+    Keyword arguments:
+    resolution     : float : Seconds per TimeoutWheel tick. Default=0.01.
+    receive_buffer : int   : Socket receive buffer (SO_RCVBUF) in bytes. Default=4 MiB.
+
+    Methods:
+    get   : GET, returning a Future of (error_indication, error_status, error_index, var_binds).
+    bulk  : Single GETBULK, returning a Future of (error_indication, error_status, error_index, var_bind_table).
+    close : Stop the client thread and close its socket.
+    stats : Return client counters.
+    """
+    def __init__(self, resolution: float = 0.01, receive_buffer: int = 4 * 1024 * 1024):
+        self._resolution = max(0.001, resolution)
+        self._receive_buffer = receive_buffer
+        self._socket = None
+        self._wheel = None
+        self._pending = {} # request-id -> PendingRequest
+        self._request_id = randrange(1, 2**31 - 1)
+        self._lock = Lock()
+        self._running = False
+        self._thread = None
+        self._sent = 0
+        self._retried = 0
+        self._timeouts = 0
+        self._received = 0
+        self._unmatched = 0
+        self._malformed = 0
+
+    def _start(self):
+        # Lazily opens the socket and starts the client thread.
+        with self._lock:
+            if self._running:
+                return
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._receive_buffer)
+            except OSError as e:
+                logger.warning(f"[SnmpClient] Unable to set receive buffer: {e}")
+            sock.bind(("0.0.0.0", 0))
+            sock.setblocking(False)
+            self._socket = sock
+            self._wheel = TimeoutWheel(self._resolution)
+            self._running = True
+            self._thread = Thread(target=self._run, args=(sock,), name="SnmpClient", daemon=True)
+            self._thread.start()
+
+    def _next_request_id(self) -> int:
+        # Called with the lock held. Request-ids are 31-bit, skipping any still outstanding.
+        while True:
+            self._request_id = self._request_id % (2**31 - 1) + 1
+            if self._request_id not in self._pending:
+                return self._request_id
+
+    def _request(self, pdu_type: int, community: CommunityData, target: UdpTransportTarget,
+                 oids: list, max_repetitions: int = 0) -> Future:
+        if not self._running:
+            self._start()
+        future = Future()
+        address = target.transportAddr[:2]
+        with self._lock:
+            request_id = self._next_request_id()
+        packet = encode_request(pdu_type, request_id, community.communityName, oids, max_repetitions=max_repetitions)
+        pending = PendingRequest(future, address, packet, target.timeout, target.retries,
+                                 len(oids) if pdu_type == GET_BULK_REQUEST else 0)
+        with self._lock:
+            self._pending[request_id] = pending
+            self._wheel.schedule(monotonic() + pending.timeout, (request_id, 0))
+            self._sent += 1
+        self._send(pending)
+        return future
+
+    def _send(self, pending: PendingRequest):
+        # A failed send is treated as a lost datagram: the request is retried or times out.
+        try:
+            self._socket.sendto(pending.packet, pending.address)
+        except OSError as e:
+            logger.debug(f"[SnmpClient] Unable to send to {pending.address[0]}: {e}")
+
+    def get(self, community: CommunityData, target: UdpTransportTarget, oids: List) -> Future:
+        """
+        Sends an SNMP GET for oids (dotted strings or OID tuples).
+
+        Returns:
+        Future of (error_indication, error_status, error_index, var_binds),
+        where var_binds holds (OID tuple, native value) pairs.
+        """
+        return self._request(GET_REQUEST, community, target, oids)
+
+    def bulk(self, community: CommunityData, target: UdpTransportTarget, oids: List, max_repetitions: int) -> Future:
+        """
+        Sends a single SNMP GETBULK (no follow-up requests) for oids.
+
+        Returns:
+        Future of (error_indication, error_status, error_index, var_bind_table),
+        where var_bind_table holds rows of (OID tuple, native value) pairs.
+        """
+        return self._request(GET_BULK_REQUEST, community, target, oids, max_repetitions)
+
+    def _run(self, sock: socket.socket):
+        buffer = bytearray(MAX_DATAGRAM)
+        view = memoryview(buffer)
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        try:
+            while self._running:
+                if selector.select(self._resolution):
+                    self._receive(sock, buffer, view)
+                self._expire()
+        except Exception as e:
+            logger.critical(f"[SnmpClient] Client thread stopped. Error: {e}")
+        finally:
+            selector.close()
+            sock.close()
+            self._fail_pending()
+
+    def _receive(self, sock: socket.socket, buffer: bytearray, view: memoryview):
+        # Reads every queued datagram, resolving the requests they answer.
+        while True:
+            try:
+                size, address = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug(f"[SnmpClient] Receive error: {e}")
+                return
+            try:
+                request_id, error_status, error_index, var_binds = decode_response(view[:size])
+            except MalformedPDU as e:
+                with self._lock:
+                    self._malformed += 1
+                logger.debug(f"[SnmpClient] Malformed response from {address[0]}: {e}")
+                continue
+            with self._lock:
+                pending = self._pending.get(request_id)
+                if pending is None or pending.address != address[:2]:
+                    self._unmatched += 1
+                    continue
+                del self._pending[request_id]
+                self._received += 1
+            if pending.columns:
+                var_binds = [var_binds[row:row + pending.columns] for row in range(0, len(var_binds), pending.columns)]
+            self._resolve(pending.future, (None, error_status, error_index, var_binds))
+
+    def _expire(self):
+        # Resends, or times out, the requests whose current attempt has expired.
+        now = monotonic()
+        resend, timed_out = [], []
+        with self._lock:
+            for request_id, attempt in self._wheel.expire(now):
+                pending = self._pending.get(request_id)
+                if pending is None or pending.attempt != attempt:
+                    continue # Answered, or already resent.
+                if pending.attempt < pending.retries:
+                    pending.attempt += 1
+                    self._retried += 1
+                    self._wheel.schedule(now + pending.timeout, (request_id, pending.attempt))
+                    resend.append(pending)
+                else:
+                    del self._pending[request_id]
+                    self._timeouts += 1
+                    timed_out.append(pending)
+        for pending in resend:
+            self._send(pending)
+        for pending in timed_out:
+            self._resolve(pending.future, (requestTimedOut, ErrorStatus(0), 0, []))
+
+    def _fail_pending(self):
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+            self._running = False
+        for request in pending:
+            self._resolve(request.future, (requestTimedOut, ErrorStatus(0), 0, []))
+
+    @staticmethod
+    def _resolve(future: Future, result: tuple):
+        try:
+            future.set_result(result)
+        except InvalidStateError:
+            pass # Cancelled by the caller.
+
+    def close(self):
+        """Stops the client thread, timing out outstanding requests, and closes the socket."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        """Returns a dictionary of client counters."""
+        with self._lock:
+            return dict(
+                Outstanding=len(self._pending),
+                Sent=self._sent,
+                Retried=self._retried,
+                TimedOut=self._timeouts,
+                Received=self._received,
+                Unmatched=self._unmatched,
+                Malformed=self._malformed,
+            )
+
+snmp_client = SnmpClient(
+    resolution = settings.snmp_poll_client_resolution,
+    receive_buffer = settings.snmp_poll_client_receive_buffer,
+)
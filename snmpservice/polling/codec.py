@@ -0,0 +1,236 @@
+from snmpservice.utils.exceptions import *
+
+from typing import Iterable, List, Tuple
+
+# Minimal BER codec of the SNMPv2c messages a poller sends (GET, GETNEXT,
+# GETBULK) and receives (Response), for the native transport
+# (snmpservice.polling.client). Definite-length encodings only, as every
+# SNMP agent sends and as pysnmp's encoder produces.
+
+VERSION_2C = 1
+
+# PDU tags (context-specific, constructed).
+GET_REQUEST = 0xA0
+GET_NEXT_REQUEST = 0xA1
+RESPONSE = 0xA2
+GET_BULK_REQUEST = 0xA5
+
+# Universal tags.
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+
+# Application tags (RFC 2578).
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42 # Also Unsigned32
+TIME_TICKS = 0x43
+OPAQUE = 0x44
+COUNTER64 = 0x46
+
+# Exception values (RFC 3416), in place of a varbind's value.
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+ERROR_STATUSES = (
+    "noError", "tooBig", "noSuchName", "badValue", "readOnly", "genErr", "noAccess", "wrongType",
+    "wrongLength", "wrongEncoding", "wrongValue", "noCreation", "inconsistentValue", "resourceUnavailable",
+    "commitFailed", "undoFailed", "authorizationError", "notWritable", "inconsistentName"
+)
+
+class ErrorStatus(int):
+    """PDU error-status. An int whose str() is its name (e.g. 'tooBig'), like pysnmp's."""
+    def __str__(self) -> str:
+        return ERROR_STATUSES[self] if 0 <= self < len(ERROR_STATUSES) else int.__repr__(self)
+
+# Encoded OIDs, and decoded OID contents, memoized. Polls request and
+# receive the same OIDs over and over.
+OID_CACHE_SIZE = 65536
+_encoded_oids = {}
+_decoded_oids = {}
+
+### Encoding
+
+def _length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes((length,))
+    body = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes((0x80 | len(body),)) + body
+
+def _tlv(tag: int, content: bytes) -> bytes:
+    return bytes((tag,)) + _length(len(content)) + content
+
+def _integer(value: int) -> bytes:
+    # Minimal two's complement.
+    size = (value if value >= 0 else ~value).bit_length() // 8 + 1
+    return _tlv(INTEGER, value.to_bytes(size, "big", signed=True))
+
+def _arcs(oid) -> tuple:
+    if isinstance(oid, str):
+        return tuple(int(arc) for arc in oid.strip(".").split("."))
+    return tuple(oid)
+
+def _oid(oid) -> bytes:
+    # Returns the OBJECT IDENTIFIER TLV of oid (a dotted string or a sequence of arcs).
+    arcs = _arcs(oid)
+    try:
+        return _encoded_oids[arcs]
+    except KeyError:
+        pass
+    if len(arcs) < 2:
+        raise InvalidInput(f"OID {oid} has fewer than two arcs.")
+    content = bytearray()
+    for arc in (arcs[0] * 40 + arcs[1], *arcs[2:]):
+        if arc < 0x80:
+            content.append(arc)
+            continue
+        septets = []
+        while arc:
+            septets.append(arc & 0x7F | 0x80)
+            arc >>= 7
+        septets[0] &= 0x7F
+        content.extend(reversed(septets))
+    if len(_encoded_oids) >= OID_CACHE_SIZE:
+        _encoded_oids.clear()
+    encoded = _encoded_oids[arcs] = _tlv(OBJECT_IDENTIFIER, bytes(content))
+    return encoded
+
+def encode_request(pdu_type: int, request_id: int, community: str | bytes, oids: Iterable,
+                   non_repeaters: int = 0, max_repetitions: int = 0) -> bytes:
+    """
+    Encodes an SNMPv2c request message with a NULL value for every OID.
+
+    Positional arguments:
+    pdu_type   : int  : GET_REQUEST, GET_NEXT_REQUEST or GET_BULK_REQUEST.
+    request_id : int  : PDU request-id.
+    community  : str  : Community string.
+    oids       : list : OIDs, as dotted strings or sequences of arcs (tuples, ObjectName).
+
+    Keyword arguments:
+    non_repeaters   : int : GETBULK non-repeaters. Default=0.
+    max_repetitions : int : GETBULK max-repetitions. Default=0.
+
+    Returns:
+    message : bytes : BER encoded message.
+    """
+    if isinstance(community, str):
+        community = community.encode("latin-1")
+    varbinds = b"".join(_tlv(SEQUENCE, _oid(oid) + b"\x05\x00") for oid in oids)
+    if pdu_type == GET_BULK_REQUEST:
+        fields = _integer(non_repeaters) + _integer(max_repetitions)
+    else:
+        fields = b"\x02\x01\x00\x02\x01\x00" # error-status, error-index
+    pdu = _tlv(pdu_type, _integer(request_id) + fields + _tlv(SEQUENCE, varbinds))
+    return _tlv(SEQUENCE, _integer(VERSION_2C) + _tlv(OCTET_STRING, community) + pdu)
+
+### Decoding
+
+def _header(buffer: memoryview, position: int, end: int) -> Tuple[int, int, int]:
+    # Returns (tag, content start, content end) of the TLV at position.
+    if position + 2 > end:
+        raise MalformedPDU("Truncated TLV header.")
+    tag, length = buffer[position], buffer[position + 1]
+    position += 2
+    if length & 0x80:
+        octets = length & 0x7F
+        if not 0 < octets <= 4 or position + octets > end:
+            raise MalformedPDU("Unsupported or truncated length.")
+        length = int.from_bytes(buffer[position:position + octets], "big")
+        position += octets
+    if position + length > end:
+        raise MalformedPDU("TLV overruns its container.")
+    return tag, position, position + length
+
+def _expect(buffer: memoryview, position: int, end: int, tag: int) -> Tuple[int, int]:
+    found, start, stop = _header(buffer, position, end)
+    if found != tag:
+        raise MalformedPDU(f"Expected tag 0x{tag:02x}, found 0x{found:02x}.")
+    return start, stop
+
+def _decode_int(buffer: memoryview, start: int, stop: int) -> int:
+    return int.from_bytes(buffer[start:stop], "big", signed=True)
+
+def _decode_arcs(buffer: memoryview, start: int, stop: int) -> tuple:
+    key = bytes(buffer[start:stop])
+    try:
+        return _decoded_oids[key]
+    except KeyError:
+        pass
+    arcs, arc = [], 0
+    for octet in key:
+        arc = arc << 7 | octet & 0x7F
+        if not octet & 0x80:
+            arcs.append(arc)
+            arc = 0
+    if not arcs or arc:
+        raise MalformedPDU("Malformed OBJECT IDENTIFIER.")
+    first = arcs[0]
+    arcs[:1] = (first // 40, first % 40) if first < 80 else (2, first - 80)
+    if len(_decoded_oids) >= OID_CACHE_SIZE:
+        _decoded_oids.clear()
+    arcs = _decoded_oids[key] = tuple(arcs)
+    return arcs
+
+def _decode_value(tag: int, buffer: memoryview, start: int, stop: int) -> int | str | None:
+    # Native value of a varbind value, as snmpservice.polling.objects.base.decode_value returns
+    # for the pysnmp type, except that empty strings stay "" rather than None.
+    if tag == INTEGER:
+        return int.from_bytes(buffer[start:stop], "big", signed=True)
+    if tag in (COUNTER32, GAUGE32, TIME_TICKS, COUNTER64):
+        return int.from_bytes(buffer[start:stop], "big")
+    if tag in (OCTET_STRING, OPAQUE):
+        return str(buffer[start:stop], "latin-1")
+    if tag == IP_ADDRESS:
+        return ".".join(map(str, buffer[start:stop]))
+    if tag == OBJECT_IDENTIFIER:
+        return ".".join(map(str, _decode_arcs(buffer, start, stop)))
+    if tag in (NULL, NO_SUCH_OBJECT, NO_SUCH_INSTANCE, END_OF_MIB_VIEW):
+        return None
+    # Any other type (e.g. a vendor application tag): its content octets as text,
+    # rather than dropping the whole response.
+    return str(buffer[start:stop], "latin-1")
+
+def decode_response(data: bytes | bytearray | memoryview) -> Tuple[int, ErrorStatus, int, List[tuple]]:
+    """
+    Decodes an SNMPv2c Response message.
+
+    Positional arguments:
+    data : bytes or memoryview : Received datagram. Not copied.
+
+    Returns:
+    (request_id, error_status, error_index, varbinds), where varbinds is a
+    list of (OID tuple of arcs, value) pairs. Values are native: ints,
+    strings (OctetString as text, IpAddress dotted-quad, OBJECT IDENTIFIER
+    dotted), and None for NULL, noSuchObject, noSuchInstance and endOfMibView.
+    Values of any other type are their content octets, as text.
+
+    Raises:
+    MalformedPDU : The datagram is not a well-formed SNMPv2c Response.
+    """
+    buffer = memoryview(data)
+    start, end = _expect(buffer, 0, len(buffer), SEQUENCE)
+    start, stop = _expect(buffer, start, end, INTEGER)
+    if _decode_int(buffer, start, stop) != VERSION_2C:
+        raise MalformedPDU("Not an SNMPv2c message.")
+    _, stop = _expect(buffer, stop, end, OCTET_STRING)
+    start, end = _expect(buffer, stop, end, RESPONSE)
+
+    start, stop = _expect(buffer, start, end, INTEGER)
+    request_id = _decode_int(buffer, start, stop)
+    start, stop = _expect(buffer, stop, end, INTEGER)
+    error_status = ErrorStatus(_decode_int(buffer, start, stop))
+    start, stop = _expect(buffer, stop, end, INTEGER)
+    error_index = _decode_int(buffer, start, stop)
+
+    position, end = _expect(buffer, stop, end, SEQUENCE)
+    varbinds = []
+    while position < end:
+        start, position = _expect(buffer, position, end, SEQUENCE)
+        start, stop = _expect(buffer, start, position, OBJECT_IDENTIFIER)
+        oid = _decode_arcs(buffer, start, stop)
+        tag, start, stop = _header(buffer, stop, position)
+        varbinds.append((oid, _decode_value(tag, buffer, start, stop)))
+    return request_id, error_status, error_index, varbinds
@@ -0,0 +1,124 @@
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Dict, Iterable, Set, Tuple
+
+class StaticGroup:
+    """Cached poll responses for one group of static columns."""
+    def __init__(self, marker, responses: dict, refreshed: float):
+        self.marker = marker
+        self.responses = responses
+        self.refreshed = refreshed
+
+class StaticColumnCache:
+    """
+    Object caching, per device, the poll responses of columns that rarely
+    change (names, descriptions, neighbours...) so that steady-state polls
+    only fetch volatile columns.
+
+    Static columns are split into named groups. A group is re-walked when:
+    - the device has not been seen before, or sysUpTime shows it rebooted,
+    - its change marker (e.g. ifTableLastChange) differs from the value
+      read when the group was last walked, or the agent does not report it,
+    - it was last walked more than 'max_age' seconds ago.
+
+    Devices are evicted least-recently-polled beyond 'max_devices'.
+
+    Positional arguments:
+    max_age     : float : Longest time a group is served from cache.
+    max_devices : int   : Devices held.
+
+    Methods:
+    has   : Is anything cached for a device?
+    plan  : Decide which groups must be re-walked, returning the rest.
+    store : Record a poll's markers and freshly walked groups.
+    stats : Return cache counters.
+    """
+    def __init__(self, max_age: float, max_devices: int):
+        self._max_age = max_age
+        self._max_devices = max(1, max_devices)
+        self._devices = OrderedDict() # device -> (sysUpTime, {group: StaticGroup})
+        self._lock = Lock()
+        self._reused = 0
+        self._refreshed = 0
+
+    def has(self, device: tuple) -> bool:
+        """Is anything cached for device?"""
+        with self._lock:
+            return device in self._devices
+
+    def plan(self, device: tuple, uptime: int | None, markers: Dict[str, object],
+             groups: Iterable[str]) -> Tuple[Set[str], dict]:
+        """
+        Decides which static groups of device must be re-walked.
+
+        Positional arguments:
+        device  : tuple : Device key.
+        uptime  : int   : sysUpTime just read from the device, or None.
+        markers : dict  : Group -> change marker just read from the device
+                          (None if unsupported). Groups without a marker
+                          are absent.
+        groups  : list  : Every static group name.
+
+        Returns:
+        (stale, cached) : Set of groups to re-walk, and the cached poll
+                          responses (poll object -> response) of every
+                          other group.
+        """
+        groups = set(groups)
+        now = monotonic()
+        with self._lock:
+            entry = self._devices.get(device)
+            if entry is None:
+                return groups, {}
+            last_uptime, cached_groups = entry
+            if uptime is None or last_uptime is None or uptime < last_uptime:
+                logger.debug(f"[StaticColumnCache] {device[0]} rebooted or sysUpTime unknown. Re-walking static columns.")
+                self._refreshed += len(groups)
+                return groups, {}
+
+            stale, cached = set(), {}
+            for group in groups:
+                cached_group = cached_groups.get(group)
+                if (cached_group is None
+                        or now - cached_group.refreshed > self._max_age
+                        or (group in markers and (markers[group] is None or markers[group] != cached_group.marker))):
+                    stale.add(group)
+                else:
+                    cached.update(cached_group.responses)
+            self._refreshed += len(stale)
+            self._reused += len(groups) - len(stale)
+            return stale, cached
+
+    def store(self, device: tuple, uptime: int | None, markers: Dict[str, object],
+              group_responses: Dict[str, dict]):
+        """
+        Records device's latest sysUpTime, along with the responses of each
+        freshly walked group and the change markers read before walking it.
+        """
+        now = monotonic()
+        with self._lock:
+            _, cached_groups = self._devices.get(device, (None, {}))
+            for group, responses in group_responses.items():
+                cached_groups[group] = StaticGroup(markers.get(group), responses, now)
+            self._devices[device] = (uptime, cached_groups)
+            self._devices.move_to_end(device)
+            while len(self._devices) > self._max_devices:
+                self._devices.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Returns a dictionary of cache counters."""
+        with self._lock:
+            return dict(
+                Devices=len(self._devices),
+                GroupsReused=self._reused,
+                GroupsRefreshed=self._refreshed
+            )
+
+static_columns = StaticColumnCache(
+    max_age = settings.snmp_poll_static_max_age,
+    max_devices = settings.snmp_poll_static_max_devices,
+)
@@ -0,0 +1,151 @@
+from snmpservice.utils.logger import logger
+from snmpservice.utils.exceptions import *
+from snmpservice.utils.metrics import record_snmp_request
+from snmpservice.polling.client import snmp_client
+from snmpservice.settings import settings
+
+from pysnmp.hlapi import SnmpEngine, CommunityData, UdpTransportTarget, ContextData
+from pysnmp.hlapi.asyncore.cmdgen import getCmd as get_cmd_async, bulkCmd as bulk_cmd_async
+from pysnmp.carrier.asyncore.dispatch import AsyncoreDispatcher
+from pysnmp.carrier.asyncore.dgram import udp
+from pysnmp.proto.rfc1902 import ObjectName
+from pysnmp.entity import config
+from pyasn1.type.univ import Null
+from collections import deque
+from threading import Thread, Lock
+from typing import List, Tuple
+import asyncio
+
+# Seconds between drains of the submission queue. Bounds the latency a
+# request waits before the dispatcher thread sends it. 0.01 is the finest
+# resolution pysnmp's transport dispatcher accepts.
+TIMER_RESOLUTION = 0.01
+
+class SnmpDispatcher:
+    """
+    Object running a single long-lived SnmpEngine on a dedicated daemon
+    thread, and exposing its GET/GETBULK commands as awaitables so that
+    asyncio code can have any number of SNMP requests in flight without
+    holding a thread per request.
+
+    SnmpEngine is not thread-safe, so requests are never sent from the
+    caller's thread: they are queued, and the dispatcher thread drains the
+    queue on every timer tick. Responses (and timeouts, which the engine
+    handles itself) resolve the caller's future on the caller's event loop.
+
+    pysnmp's own asyncio hlapi is built on asyncio.coroutine, which no
+    longer exists on Python 3.11+, hence driving the asyncore hlapi here.
+
+    With the native transport (settings.snmp_poll_transport), requests
+    are sent by the shared SnmpClient instead, and var_binds hold
+    (OID tuple, native value) pairs.
+
+    Methods:
+    get  : Awaitable SNMP GET.
+    bulk : Awaitable single SNMP GETBULK.
+    """
+    def __init__(self):
+        self._engine = None
+        self._requests = deque()
+        self._lock = Lock()
+
+    def _start(self):
+        # Lazily builds the engine and starts the dispatcher thread.
+        with self._lock:
+            if self._engine is not None:
+                return
+            engine = SnmpEngine()
+            dispatcher = AsyncoreDispatcher()
+            dispatcher.setTimerResolution(TIMER_RESOLUTION)
+            engine.registerTransportDispatcher(dispatcher)
+            # Open the UDP client transport up front. An asyncore loop with no
+            # sockets to poll would otherwise spin rather than sleep.
+            config.addTransport(engine, udp.domainName, udp.UdpTransport().openClientMode())
+            dispatcher.registerTimerCbFun(self._drain)
+            dispatcher.jobStarted(1) # Keep the dispatcher running while idle.
+            self._engine = engine
+            Thread(target=self._run, args=(engine,), name="SnmpDispatcher", daemon=True).start()
+
+    def _run(self, engine: SnmpEngine):
+        try:
+            logger.info("Running SNMP poll dispatcher...")
+            engine.transportDispatcher.runDispatcher()
+        except Exception as e:
+            logger.critical(f"SNMP poll dispatcher stopped. Error: {e}")
+        finally:
+            engine.transportDispatcher.closeDispatcher()
+            with self._lock:
+                self._engine = None
+
+    def _drain(self, time_now: float):
+        # Runs on the dispatcher thread. Sends every queued request.
+        while self._requests:
+            command, args, future, loop = self._requests.popleft()
+            try:
+                command(self._engine, *args, cbFun=self._callback, cbCtx=(future, loop), lookupMib=False)
+            except Exception as e:
+                self._resolve(future, loop, exception=e)
+
+    @staticmethod
+    def _callback(snmp_engine, send_request_handle, error_indication, error_status, error_index, var_binds, cb_ctx):
+        future, loop = cb_ctx
+        SnmpDispatcher._resolve(future, loop, result=(error_indication, error_status, error_index, var_binds))
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, loop: asyncio.AbstractEventLoop, result=None, exception=None):
+        # Hands the outcome back to the future's own event loop.
+        def _set():
+            if future.done():
+                return
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        loop.call_soon_threadsafe(_set)
+
+    def _submit(self, command, *args) -> asyncio.Future:
+        if self._engine is None:
+            self._start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._requests.append((command, args, future, loop))
+        return future
+
+    async def get(self, community: CommunityData, target: UdpTransportTarget, oids: List[str]) -> Tuple:
+        """
+        Performs an SNMP GET for oids.
+
+        Returns:
+        (error_indication, error_status, error_index, var_binds), where
+        var_binds holds raw (ObjectName, value) pairs.
+        """
+        if settings.snmp_poll_transport == "native":
+            result = await asyncio.wrap_future(snmp_client.get(community, target, oids))
+        else:
+            result = await self._submit(
+                get_cmd_async, community, target, ContextData(),
+                *[(ObjectName(oid), Null('')) for oid in oids]
+            )
+        record_snmp_request(target.transportAddr[0], result[0])
+        return result
+
+    async def bulk(self, community: CommunityData, target: UdpTransportTarget,
+                   oids: List[ObjectName], max_repetitions: int) -> Tuple:
+        """
+        Performs a single SNMP GETBULK (no follow-up requests) for oids.
+
+        Returns:
+        (error_indication, error_status, error_index, var_bind_table), where
+        var_bind_table holds rows of raw (ObjectName, value) pairs.
+        """
+        if settings.snmp_poll_transport == "native":
+            result = await asyncio.wrap_future(snmp_client.bulk(community, target, oids, max_repetitions))
+        else:
+            result = await self._submit(
+                bulk_cmd_async, community, target, ContextData(), 0, max_repetitions,
+                *[(ObjectName(oid), Null('')) for oid in oids]
+            )
+        record_snmp_request(target.transportAddr[0], result[0])
+        return result
+
+snmp_dispatcher = SnmpDispatcher()
@@ -0,0 +1,158 @@
+from snmpservice.utils.logger import logger
+from snmpservice.utils.exceptions import *
+from snmpservice.settings import settings
+
+from pysnmp.hlapi import SnmpEngine
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+from threading import Lock
+
+class PooledEngine:
+    """
+    Object wrapping a long-lived SnmpEngine along with the bookkeeping
+    the pool needs to decide when the engine should be recycled.
+
+    Positional arguments:
+    engine : SnmpEngine : Engine owned by this wrapper.
+    """
+    def __init__(self, engine: SnmpEngine):
+        self.engine = engine
+        self.uses = 0
+
+    def is_healthy(self, max_uses: int) -> bool:
+        """
+        Is the wrapped engine fit to be handed out again?
+
+        An engine is unhealthy once it has served max_uses commands
+        (each distinct target/community adds entries to the engine's
+        local configuration datastore, so this bounds its growth) or if its
+        transport dispatcher has been left with jobs pending by an
+        interrupted command.
+        """
+        if max_uses and self.uses >= max_uses:
+            return False
+        dispatcher = self.engine.transportDispatcher
+        return not (dispatcher is not None and dispatcher.jobsArePending())
+
+    def close(self):
+        """Closes the engine's transport dispatcher, releasing its sockets."""
+        dispatcher = self.engine.transportDispatcher
+        if dispatcher is not None:
+            dispatcher.closeDispatcher()
+
+class SnmpEnginePool:
+    """
+    Object representing a bounded pool of long-lived SnmpEngine objects
+    that poll objects borrow for the lifetime of an SNMP command.
+
+    SnmpEngine is not safe to share between threads, so an engine is only
+    ever lent to one borrower at a time. Engines are built lazily up to
+    'size', and are recycled (closed and replaced) when they stop passing
+    PooledEngine.is_healthy or when a command run on them fails unexpectedly.
+
+    Positional arguments:
+    size     : int   : Maximum number of engines held by the pool.
+    max_uses : int   : Commands served before an engine is recycled. 0 = never.
+    timeout  : float : Seconds to wait for an engine when all are borrowed.
+
+    Methods:
+    borrow : Context manager lending an SnmpEngine from the pool.
+    close  : Closes every idle engine held by the pool.
+    stats  : Returns a dictionary of pool counters.
+    """
+    def __init__(self, size: int, max_uses: int = 0, timeout: float = 30.0):
+        if size < 1:
+            raise InvalidInput("SnmpEnginePool size must be at least 1.")
+        self._size = size
+        self._max_uses = max_uses
+        self._timeout = timeout
+        self._idle = LifoQueue()
+        self._lock = Lock()
+        self._created = 0
+        self._recycled = 0
+
+    def _acquire(self) -> PooledEngine:
+        # Prefer an idle engine. LIFO keeps the most recently used engines warm.
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        # Build a new engine if the pool has not reached its bound.
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                logger.debug(f"[SnmpEnginePool] Creating engine {self._created}/{self._size}.")
+                return PooledEngine(SnmpEngine())
+
+        # Pool exhausted. Wait for another borrower to return an engine.
+        try:
+            return self._idle.get(timeout=self._timeout)
+        except Empty:
+            raise UnexpectedSNMPPollError(f"No SnmpEngine became available within {self._timeout}s.")
+
+    def _release(self, pooled: PooledEngine, healthy: bool):
+        if healthy and pooled.is_healthy(self._max_uses):
+            self._idle.put(pooled)
+            return
+
+        # Recycle: close the engine, and replace it with a fresh one.
+        logger.debug(f"[SnmpEnginePool] Recycling engine after {pooled.uses} uses.")
+        try:
+            pooled.close()
+        except Exception as e:
+            logger.error(f"[SnmpEnginePool] Error closing recycled engine: {e}")
+        with self._lock:
+            self._recycled += 1
+        self._idle.put(PooledEngine(SnmpEngine()))
+
+    @contextmanager
+    def borrow(self):
+        """
+        Lends an SnmpEngine for the duration of the with-block.
+
+        Usage:
+        with engine_pool.borrow() as engine:
+            ...
+
+        Errors raised by the with-block propagate to the caller. Expected
+        poll failures (DeviceUnreachable, InvalidInput) return the engine
+        to the pool, any other error causes the engine to be recycled.
+        """
+        pooled = self._acquire()
+        healthy = False
+        try:
+            pooled.uses += 1
+            yield pooled.engine
+            healthy = True
+        except (DeviceUnreachable, InvalidInput):
+            healthy = True
+            raise
+        finally:
+            self._release(pooled, healthy)
+
+    def close(self):
+        """Closes every idle engine held by the pool."""
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except Empty:
+                break
+            pooled.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self) -> dict:
+        """Returns a dictionary of pool counters."""
+        return dict(
+            Size=self._size,
+            Created=self._created,
+            Idle=self._idle.qsize(),
+            Recycled=self._recycled
+        )
+
+engine_pool = SnmpEnginePool(
+    size = settings.snmp_poll_engine_pool_size,
+    max_uses = settings.snmp_poll_engine_max_uses,
+    timeout = settings.snmp_poll_engine_pool_timeout,
+)
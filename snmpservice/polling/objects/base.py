@@ -1,19 +1,35 @@
 from snmpservice.utils.models.polling import *
 from snmpservice.utils.logger import logger
 from snmpservice.utils.exceptions import *
+from snmpservice.polling.engine import engine_pool
+from snmpservice.polling.bulksize import bulk_sizer
+from snmpservice.polling.dispatcher import snmp_dispatcher
+from snmpservice.polling.client import snmp_client
+from snmpservice.settings import settings
+from snmpservice.utils.metrics import poll_object_duration, record_snmp_request
+from functools import wraps
+from time import perf_counter
 from typing import Union, List, Tuple
+import asyncio
 from pysnmp.hlapi import (
     SnmpEngine, CommunityData, UdpTransportTarget, ContextData, 
     ObjectIdentity, ObjectType, bulkCmd, getCmd
 )
+from pysnmp.proto import rfc1902, rfc1905
+from pysnmp.proto.rfc1902 import ObjectName
+from pyasn1.type import univ
 
-def snmp_get(_, community: CommunityData, target: UdpTransportTarget, oid: ObjectType) -> getCmd:
-    """Creates an SNMP GET command generator."""
-    return getCmd(SnmpEngine(), community, target, ContextData(), oid)
+def snmp_get(_, engine: SnmpEngine, community: CommunityData, target: UdpTransportTarget, oid: ObjectType) -> getCmd:
+    """Creates an SNMP GET command generator running on the given engine."""
+    return getCmd(engine, community, target, ContextData(), oid)
 
-def snmp_bulk_get(_, community: CommunityData, target: UdpTransportTarget, oid: ObjectType) -> bulkCmd:
-    """Creates an SNMP BULKGET command generator."""
-    return bulkCmd(SnmpEngine(), community, target, ContextData(), 1, 5, oid, lexicographicMode=False)
+def snmp_bulk_get(_, engine: SnmpEngine, community: CommunityData, target: UdpTransportTarget, oid: ObjectType) -> bulkCmd:
+    """
+    Creates an SNMP BULKGET command generator running on the given engine.
+    Max-repetitions is the smallest value the shared AdaptiveBulkSizer has learned for the device.
+    """
+    max_repetitions = bulk_sizer.get_for_device(target.transportAddr[0])
+    return bulkCmd(engine, community, target, ContextData(), 0, max_repetitions, oid, lexicographicMode=False)
 
 def to_object_type(obj_identity: str | ObjectIdentity) -> ObjectType | None:
     """Given an OID string or ObjectIdentity, returns the corresponding ObjectType."""
@@ -40,15 +56,103 @@ def extract_varbinds(cmd_gen: Union[getCmd, bulkCmd]) -> List[ObjectType]:
         extracted_varbinds.extend(varbinds)
     return extracted_varbinds
 
+def _decode_integer(value) -> int:
+    return int(value)
+
+def _decode_octets(value) -> str | None:
+    # Text as str() produced it (one character per octet). Empty strings are treated as absent.
+    return value.asOctets().decode("latin-1") or None
+
+def _decode_ip_address(value) -> str:
+    return ".".join(map(str, value.asNumbers()))
+
+def _decode_object_identifier(value) -> str:
+    return ".".join(map(str, value.asTuple()))
+
+def _decode_absent(_) -> None:
+    return None
+
+def _decode_native(value) -> int | str | None:
+    # Values decoded already, e.g. by snmpservice.polling.codec.
+    return None if value == "" else value
+
+def _decode_other(value) -> int | str | None:
+    # Values of any other ASN.1 type: an integer if the text is one, else the text.
+    value = str(value)
+    try:
+        return int(value)
+    except ValueError:
+        return value or None
+
+# ASN.1 tag set -> decoder of values with that tag set into native values.
+# Keyed on tag sets rather than classes, so MIB-resolved subclasses
+# (DisplayString, TimeStamp, PhysAddress...) share their base type's decoder.
+VALUE_DECODERS = {
+    rfc1902.Integer32.tagSet: _decode_integer,
+    rfc1902.Counter32.tagSet: _decode_integer,
+    rfc1902.Counter64.tagSet: _decode_integer,
+    rfc1902.Gauge32.tagSet: _decode_integer, # Also Unsigned32
+    rfc1902.TimeTicks.tagSet: _decode_integer,
+    rfc1902.OctetString.tagSet: _decode_octets, # Also Bits
+    rfc1902.Opaque.tagSet: _decode_octets,
+    rfc1902.IpAddress.tagSet: _decode_ip_address,
+    rfc1902.ObjectName.tagSet: _decode_object_identifier,
+    univ.Null.tagSet: _decode_absent,
+    rfc1905.NoSuchObject.tagSet: _decode_absent,
+    rfc1905.NoSuchInstance.tagSet: _decode_absent,
+    rfc1905.EndOfMibView.tagSet: _decode_absent,
+    None: _decode_native, # Not ASN.1
+}
+
+# OID tuple -> dotted string. Table walks return the same OIDs on every
+# poll, and for every device of a model, so formatting each is done once.
+OID_STRING_CACHE_SIZE = 65536
+_oid_strings = {}
+
+def oid_to_string(oid: ObjectName | ObjectIdentity | tuple | str) -> str:
+    """Returns an OID (or a tuple of its arcs) in dotted notation, as str(oid) does."""
+    if isinstance(oid, ObjectIdentity):
+        oid = oid.getOid()
+    if isinstance(oid, univ.ObjectIdentifier):
+        key = oid.asTuple()
+    elif isinstance(oid, tuple):
+        key = oid
+    else:
+        return str(oid)
+    try:
+        return _oid_strings[key]
+    except KeyError:
+        if len(_oid_strings) >= OID_STRING_CACHE_SIZE:
+            _oid_strings.clear()
+        string = _oid_strings[key] = ".".join(map(str, key))
+        return string
+
+def decode_value(value) -> int | str | None:
+    """
+    Decodes an SNMP value into a native value, dispatching on its ASN.1 type.
+
+    Positional arguments:
+    value : pysnmp value : Value of a varbind. Values decoded already
+                           (by snmpservice.polling.codec) pass through.
+
+    Returns:
+    int  : Integer, Counter32/64, Gauge32/Unsigned32 and TimeTicks values.
+    str  : OctetString values as text, IpAddress values in dotted-quad notation
+           and ObjectIdentifier values in dotted notation.
+    None : noSuchObject, noSuchInstance, endOfMibView, Null and empty OctetString values.
+    """
+    return VALUE_DECODERS.get(getattr(value, "tagSet", None), _decode_other)(value)
+
 def unpack_varbind(varbind: ObjectType) -> tuple:
     """
     Unpacks a varbind object (ObjectType) and returns the contained values.
+    Values are decoded by decode_value.
 
     Positional arguments:
-    varbind : ObjectType : Varbinds to unpack
+    varbind : ObjectType, (ObjectName, value) or (OID tuple, native value) tuple : Varbinds to unpack
 
     Returns:
-    tuple : String (oid, value) pair, or (None, None) 
+    tuple : (oid string, value) pair, or (None, None) 
             if any values are errored or empty.
 
     Example varbind:
@@ -65,17 +169,42 @@ def unpack_varbind(varbind: ObjectType) -> tuple:
     )
     returns ("1.3.6.1.2.1.2.2.1.1.3", 3)
     """
-    if isinstance(varbind, ObjectType):
+    if isinstance(varbind, (ObjectType, tuple)):
         oid, value = varbind
-        try:
-            value = int(str(value))
-        except ValueError:
-            value = str(value)
-        if isinstance(value, str) and (value.lower().startswith("no such") or value == ""):
+        # decode_value, inlined.
+        value = VALUE_DECODERS.get(getattr(value, "tagSet", None), _decode_other)(value)
+        if value is None:
             return None, None
-        return str(oid), value
+        return oid_to_string(oid), value
     return None, None
 
+def count_requests(device: str, cmd_gen: Union[getCmd, bulkCmd]):
+    """Passes through the responses of a getCmd or bulkCmd object, counting each request sent to device."""
+    for response in cmd_gen:
+        record_snmp_request(device, response[0])
+        yield response
+
+def timed(method):
+    """Decorator recording a poll object method's duration, sync or async, labelled with the poll object."""
+    if asyncio.iscoroutinefunction(method):
+        @wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            start = perf_counter()
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                poll_object_duration.observe(perf_counter() - start, self.__class__.__name__)
+        return async_wrapper
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            poll_object_duration.observe(perf_counter() - start, self.__class__.__name__)
+    return wrapper
+
 def extract_and_unpack_varbinds(cmd_gen: Union[getCmd, bulkCmd]) -> List[Tuple[str, str]]:
     """Calls extract_varbinds, followed by unpack_varbind for each varbind."""
     return [vb for varbind in extract_varbinds(cmd_gen) 
@@ -95,12 +224,14 @@ class BasePollObject:
                         e.g. snmp_get or snmp_bulk_get
     
     Methods:
-    retrieve   : Main method of the class, which should be used to 
-                retrieve and parse data.
+    retrieve       : Main method of the class, which should be used to 
+                     retrieve and parse data.
+    retrieve_async : Asyncio counterpart of retrieve.
     """
     OID = (None,) 
     SNMP_CMD = None # snmp_get or snmp_bulk_get from this module
 
+    @timed
     def retrieve(self, target: UdpTransportTarget, community: CommunityData) -> dict | None:
         """
         Method to perform SNMP poll using self.OID, returning poll output.
@@ -119,19 +250,73 @@ class BasePollObject:
         """
         response = {"varbinds": []}
         for oid_index, oid in enumerate(self.OID):
-            # Get the ObjectType object for self.OID
-            oid_obj = to_object_type(oid)
+            if settings.snmp_poll_transport == "native":
+                varbinds = self._retrieve_native(oid, target, community)
+            else:
+                varbinds = self._retrieve_pysnmp(oid, target, community)
 
-            # Run SNMP CMD
+            if not varbinds:
+                # If there are more OIDs to try, continue. Else, fail.
+                if oid_index < len(self.OID)-1:
+                    continue
+                logger.error(f'[{self.__class__.__name__}] Poll task failed to yield any varbinds.')
+                return None
+
+            return self.process(varbinds)
+
+        # Return data
+        return response
+
+    def _retrieve_pysnmp(self, oid: str, target: UdpTransportTarget, community: CommunityData) -> List[Tuple[str, str]]:
+        # Runs self.SNMP_CMD for oid on a pysnmp engine, returning the unpacked varbinds.
+        # Get the ObjectType object for oid
+        oid_obj = to_object_type(oid)
+
+        # Run SNMP CMD on an engine borrowed from the shared pool.
+        # The command generator is lazy, so the engine must stay
+        # borrowed until the varbinds have been extracted.
+        with engine_pool.borrow() as engine:
             logger.debug(f"[{self.__class__.__name__}] Creating SNMP command gen...")
-            cmd_gen = self.SNMP_CMD(community, target, oid_obj)
+            cmd_gen = self.SNMP_CMD(engine, community, target, oid_obj)
             if cmd_gen is None:
                 logger.debug(f"[{self.__class__.__name__}] cmd_gen is None.")
                 raise UnexpectedSNMPPollError(f"{self.__class__.__name__} cmd_gen is None")
+            cmd_gen = count_requests(target.transportAddr[0], cmd_gen)
 
             logger.debug(f"[{self.__class__.__name__}] Extracting and unpacking data...")
             try:
-                varbinds = extract_and_unpack_varbinds(cmd_gen)
+                return extract_and_unpack_varbinds(cmd_gen)
+            except Exception as e:
+                raise DeviceUnreachable(f"Device is unreachable. (Raw error: {type(e)} {e}")
+
+    def _retrieve_native(self, oid: str, target: UdpTransportTarget, community: CommunityData) -> List[Tuple[str, str]]:
+        # Counterpart of _retrieve_pysnmp on the native transport (snmpservice.polling.client).
+        # GETBULK objects walk oid's subtree, as bulkCmd does, through the column walker.
+        if self.__class__.SNMP_CMD is snmp_bulk_get:
+            from snmpservice.polling.walker import walk_columns
+            return walk_columns(target, community, [oid])[oid]
+
+        result = snmp_client.get(community, target, [oid]).result()
+        record_snmp_request(target.transportAddr[0], result[0])
+        try:
+            return extract_and_unpack_varbinds([result])
+        except Exception as e:
+            raise DeviceUnreachable(f"Device is unreachable. (Raw error: {type(e)} {e}")
+
+    @timed
+    async def retrieve_async(self, target: UdpTransportTarget, community: CommunityData) -> dict | None:
+        """
+        Asyncio counterpart of retrieve for objects polled with snmp_get.
+        Requests are sent through the shared SnmpDispatcher, so no thread
+        is held while awaiting the response.
+
+        Raises:
+        DeviceUnreachable : Raised when the poll request timeout occurs.
+        """
+        for oid_index, oid in enumerate(self.OID):
+            result = await snmp_dispatcher.get(community, target, [oid])
+            try:
+                varbinds = extract_and_unpack_varbinds([result])
             except Exception as e:
                 raise DeviceUnreachable(f"Device is unreachable. (Raw error: {type(e)} {e}")
 
@@ -142,18 +327,34 @@ class BasePollObject:
                 logger.error(f'[{self.__class__.__name__}] Poll task failed to yield any varbinds.')
                 return None
 
-            logger.debug(f"[{self.__class__.__name__}] Parsing varbinds...")
-            varbinds = self.parse(varbinds)
+            return self.process(varbinds)
+        return None
 
-            # Add varbinds to response
-            if isinstance(varbinds, (list, tuple)):
-                for varbind in varbinds:
-                    response["varbinds"].append(varbind)
-            else:
-                response["varbinds"].append(varbinds)
-            break
+    def process(self, varbinds: list) -> dict | None:
+        """
+        Parses unpacked (oid, value) varbinds with self.parse and wraps the
+        output in the response format returned by retrieve.
 
-        # Return data
+        Used by retrieve, and by callers that fetched the varbinds for this
+        poll object themselves (e.g. snmpservice.polling.walker).
+
+        Returns:
+        PollObjectResponse, or None if varbinds is empty.
+        """
+        if not varbinds:
+            logger.error(f'[{self.__class__.__name__}] Poll task failed to yield any varbinds.')
+            return None
+
+        response = {"varbinds": []}
+        logger.debug(f"[{self.__class__.__name__}] Parsing varbinds...")
+        varbinds = self.parse(varbinds)
+
+        # Add varbinds to response
+        if isinstance(varbinds, (list, tuple)):
+            for varbind in varbinds:
+                response["varbinds"].append(varbind)
+        else:
+            response["varbinds"].append(varbinds)
         return response
 
     def parse(self, varbinds: list) -> dict:
@@ -13,6 +13,17 @@ class HostName(BasePollObject):
                 return dict(OID=oid, value=value)
         return dict(OID=None, value=None)
 
+class SysUpTime(BasePollObject):
+    OID = ("1.3.6.1.2.1.1.3.0",)
+    SNMP_CMD = snmp_get
+
+    def parse(self, varbinds: list) -> dict:
+        # Parse varbinds to find sysUpTime (centiseconds since the agent started).
+        for oid, value in varbinds:
+            if any(oid == OID for OID in self.OID):
+                return dict(OID=oid, value=value)
+        return dict(OID=None, value=None)
+
 class DeviceModel(BasePollObject):
     OID = (
         "1.3.6.1.2.1.47.1.1.1.1.13.1", # Where Model should be
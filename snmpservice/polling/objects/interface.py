@@ -1,9 +1,16 @@
-from snmpservice.polling.objects.base import BasePollObject, snmp_bulk_get
-from pysnmp.hlapi import ObjectIdentity
+from snmpservice.polling.objects.base import BasePollObject, snmp_bulk_get, snmp_get
+from pysnmp.hlapi import ObjectIdentity, UdpTransportTarget, CommunityData
 
 class InterfacePollTask(BasePollObject):
     SNMP_CMD = snmp_bulk_get
 
+    async def retrieve_async(self, target: UdpTransportTarget, community: CommunityData) -> dict | None:
+        """Asyncio counterpart of retrieve. Walks self.OID[0] as a single table column."""
+        # Imported here: the walker imports this package.
+        from snmpservice.polling.walker import walk_columns_async
+        rows = await walk_columns_async(target, community, [self.OID[0]])
+        return self.process(rows[self.OID[0]])
+
     def extract_intf_index_from_oid(self, oid:ObjectIdentity, oid_index:int=-1) -> int | None:
         """
         Convenience method that attempts to get the interface
@@ -82,3 +89,14 @@ class IfHCInOctets(InterfacePollTask):
 
 class IfHCOutOctets(InterfacePollTask):
     OID = ("1.3.6.1.2.1.31.1.1.1.10",)
+
+class IfTableLastChange(BasePollObject):
+    # Change marker: sysUpTime at the last ifTable/ifXTable row creation or deletion.
+    OID = ("1.3.6.1.2.1.31.1.5.0",)
+    SNMP_CMD = snmp_get
+
+    def parse(self, varbinds: list) -> dict:
+        for oid, value in varbinds:
+            if any(oid == OID for OID in self.OID):
+                return dict(OID=oid, value=value)
+        return dict(OID=None, value=None)
@@ -1,4 +1,4 @@
-from snmpservice.polling.objects.interface import InterfacePollTask, snmp_bulk_get
+from snmpservice.polling.objects.interface import BasePollObject, InterfacePollTask, snmp_bulk_get, snmp_get
 
 class LldpPollTask(InterfacePollTask):
     SNMP_CMD = snmp_bulk_get
@@ -34,3 +34,14 @@ class LldpRemHostIpAddr(LldpPollTask):
                 ifindex = self.extract_intf_index_from_oid(oid, oid_index=-8)
                 response_varbinds.append(dict(OID=oid, value=ip_addr, IfIndex=ifindex))
         return [dict(OID=None, value=None)] if not response_varbinds else response_varbinds
+
+class LldpRemTablesLastChange(BasePollObject):
+    # Change marker: sysUpTime at the last change to any LLDP remote systems table.
+    OID = ("1.0.8802.1.1.2.1.2.1.0",)
+    SNMP_CMD = snmp_get
+
+    def parse(self, varbinds: list) -> dict:
+        for oid, value in varbinds:
+            if any(oid == OID for OID in self.OID):
+                return dict(OID=oid, value=value)
+        return dict(OID=None, value=None)
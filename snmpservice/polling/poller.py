@@ -1,6 +1,8 @@
 from snmpservice.polling.strategies import strategy_map
 from snmpservice.utils.exceptions import *
+from snmpservice.utils.metrics import poll_strategy_duration, device_unreachable
 from ipaddress import ip_address
+from time import perf_counter
 
 from pysnmp.hlapi import UdpTransportTarget, CommunityData
 
@@ -62,19 +64,52 @@ def poll(ip: str, port: int, strategy: str, community: str) -> dict:
     InvalidInput            : One or more input(s) are of the invalid type or value.
     UnexpectedSNMPPollError : Unexpected error occured.
     """
-    logger.debug(f"[POLL {ip}] Getting strategy for string '{strategy}'...")
-    strategy = strategy_map.get(strategy, None)
-    if strategy is None:
-        raise InvalidInput(f"Unable to find strategy matching string '{strategy}'")
-
-    # Build strategy inputs
-    transport = get_udp_transport_target(ip, port)
-    community = get_community_data(community)
+    strategy_name, start = strategy, perf_counter()
+    strategy, transport, community = _prepare(ip, port, strategy, community)
 
     # Follow poll strategy
     try:
         return strategy().run(transport, community)
-    except (DeviceUnreachable, InvalidInput):
+    except DeviceUnreachable:
+        device_unreachable.inc(ip)
+        raise
+    except InvalidInput:
+        raise
+    except Exception as e:
+        raise UnexpectedSNMPPollError(e)
+    finally:
+        poll_strategy_duration.observe(perf_counter() - start, strategy_name)
+
+async def poll_async(ip: str, port: int, strategy: str, community: str) -> dict:
+    """
+    Asyncio counterpart of poll. Runs the strategy on the running event
+    loop, so awaiting a poll holds no thread while the device responds 
+    (or times out). Arguments, return value and exceptions match poll.
+    """
+    strategy_name, start = strategy, perf_counter()
+    strategy, transport, community = _prepare(ip, port, strategy, community)
+
+    # Follow poll strategy
+    try:
+        return await strategy().run_async(transport, community)
+    except DeviceUnreachable:
+        device_unreachable.inc(ip)
+        raise
+    except InvalidInput:
         raise
     except Exception as e:
         raise UnexpectedSNMPPollError(e)
+    finally:
+        poll_strategy_duration.observe(perf_counter() - start, strategy_name)
+
+def _prepare(ip: str, port: int, strategy: str, community: str) -> tuple:
+    # Resolves the strategy class and builds the strategy inputs shared by poll and poll_async.
+    logger.debug(f"[POLL {ip}] Getting strategy for string '{strategy}'...")
+    strategy_cls = strategy_map.get(strategy, None)
+    if strategy_cls is None:
+        raise InvalidInput(f"Unable to find strategy matching string '{strategy}'")
+
+    # Build strategy inputs
+    transport = get_udp_transport_target(ip, port)
+    community = get_community_data(community)
+    return strategy_cls, transport, community
@@ -0,0 +1,186 @@
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from array import array
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import List, Tuple
+
+COUNTER64_MASK = 2**64 - 1
+MISSING = COUNTER64_MASK # Sentinel stored for a counter the agent did not return.
+TIMETICKS_MODULUS = 2**32 # sysUpTime wraps after ~497 days.
+
+class CounterHistory:
+    """
+    Ring buffer of the last 'samples' octet counter samples for one device.
+
+    Every sample holds one counter per interface, in the fixed order given
+    by 'ifindexes', so each counter type is a single flat array indexed by
+    slot * width + column rather than a Python object per sample.
+
+    Positional arguments:
+    ifindexes : tuple : Interface indexes, in column order.
+    samples   : int   : Samples held before the oldest is overwritten.
+    """
+    def __init__(self, ifindexes: tuple, samples: int):
+        self.ifindexes = ifindexes
+        self.width = len(ifindexes)
+        self.samples = samples
+        self.count = 0 # Samples held.
+        self.head = 0 # Slot the next sample is written to.
+        self.times = array('d', bytes(8 * samples))
+        self.uptimes = array('q', [-1] * samples)
+        self.in_octets = array('Q', bytes(8 * samples * self.width))
+        self.out_octets = array('Q', bytes(8 * samples * self.width))
+
+    def reset(self):
+        """Discards every sample, so the next one becomes the baseline."""
+        self.count = 0
+        self.head = 0
+
+    def slot(self, back: int = 0) -> int:
+        """Returns the slot holding the sample 'back' samples before the newest."""
+        return (self.head - 1 - back) % self.samples
+
+    def append(self, now: float, uptime: int | None, in_octets: array, out_octets: array):
+        """Writes a sample over the oldest slot."""
+        slot, width = self.head, self.width
+        self.times[slot] = now
+        self.uptimes[slot] = -1 if uptime is None else uptime
+        self.in_octets[slot * width:(slot + 1) * width] = in_octets
+        self.out_octets[slot * width:(slot + 1) * width] = out_octets
+        self.head = (slot + 1) % self.samples
+        self.count = min(self.count + 1, self.samples)
+
+    def column(self, counters: array, back: int) -> array:
+        """Returns the counters of every interface from the sample 'back' samples before the newest."""
+        start = self.slot(back) * self.width
+        return counters[start:start + self.width]
+
+def _rates(new: array, old: array, interval: float) -> List[float | None]:
+    # Bits per second for every interface between two samples. A 64-bit
+    # counter that wrapped still yields a small modular delta; a counter that
+    # went backwards for any other reason (e.g. cleared) yields a delta past
+    # 2**63 and no rate.
+    return [
+        None if n == MISSING or o == MISSING or (delta := (n - o) & COUNTER64_MASK) >= 2**63
+        else round(delta * 8 / interval, 2)
+        for n, o in zip(new, old)
+    ]
+
+class CounterRateStore:
+    """
+    Object holding recent IfHCInOctets/IfHCOutOctets samples per device and
+    turning them into InBps/OutBps.
+
+    Rates are computed across all of a device's interfaces in one pass over
+    the two samples' counter arrays. The interval between samples is taken
+    from sysUpTime when available (it is the agent's own clock), otherwise
+    from the time the samples were recorded. sysUpTime going backwards
+    (other than its 32-bit wrap) means the device rebooted and its counters
+    restarted, so the history is discarded and the new sample becomes the
+    baseline. A change in the device's interface set does the same.
+
+    Devices are evicted least-recently-polled beyond 'max_devices'.
+
+    Positional arguments:
+    samples     : int : Samples held per device.
+    max_devices : int : Devices held.
+
+    Methods:
+    record : Record a poll's counters, returning rates against the previous poll.
+    stats  : Return store counters.
+    """
+    def __init__(self, samples: int, max_devices: int):
+        self._samples = max(2, samples)
+        self._max_devices = max(1, max_devices)
+        self._devices = OrderedDict() # device -> CounterHistory
+        self._lock = Lock()
+        self._reboots = 0
+
+    @staticmethod
+    def _rebooted(old_uptime: int, uptime: int, elapsed: float) -> bool:
+        # Has the agent restarted between two sysUpTime (centisecond) readings?
+        if old_uptime < 0 or uptime < 0 or uptime >= old_uptime:
+            return False
+        # sysUpTime wrapped, rather than reset, if the modular advance
+        # roughly matches the time that actually passed.
+        advance = (uptime - old_uptime) % TIMETICKS_MODULUS
+        expected = elapsed * 100
+        return abs(advance - expected) > max(expected * 0.1, 500)
+
+    def record(self, device: str, uptime: int | None, ifindexes: List[int],
+               in_octets: List[int | None], out_octets: List[int | None],
+               now: float | None = None) -> Tuple[List[float | None], List[float | None]]:
+        """
+        Records one poll's octet counters for device and returns the rates
+        since the previous poll.
+
+        Positional arguments:
+        device     : str  : Device identifier (IP address).
+        uptime     : int  : sysUpTime in centiseconds, or None if unknown.
+        ifindexes  : list : Interface indexes.
+        in_octets  : list : IfHCInOctets per interface (None if missing).
+        out_octets : list : IfHCOutOctets per interface (None if missing).
+
+        Keyword arguments:
+        now : float : monotonic() time of the poll. Default=None (now).
+
+        Returns:
+        (in_bps, out_bps) : Lists aligned with ifindexes. Entries are None
+                            when there is no usable previous sample.
+        """
+        now = monotonic() if now is None else now
+        key = tuple(ifindexes)
+        in_sample = array('Q', [MISSING if value is None else value & COUNTER64_MASK for value in in_octets])
+        out_sample = array('Q', [MISSING if value is None else value & COUNTER64_MASK for value in out_octets])
+
+        with self._lock:
+            history = self._devices.get(device)
+            if history is None or history.ifindexes != key:
+                history = CounterHistory(key, self._samples)
+                self._devices[device] = history
+            self._devices.move_to_end(device)
+            while len(self._devices) > self._max_devices:
+                self._devices.popitem(last=False)
+
+            if history.count:
+                previous = history.slot()
+                old_uptime = history.uptimes[previous]
+                if self._rebooted(old_uptime, -1 if uptime is None else uptime, now - history.times[previous]):
+                    logger.debug(f"[CounterRateStore] {device} sysUpTime went backwards. Resetting counter baseline.")
+                    self._reboots += 1
+                    history.reset()
+
+            history.append(now, uptime, in_sample, out_sample)
+            if history.count < 2:
+                return [None] * len(key), [None] * len(key)
+
+            newest, previous = history.slot(0), history.slot(1)
+            old_uptime, new_uptime = history.uptimes[previous], history.uptimes[newest]
+            if old_uptime >= 0 and new_uptime >= 0:
+                interval = ((new_uptime - old_uptime) % TIMETICKS_MODULUS) / 100
+            else:
+                interval = history.times[newest] - history.times[previous]
+            if interval <= 0:
+                return [None] * len(key), [None] * len(key)
+
+            return (
+                _rates(history.column(history.in_octets, 0), history.column(history.in_octets, 1), interval),
+                _rates(history.column(history.out_octets, 0), history.column(history.out_octets, 1), interval),
+            )
+
+    def stats(self) -> dict:
+        """Returns a dictionary of store counters."""
+        with self._lock:
+            return dict(
+                Devices=len(self._devices),
+                SamplesPerDevice=self._samples,
+                Reboots=self._reboots
+            )
+
+counter_rates = CounterRateStore(
+    samples = settings.snmp_poll_rate_samples,
+    max_devices = settings.snmp_poll_rate_max_devices,
+)
@@ -0,0 +1,197 @@
+from snmpservice.polling.poller import poll_async
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from heapq import heappush, heappop
+from random import uniform
+from time import monotonic, time
+from typing import List
+import asyncio
+
+class ScheduledDevice:
+    """
+    Object representing a device registered for background polling,
+    along with the last known state polled from it.
+
+    Positional arguments:
+    ip        : str   : Target IP address.
+    port      : int   : UDP port for the remote device.
+    community : str   : SNMP community string to use.
+    strategy  : str   : Poll strategy string.
+    interval  : float : Seconds between polls.
+    """
+    def __init__(self, ip: str, port: int, community: str, strategy: str, interval: float):
+        self.ip = ip
+        self.port = port
+        self.community = community
+        self.strategy = strategy
+        self.interval = interval
+        self.generation = 0 # Bumped on re-registration, invalidating queued entries.
+        self.next_due = 0.0 # monotonic()
+        self.last_result = None
+        self.last_polled = None # monotonic() at which last_result was polled.
+        self.failures = 0 # Consecutive failed polls.
+        self.last_error = None
+
+    def matches(self, port: int, community: str, strategy: str) -> bool:
+        """Would a poll with these inputs return the same data as this schedule?"""
+        return (self.port, self.community, self.strategy) == (port, community, strategy)
+
+    def age(self) -> float | None:
+        """Seconds since last_result was polled, or None if never polled."""
+        return None if self.last_polled is None else monotonic() - self.last_polled
+
+    def to_dict(self) -> dict:
+        now, epoch = monotonic(), time()
+        return dict(
+            IpAddress=self.ip,
+            Port=self.port,
+            Strategy=self.strategy,
+            Interval=self.interval,
+            NextDue=int(epoch + self.next_due - now),
+            LastPolled=None if self.last_polled is None else int(epoch - (now - self.last_polled)),
+            ConsecutiveFailures=self.failures,
+            LastError=self.last_error,
+        )
+
+class PollScheduler:
+    """
+    Object polling registered devices in the background on the event loop,
+    keeping the latest result per device so it can be served without
+    polling on demand.
+
+    Due times are kept in a heap. Each poll is rescheduled at its interval
+    with +/- 'jitter' (a fraction of the interval) applied, so devices
+    registered together drift apart rather than polling in lockstep.
+    Unreachable devices back off exponentially, up to 'max_backoff' seconds.
+
+    Positional arguments:
+    concurrency : int   : Maximum scheduled polls in flight at once.
+    jitter      : float : Fraction of the interval to randomise due times by.
+    max_backoff : float : Longest delay between polls of a failing device.
+
+    Methods:
+    start      : Start dispatching on the running event loop.
+    stop       : Stop dispatching, cancelling in-flight polls.
+    register   : Schedule (or reschedule) a device.
+    unregister : Stop polling a device.
+    get        : Get a scheduled device.
+    devices    : List scheduled devices, soonest due first.
+    """
+    def __init__(self, concurrency: int, jitter: float, max_backoff: float):
+        self._concurrency = max(1, concurrency)
+        self._jitter = min(max(jitter, 0.0), 1.0)
+        self._max_backoff = max_backoff
+        self._devices = {}
+        self._heap = [] # (next_due, sequence, ip, generation)
+        self._sequence = 0
+        self._semaphore = None
+        self._wakeup = None
+        self._task = None
+        self._polls = set()
+
+    def _push(self, device: ScheduledDevice, delay: float):
+        device.next_due = monotonic() + delay
+        self._sequence += 1
+        heappush(self._heap, (device.next_due, self._sequence, device.ip, device.generation))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _jittered(self, interval: float) -> float:
+        return interval * (1 + uniform(-self._jitter, self._jitter))
+
+    def register(self, ip: str, port: int, community: str, strategy: str, interval: float) -> ScheduledDevice:
+        """
+        Schedules device with ip for polling every 'interval' seconds,
+        replacing any existing schedule for ip. The first poll is due
+        within 'jitter' * interval seconds.
+        """
+        device = self._devices.get(ip)
+        if device is None:
+            device = ScheduledDevice(ip, port, community, strategy, interval)
+            self._devices[ip] = device
+        else:
+            if not device.matches(port, community, strategy):
+                device.last_result, device.last_polled = None, None
+            device.port, device.community, device.strategy, device.interval = port, community, strategy, interval
+            device.generation += 1
+        logger.debug(f"[PollScheduler] Scheduled {ip} every {interval}s.")
+        self._push(device, uniform(0, interval * self._jitter))
+        return device
+
+    def unregister(self, ip: str) -> bool:
+        """Stops polling device with ip. Returns False if it was not scheduled."""
+        # Entries left in the heap are skipped when popped.
+        return self._devices.pop(ip, None) is not None
+
+    def get(self, ip: str) -> ScheduledDevice | None:
+        """Returns the scheduled device with ip, if any."""
+        return self._devices.get(ip)
+
+    def devices(self) -> List[ScheduledDevice]:
+        """Returns every scheduled device, soonest due first."""
+        return sorted(self._devices.values(), key=lambda device: device.next_due)
+
+    async def _poll(self, device: ScheduledDevice, generation: int):
+        try:
+            result = await poll_async(ip=device.ip, port=device.port, community=device.community, strategy=device.strategy)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            device.failures += 1
+            device.last_error = f"{type(e).__name__}: {e}"
+            delay = min(device.interval * 2 ** device.failures, self._max_backoff)
+            logger.debug(f"[PollScheduler] Poll of {device.ip} failed ({device.failures} in a row). Retrying in {delay:.0f}s.")
+        else:
+            device.last_result, device.last_polled = result, monotonic()
+            device.failures, device.last_error = 0, None
+            delay = self._jittered(device.interval)
+        finally:
+            self._semaphore.release()
+
+        # Reschedule, unless the device was unregistered or re-registered meanwhile.
+        if self._devices.get(device.ip) is device and device.generation == generation:
+            self._push(device, delay)
+
+    async def _run(self):
+        logger.info("Running poll scheduler...")
+        while True:
+            while self._heap and self._heap[0][0] <= monotonic():
+                _, _, ip, generation = heappop(self._heap)
+                device = self._devices.get(ip)
+                if device is None or device.generation != generation:
+                    continue # Stale entry.
+                await self._semaphore.acquire()
+                task = asyncio.create_task(self._poll(device, generation))
+                self._polls.add(task)
+                task.add_done_callback(self._polls.discard)
+
+            timeout = self._heap[0][0] - monotonic() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Starts dispatching scheduled polls on the running event loop."""
+        if self._task is not None:
+            return
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stops dispatching scheduled polls, cancelling any in flight."""
+        if self._task is None:
+            return
+        for task in (self._task, *self._polls):
+            task.cancel()
+        await asyncio.gather(self._task, *self._polls, return_exceptions=True)
+        self._task = None
+
+poll_scheduler = PollScheduler(
+    concurrency = settings.snmp_poll_scheduler_concurrency,
+    jitter = settings.snmp_poll_scheduler_jitter,
+    max_backoff = settings.snmp_poll_scheduler_max_backoff,
+)
@@ -1,9 +1,17 @@
 from snmpservice.utils.helpers import is_data_intf, timestamp
 from snmpservice.utils.models.polling import *
 from snmpservice.polling.objects import *
+from snmpservice.polling.walker import (
+    walk_poll_objects, walk_poll_objects_async, get_poll_objects, get_poll_objects_async, prefer_get
+)
+from snmpservice.polling.rates import counter_rates
+from snmpservice.polling.differential import static_columns
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
 
 from pysnmp.hlapi import UdpTransportTarget, CommunityData
-from typing import List
+from typing import Dict, List, Set, Tuple
+import asyncio
 
 ### Strategy data models
 
@@ -21,6 +29,8 @@ class DefaultStrategyInterfaceModel(BaseStrategyModel):
     IfSpeed: int | None
     IfHCInOctets: int | None
     IfHCOutOctets: int | None
+    InBps: float | None
+    OutBps: float | None
     Neighbour: DefaultStrategyLldpModel = DefaultStrategyLldpModel()
 
 class DefaultStrategyModel(BaseStrategyModel):
@@ -28,6 +38,7 @@ class DefaultStrategyModel(BaseStrategyModel):
     IpAddress: str
     HostName: str | None
     DeviceModel: str | None
+    SysUpTime: int | None
     Interfaces: List[DefaultStrategyInterfaceModel] = []
 
 ### Strategy
@@ -37,6 +48,7 @@ class DefaultPollStrategy:
         # Sys objects
         HostName,
         DeviceModel,
+        SysUpTime,
 
         # Interface objects
         IfIndex,
@@ -65,13 +77,201 @@ class DefaultPollStrategy:
         model.Interfaces.append(if_model)
         return if_model
 
+    # Groups of columns that rarely change. With differential polling enabled,
+    # each group is cached per device and only re-walked when its change
+    # marker (if any) moves, the device reboots, or the cache ages out.
+    STATIC_GROUPS = {
+        "system": (HostName, DeviceModel),
+        "interfaces": (IfName, IfDescr, IfSpeed),
+        "lldp": (LldpRemHost, LldpRemHostIpAddr, LldpRemPort),
+    }
+    CHANGE_MARKERS = {
+        "interfaces": IfTableLastChange,
+        "lldp": LldpRemTablesLastChange,
+    }
+
+    def _table_objects(self, poll_objects: tuple) -> list:
+        # Poll objects walked together in one multi-column pass (ifTable, ifXTable, LLDP).
+        return [poll_object for poll_object in poll_objects if issubclass(poll_object, InterfacePollTask)]
+
+    def _fetch(self, poll_objects: tuple, target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+        # Walks the table poll objects together, then retrieves the others.
+        table_objects = self._table_objects(poll_objects)
+        responses = walk_poll_objects(table_objects, target, community) if table_objects else {}
+        for poll_object in poll_objects:
+            if poll_object not in responses:
+                responses[poll_object] = poll_object().retrieve(target, community)
+        return responses
+
+    async def _fetch_async(self, poll_objects: tuple, target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+        # Asyncio counterpart of _fetch. The table walk and every other poll object are awaited concurrently.
+        table_objects = self._table_objects(poll_objects)
+        other_objects = [poll_object for poll_object in poll_objects if poll_object not in table_objects]
+        awaitables = [poll_object().retrieve_async(target, community) for poll_object in other_objects]
+        if table_objects:
+            awaitables.append(walk_poll_objects_async(table_objects, target, community))
+        results = await asyncio.gather(*awaitables)
+        responses = dict(zip(other_objects, results))
+        if table_objects:
+            responses.update(results[-1])
+        return responses
+
     def run(self, target: UdpTransportTarget, community: CommunityData) -> dict:
         """Run SNMP polling strategy."""
+        if not settings.snmp_poll_differential:
+            poll_objects, row_objects = self._split_rows(self.POLL_OBJECTS)
+            responses = self._fetch(poll_objects, target, community)
+            responses.update(self._fetch_rows(row_objects, responses.get(self.FILTER_OBJECT), target, community))
+            return self._assemble(target, responses)
+
+        device = self._device_key(target, community)
+        first_pass, first_rows = self._split_rows(self._first_pass(device))
+        responses = self._fetch(first_pass, target, community)
+        stale, cached, second_pass = self._second_pass(device, responses)
+        second_pass, second_rows = self._split_rows(second_pass)
+        responses.update(self._fetch(second_pass, target, community))
+        responses.update(self._fetch_rows(
+            self._merge_rows(first_rows, second_rows), self._filter_response(responses, cached), target, community
+        ))
+        return self._assemble(target, self._merge_static(device, stale, cached, responses))
+
+    async def run_async(self, target: UdpTransportTarget, community: CommunityData) -> dict:
+        """
+        Run SNMP polling strategy on the running event loop. The table walk
+        and every other poll object are awaited concurrently.
+        """
+        if not settings.snmp_poll_differential:
+            poll_objects, row_objects = self._split_rows(self.POLL_OBJECTS)
+            responses = await self._fetch_async(poll_objects, target, community)
+            responses.update(await self._fetch_rows_async(row_objects, responses.get(self.FILTER_OBJECT), target, community))
+            return self._assemble(target, responses)
+
+        device = self._device_key(target, community)
+        first_pass, first_rows = self._split_rows(self._first_pass(device))
+        responses = await self._fetch_async(first_pass, target, community)
+        stale, cached, second_pass = self._second_pass(device, responses)
+        second_pass, second_rows = self._split_rows(second_pass)
+        responses.update(await self._fetch_async(second_pass, target, community))
+        responses.update(await self._fetch_rows_async(
+            self._merge_rows(first_rows, second_rows), self._filter_response(responses, cached), target, community
+        ))
+        return self._assemble(target, self._merge_static(device, stale, cached, responses))
+
+    ### Data interface filter pushdown
+
+    # FILTER_OBJECT's column is fetched before the ROW_OBJECTS columns (all
+    # indexed by ifIndex), which are then fetched with GETs for data
+    # interfaces only, unless walking them takes fewer requests.
+    FILTER_OBJECT = IfName
+    ROW_OBJECTS = (IfIndex, IfDescr, IfAdminStatus, IfOperStatus, IfSpeed, IfHCInOctets, IfHCOutOctets)
+
+    def _split_rows(self, poll_objects: tuple) -> Tuple[tuple, tuple]:
+        # Splits poll_objects into those fetched up front and the ROW_OBJECTS fetched after FILTER_OBJECT.
+        if not settings.snmp_poll_pushdown:
+            return poll_objects, ()
+        return (
+            tuple(poll_object for poll_object in poll_objects if poll_object not in self.ROW_OBJECTS),
+            tuple(poll_object for poll_object in poll_objects if poll_object in self.ROW_OBJECTS)
+        )
+
+    def _merge_rows(self, first_rows: tuple, second_rows: tuple) -> tuple:
+        return (*first_rows, *(poll_object for poll_object in second_rows if poll_object not in first_rows))
+
+    def _filter_response(self, responses: Dict[type, dict | None], cached: dict) -> dict | None:
+        # FILTER_OBJECT's response: freshly fetched, else from the static column cache.
+        return responses[self.FILTER_OBJECT] if self.FILTER_OBJECT in responses else cached.get(self.FILTER_OBJECT)
+
+    def _plan_rows(self, row_objects: tuple, filter_response: dict | None, target: UdpTransportTarget) -> List[int] | None:
+        # Returns the ifIndexes of the data interfaces to GET row_objects for, or None to walk them.
+        varbinds = filter_response.get("varbinds") if isinstance(filter_response, dict) else None
+        interfaces = [varbind for varbind in varbinds or [] if varbind.get("IfIndex") is not None]
+        if not interfaces:
+            return None
+        ifindexes = [interface["IfIndex"] for interface in interfaces if is_data_intf(interface.get("value"))]
+        columns = [poll_object.OID[0] for poll_object in row_objects]
+        if not prefer_get(target, columns, len(interfaces), len(ifindexes)):
+            logger.debug(f"[POLL {target.transportAddr[0]}] {len(ifindexes)} of {len(interfaces)} interfaces are data interfaces. Walking.")
+            return None
+        logger.debug(f"[POLL {target.transportAddr[0]}] {len(ifindexes)} of {len(interfaces)} interfaces are data interfaces. Fetching with GETs.")
+        return ifindexes
+
+    def _fetch_rows(self, row_objects: tuple, filter_response: dict | None, target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+        # Fetches the row_objects columns, for data interfaces only if cheaper than walking them.
+        if not row_objects:
+            return {}
+        ifindexes = self._plan_rows(row_objects, filter_response, target)
+        if ifindexes is None:
+            return walk_poll_objects(list(row_objects), target, community)
+        if not ifindexes:
+            return dict.fromkeys(row_objects)
+        return get_poll_objects(list(row_objects), ifindexes, target, community)
+
+    async def _fetch_rows_async(self, row_objects: tuple, filter_response: dict | None, target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+        # Asyncio counterpart of _fetch_rows.
+        if not row_objects:
+            return {}
+        ifindexes = self._plan_rows(row_objects, filter_response, target)
+        if ifindexes is None:
+            return await walk_poll_objects_async(list(row_objects), target, community)
+        if not ifindexes:
+            return dict.fromkeys(row_objects)
+        return await get_poll_objects_async(list(row_objects), ifindexes, target, community)
+
+    ### Differential polling
+
+    def _device_key(self, target: UdpTransportTarget, community: CommunityData) -> tuple:
+        return (*target.transportAddr, community.communityName)
+
+    def _static_objects(self, groups) -> tuple:
+        return tuple(poll_object for group in groups for poll_object in self.STATIC_GROUPS[group])
+
+    def _first_pass(self, device: tuple) -> tuple:
+        # Volatile poll objects and change markers. A device with nothing
+        # cached needs every static column too, so walk them all at once.
+        static_objects = self._static_objects(self.STATIC_GROUPS)
+        poll_objects = (*self.CHANGE_MARKERS.values(), *(
+            poll_object for poll_object in self.POLL_OBJECTS 
+            if poll_object not in static_objects
+        ))
+        if not static_columns.has(device):
+            poll_objects += static_objects
+        return poll_objects
+
+    def _marker_values(self, responses: Dict[type, dict | None]) -> Tuple[int | None, dict]:
+        # Returns (sysUpTime, group -> change marker) from the first pass responses.
+        def _value(poll_object: type):
+            response = responses.get(poll_object)
+            varbinds = response.get("varbinds") if isinstance(response, dict) else None
+            return varbinds[0].get("value") if varbinds else None
+        return _value(SysUpTime), {group: _value(marker) for group, marker in self.CHANGE_MARKERS.items()}
+
+    def _second_pass(self, device: tuple, responses: Dict[type, dict | None]) -> Tuple[Set[str], dict, tuple]:
+        # Decides which static groups are stale, returning them along with the
+        # cached responses of the other groups and the poll objects still to fetch.
+        uptime, markers = self._marker_values(responses)
+        stale, cached = static_columns.plan(device, uptime, markers, self.STATIC_GROUPS)
+        return stale, cached, tuple(
+            poll_object for poll_object in self._static_objects(stale) 
+            if poll_object not in responses
+        )
+
+    def _merge_static(self, device: tuple, stale: Set[str], cached: dict, responses: Dict[type, dict | None]) -> Dict[type, dict | None]:
+        # Caches the freshly fetched static groups and fills in the rest from cache.
+        uptime, markers = self._marker_values(responses)
+        static_columns.store(device, uptime, markers, {
+            group: {poll_object: responses.get(poll_object) for poll_object in self.STATIC_GROUPS[group]}
+            for group in stale
+        })
+        responses.update(cached)
+        return responses
+
+    def _assemble(self, target: UdpTransportTarget, responses: Dict[type, dict | None]) -> dict:
+        # Builds the strategy model from each poll object's response, in POLL_OBJECTS order.
         model = DefaultStrategyModel(Timestamp=timestamp(), IpAddress=target.transportAddr[0])
 
         for poll_object in self.POLL_OBJECTS: 
-            # Get SNMP OID varbind(s).
-            poll_object_response = poll_object().retrieve(target, community)
+            # Get retrieved SNMP OID varbind(s).
+            poll_object_response = responses.get(poll_object)
             if not isinstance(poll_object_response, dict):
                 continue
 
@@ -92,4 +292,17 @@ class DefaultPollStrategy:
             interface for interface in model.Interfaces
             if is_data_intf(interface.IfName)
         ]
+        self._add_rates(model)
         return model.dict()
+
+    def _add_rates(self, model: DefaultStrategyModel):
+        # Records the interfaces' octet counters and sets InBps/OutBps from the previous poll's.
+        interfaces = model.Interfaces
+        in_bps, out_bps = counter_rates.record(
+            model.IpAddress, model.SysUpTime,
+            [interface.IfIndex for interface in interfaces],
+            [interface.IfHCInOctets for interface in interfaces],
+            [interface.IfHCOutOctets for interface in interfaces],
+        )
+        for interface, in_rate, out_rate in zip(interfaces, in_bps, out_bps):
+            interface.InBps, interface.OutBps = in_rate, out_rate
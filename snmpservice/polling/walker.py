@@ -0,0 +1,477 @@
+from snmpservice.polling.objects.base import BasePollObject, oid_to_string, unpack_varbind
+from snmpservice.polling.engine import engine_pool
+from snmpservice.polling.bulksize import bulk_sizer, table_key
+from snmpservice.polling.dispatcher import snmp_dispatcher
+from snmpservice.polling.client import snmp_client
+from snmpservice.utils.logger import logger
+from snmpservice.utils.exceptions import *
+from snmpservice.utils.metrics import poll_object_duration, record_snmp_request
+from snmpservice.settings import settings
+
+from pysnmp.hlapi import SnmpEngine, CommunityData, UdpTransportTarget, ContextData
+from pysnmp.hlapi.asyncore.cmdgen import bulkCmd as bulk_cmd_async, getCmd as get_cmd_async
+from pysnmp.proto.rfc1902 import ObjectName
+from pysnmp.proto.errind import RequestTimedOut
+from pyasn1.type.univ import Null
+from collections import deque
+from contextlib import nullcontext
+from math import ceil
+from time import perf_counter
+from typing import Dict, Iterable, List, Tuple
+
+class ColumnGroup:
+    """
+    Object representing a set of table columns that are advanced together
+    by a single GETBULK request.
+
+    Positional arguments:
+    columns         : list : Column OID strings belonging to the group.
+    max_repetitions : int  : GETBULK max-repetitions to request the group with.
+
+    Properties:
+    cursors : dict : Column OID string -> OID tuple to continue the walk from.
+    """
+    def __init__(self, columns: List[str], max_repetitions: int):
+        self.cursors = {column: tuple(ObjectName(column)) for column in columns}
+        self.max_repetitions = max_repetitions
+
+    def oids(self) -> List[ObjectName]:
+        """Returns the OIDs to place in the next GETBULK varbind list, in column order."""
+        return [ObjectName(cursor) for cursor in self.cursors.values()]
+
+class ColumnWalk:
+    """
+    Transport-agnostic state machine that walks several table columns at
+    once, putting every column in the same GETBULK varbind list and
+    advancing them together.
+
+    Columns drop out of the request as soon as they leave their subtree.
+    When an agent answers with tooBig, the column set is split across two
+    requests, and a lone column has its max-repetitions halved. A timed-out
+    request is retried once at half the max-repetitions, provided the agent
+    has already answered during this walk (so is reachable, but struggling).
+
+    Positional arguments:
+    columns         : list : Column OID strings (or any subtree prefix) to walk.
+    max_repetitions : int  : Initial GETBULK max-repetitions.
+
+    Usage:
+    walk = ColumnWalk(columns, 25)
+    while (group := walk.next_group()) is not None:
+        ... send GETBULK for group.oids() with group.max_repetitions ...
+        walk.feed(group, var_bind_table)  # or feed_too_big / feed_timeout
+    walk.rows  # Column OID string -> list of (ObjectName, value) pairs.
+    """
+    def __init__(self, columns: List[str], max_repetitions: int):
+        self.rows = {column: [] for column in columns}
+        self.requests = 0
+        self.responses = 0
+        self.timeouts = 0
+        self._prefixes = {column: tuple(ObjectName(column)) for column in columns}
+        self._pending = deque()
+        if columns:
+            self._pending.append(ColumnGroup(list(self.rows), max(1, int(max_repetitions))))
+
+    def next_group(self) -> ColumnGroup | None:
+        """Returns the next group to request, or None when the walk is complete."""
+        if not self._pending:
+            return None
+        self.requests += 1
+        return self._pending.popleft()
+
+    def feed(self, group: ColumnGroup, var_bind_table: list):
+        """
+        Processes a GETBULK response for group. Rows are assumed to list
+        the group's columns in the order given by group.oids().
+        """
+        self.responses += 1
+        columns = list(group.cursors)
+        finished = set()
+        for row in var_bind_table:
+            for column, (name, value) in zip(columns, row):
+                if column in finished:
+                    continue
+                oid = tuple(name)
+                prefix = self._prefixes[column]
+                # Column is exhausted once the agent leaves its subtree, reports
+                # an exception value (endOfMibView etc.), or stops increasing.
+                if (oid[:len(prefix)] != prefix or value is None or isinstance(value, Null)
+                        or oid <= group.cursors[column]):
+                    finished.add(column)
+                    continue
+                self.rows[column].append((name, value))
+                group.cursors[column] = oid
+
+        # An empty response cannot advance the walk, so treat it as the end.
+        if not var_bind_table:
+            finished.update(columns)
+
+        for column in finished:
+            group.cursors.pop(column)
+        if group.cursors:
+            self._pending.appendleft(group)
+
+    def feed_too_big(self, group: ColumnGroup):
+        """Re-plans group after the agent answered its request with tooBig."""
+        columns = list(group.cursors)
+        if len(columns) > 1:
+            # Split the column set across two PDUs.
+            middle = len(columns) // 2
+            for half in (columns[middle:], columns[:middle]):
+                split = ColumnGroup([], group.max_repetitions)
+                split.cursors = {column: group.cursors[column] for column in half}
+                self._pending.appendleft(split)
+        elif group.max_repetitions > 1:
+            group.max_repetitions //= 2
+            self._pending.appendleft(group)
+        else:
+            logger.error(f"[ColumnWalk] Agent reports tooBig for single row of {columns[0]}. Abandoning column.")
+
+    def feed_timeout(self, group: ColumnGroup) -> bool:
+        """
+        Re-plans group after its request timed out.
+
+        Returns:
+        True if the group was rescheduled at half its max-repetitions.
+        False if the walk should be abandoned (agent never answered, the
+        group is already at one repetition, or a retry was already spent).
+        """
+        self.timeouts += 1
+        if self.responses and self.timeouts == 1 and group.max_repetitions > 1:
+            group.max_repetitions //= 2
+            self._pending.appendleft(group)
+            return True
+        return False
+
+class RowFetch:
+    """
+    Transport-agnostic state machine that fetches selected rows of several
+    table columns with GET requests, packing up to 'max_varbinds' of the
+    column/row instances into each request.
+
+    When an agent answers with tooBig, the request's varbinds are split
+    across two requests.
+
+    Positional arguments:
+    columns      : list : Column OID strings.
+    indexes      : list : Row indexes (e.g. ifIndexes) to fetch from every column.
+    max_varbinds : int  : Varbinds per GET.
+
+    Usage:
+    fetch = RowFetch(columns, indexes, 40)
+    while (oids := fetch.next_request()) is not None:
+        ... send GET for oids ...
+        fetch.feed(var_binds)  # or feed_too_big(oids)
+    fetch.rows  # Column OID string -> list of (ObjectName, value) pairs.
+    """
+    def __init__(self, columns: List[str], indexes: Iterable, max_varbinds: int):
+        self.rows = {column: [] for column in columns}
+        self.requests = 0
+        self._columns = {f"{column}.{index}": column for index in indexes for column in columns}
+        oids, size = list(self._columns), max(1, int(max_varbinds))
+        self._pending = deque(oids[start:start + size] for start in range(0, len(oids), size))
+
+    def next_request(self) -> List[str] | None:
+        """Returns the OIDs to GET next, or None when the fetch is complete."""
+        if not self._pending:
+            return None
+        self.requests += 1
+        return self._pending.popleft()
+
+    def feed(self, var_binds: list):
+        """Processes a GET response. Exception values (noSuchInstance etc.) are kept, and dropped when unpacked."""
+        for name, value in var_binds:
+            column = self._columns.get(oid_to_string(name))
+            if column is not None:
+                self.rows[column].append((name, value))
+
+    def feed_too_big(self, oids: List[str]):
+        """Re-plans a request after the agent answered it with tooBig."""
+        if len(oids) > 1:
+            middle = len(oids) // 2
+            self._pending.extendleft((oids[middle:], oids[:middle]))
+        else:
+            logger.error(f"[RowFetch] Agent reports tooBig for single varbind {oids[0]}. Abandoning it.")
+
+# Cost of a request relative to one varbind, when comparing fetch plans.
+# Agents answer each varbind separately (slowly, on many routers), while a
+# request mostly costs a round trip.
+REQUEST_COST = 10
+
+def prefer_get(target: UdpTransportTarget, columns: List[str], rows: int, selected: int) -> bool:
+    """
+    Estimates whether fetching 'selected' rows of columns with GETs (see
+    get_poll_objects) is cheaper than walking all 'rows' of them together,
+    at the max-repetitions the shared AdaptiveBulkSizer has learned. Cost
+    is counted in varbinds answered plus REQUEST_COST per request.
+
+    Positional arguments:
+    target   : UdpTransportTarget : Device the columns belong to.
+    columns  : list               : Column OID strings.
+    rows     : int                : Rows in each column.
+    selected : int                : Rows that would be fetched with GETs.
+    """
+    max_repetitions = bulk_sizer.get(target.transportAddr[0], table_key(columns))
+    # A walk takes one more row than the table holds to see its end.
+    walk_requests = ceil((rows + 1) / max(1, max_repetitions))
+    get_requests = ceil(len(columns) * selected / max(1, settings.snmp_poll_get_max_varbinds))
+    walk_cost = len(columns) * (rows + 1) + REQUEST_COST * walk_requests
+    get_cost = len(columns) * selected + REQUEST_COST * get_requests
+    return get_cost < walk_cost
+
+def _borrow_engine():
+    # The native transport needs no SnmpEngine.
+    return nullcontext() if settings.snmp_poll_transport == "native" else engine_pool.borrow()
+
+def snmp_get_request(engine: SnmpEngine, community: CommunityData, target: UdpTransportTarget,
+                     oids: List[str]) -> Tuple[object, object, list]:
+    """
+    Performs a single GET request for oids and returns (error_indication,
+    error_status, var_binds). MIB lookup of the response is skipped, so
+    var_binds holds raw (ObjectName, value) pairs. With the native
+    transport (settings.snmp_poll_transport), engine is unused and
+    var_binds holds (OID tuple, native value) pairs.
+    """
+    if settings.snmp_poll_transport == "native":
+        error_indication, error_status, _, var_binds = snmp_client.get(community, target, oids).result()
+        record_snmp_request(target.transportAddr[0], error_indication)
+        return error_indication, error_status, var_binds
+
+    response = {}
+    def _callback(snmp_engine, send_request_handle, error_indication, error_status, error_index, var_binds, cb_ctx):
+        response.update(error_indication=error_indication, error_status=error_status, var_binds=var_binds)
+
+    get_cmd_async(
+        engine, community, target, ContextData(),
+        *[(ObjectName(oid), Null('')) for oid in oids],
+        cbFun=_callback, lookupMib=False
+    )
+    engine.transportDispatcher.runDispatcher()
+    record_snmp_request(target.transportAddr[0], response.get("error_indication"))
+    return response.get("error_indication"), response.get("error_status"), response.get("var_binds") or []
+
+def snmp_bulk_request(engine: SnmpEngine, community: CommunityData, target: UdpTransportTarget,
+                      oids: List[ObjectName], max_repetitions: int) -> Tuple[object, object, list]:
+    """
+    Performs a single GETBULK request (no follow-up requests) and returns
+    (error_indication, error_status, var_bind_table). MIB lookup of the
+    response is skipped, so var_bind_table holds raw (ObjectName, value) pairs.
+    With the native transport (settings.snmp_poll_transport), engine is
+    unused and pairs are (OID tuple, native value).
+    """
+    if settings.snmp_poll_transport == "native":
+        error_indication, error_status, _, var_bind_table = snmp_client.bulk(community, target, oids, max_repetitions).result()
+        record_snmp_request(target.transportAddr[0], error_indication)
+        return error_indication, error_status, var_bind_table
+
+    response = {}
+    def _callback(snmp_engine, send_request_handle, error_indication, error_status, error_index, var_bind_table, cb_ctx):
+        response.update(error_indication=error_indication, error_status=error_status, var_bind_table=var_bind_table)
+
+    bulk_cmd_async(
+        engine, community, target, ContextData(), 0, max_repetitions,
+        *[(oid, Null('')) for oid in oids],
+        cbFun=_callback, lookupMib=False
+    )
+    engine.transportDispatcher.runDispatcher()
+    record_snmp_request(target.transportAddr[0], response.get("error_indication"))
+    return response.get("error_indication"), response.get("error_status"), response.get("var_bind_table") or []
+
+def _handle_bulk_response(walk: ColumnWalk, group: ColumnGroup, device: str, table: str,
+                          err_indicator, err_status, var_bind_table: list):
+    # Feeds one GETBULK outcome into walk, telling the shared AdaptiveBulkSizer
+    # about tooBig and timed-out requests. Shared by the sync and async walkers.
+    if err_indicator:
+        logger.error(f"[SNMP GETBULK Error] {err_indicator}")
+        if isinstance(err_indicator, RequestTimedOut):
+            bulk_sizer.record_timeout(device, table, group.max_repetitions)
+            if walk.feed_timeout(group):
+                return
+        raise DeviceUnreachable(f"Device is unreachable.")
+    elif err_status and str(err_status) == "tooBig":
+        bulk_sizer.record_too_big(device, table, group.max_repetitions)
+        walk.feed_too_big(group)
+    elif err_status and str(err_status) != "noError":
+        logger.error(f"[SNMP GETBULK Error] {err_status} walking {list(group.cursors)}")
+    else:
+        walk.feed(group, var_bind_table or [])
+
+def _walk_rows(walk: ColumnWalk, device: str, table: str) -> Dict[str, list]:
+    # Records the completed walk and unpacks its rows.
+    rows = sum(len(column_rows) for column_rows in walk.rows.values())
+    bulk_sizer.record_success(device, table, walk.requests, rows)
+    logger.debug(f"[ColumnWalk] Walked {len(walk.rows)} columns ({rows} rows) in {walk.requests} requests.")
+    return {
+        column: [vb for varbind in rows if (vb := unpack_varbind(varbind)) != (None, None)]
+        for column, rows in walk.rows.items()
+    }
+
+def walk_columns(target: UdpTransportTarget, community: CommunityData, columns: List[str],
+                 max_repetitions: int | None = None) -> Dict[str, list]:
+    """
+    Walks the given table columns together using shared GETBULK requests.
+
+    Unless max_repetitions is given, the walk is sized by the shared
+    AdaptiveBulkSizer, which is told about any tooBig or timed-out requests
+    so that later walks of the same device and table start smaller.
+
+    Positional arguments:
+    target          : UdpTransportTarget : Target of the walk.
+    community       : CommunityData      : Community data for target.
+    columns         : list               : Column OID strings to walk.
+
+    Keyword arguments:
+    max_repetitions : int : Initial GETBULK max-repetitions. Default=None (learned).
+
+    Returns:
+    rows : dict : Column OID string -> list of unpacked (oid, value) pairs.
+
+    Raises:
+    DeviceUnreachable : Raised when a request times out or fails to send.
+    """
+    device, table = target.transportAddr[0], table_key(columns)
+    if max_repetitions is None:
+        max_repetitions = bulk_sizer.get(device, table)
+
+    walk = ColumnWalk(columns, max_repetitions)
+    with _borrow_engine() as engine:
+        while (group := walk.next_group()) is not None:
+            err_indicator, err_status, var_bind_table = snmp_bulk_request(
+                engine, community, target, group.oids(), group.max_repetitions
+            )
+            _handle_bulk_response(walk, group, device, table, err_indicator, err_status, var_bind_table)
+    return _walk_rows(walk, device, table)
+
+async def walk_columns_async(target: UdpTransportTarget, community: CommunityData, columns: List[str],
+                             max_repetitions: int | None = None) -> Dict[str, list]:
+    """
+    Asyncio counterpart of walk_columns. Requests are sent by the shared
+    SnmpDispatcher, so the walk holds no thread while awaiting responses.
+    """
+    device, table = target.transportAddr[0], table_key(columns)
+    if max_repetitions is None:
+        max_repetitions = bulk_sizer.get(device, table)
+
+    walk = ColumnWalk(columns, max_repetitions)
+    while (group := walk.next_group()) is not None:
+        err_indicator, err_status, _, var_bind_table = await snmp_dispatcher.bulk(
+            community, target, group.oids(), group.max_repetitions
+        )
+        _handle_bulk_response(walk, group, device, table, err_indicator, err_status, var_bind_table)
+    return _walk_rows(walk, device, table)
+
+def _handle_get_response(fetch: RowFetch, oids: List[str], err_indicator, err_status, var_binds: list):
+    # Feeds one GET outcome into fetch. Shared by the sync and async row fetches.
+    if err_indicator:
+        logger.error(f"[SNMP GET Error] {err_indicator}")
+        raise DeviceUnreachable(f"Device is unreachable.")
+    elif err_status and str(err_status) == "tooBig":
+        fetch.feed_too_big(oids)
+    elif err_status and str(err_status) != "noError":
+        logger.error(f"[SNMP GET Error] {err_status} fetching {len(oids)} varbinds from {oids[0]}")
+    else:
+        fetch.feed(var_binds)
+
+def _fetched_rows(fetch: RowFetch) -> Dict[str, list]:
+    # Unpacks the rows of a completed fetch.
+    logger.debug(f"[RowFetch] Fetched {len(fetch.rows)} columns in {fetch.requests} requests.")
+    return {
+        column: [vb for varbind in rows if (vb := unpack_varbind(varbind)) != (None, None)]
+        for column, rows in fetch.rows.items()
+    }
+
+def get_rows(target: UdpTransportTarget, community: CommunityData, columns: List[str], indexes: Iterable) -> Dict[str, list]:
+    """
+    Fetches the given rows of table columns with multi-varbind GETs of
+    up to settings.snmp_poll_get_max_varbinds varbinds each.
+
+    Positional arguments:
+    target    : UdpTransportTarget : Target of the requests.
+    community : CommunityData      : Community data for target.
+    columns   : list               : Column OID strings.
+    indexes   : list               : Row indexes to fetch from every column.
+
+    Returns:
+    rows : dict : Column OID string -> list of unpacked (oid, value) pairs.
+
+    Raises:
+    DeviceUnreachable : Raised when a request times out or fails to send.
+    """
+    fetch = RowFetch(columns, indexes, settings.snmp_poll_get_max_varbinds)
+    with _borrow_engine() as engine:
+        while (oids := fetch.next_request()) is not None:
+            err_indicator, err_status, var_binds = snmp_get_request(engine, community, target, oids)
+            _handle_get_response(fetch, oids, err_indicator, err_status, var_binds)
+    return _fetched_rows(fetch)
+
+async def get_rows_async(target: UdpTransportTarget, community: CommunityData, columns: List[str], indexes: Iterable) -> Dict[str, list]:
+    """Asyncio counterpart of get_rows, sending requests through the shared SnmpDispatcher."""
+    fetch = RowFetch(columns, indexes, settings.snmp_poll_get_max_varbinds)
+    while (oids := fetch.next_request()) is not None:
+        err_indicator, err_status, _, var_binds = await snmp_dispatcher.get(community, target, oids)
+        _handle_get_response(fetch, oids, err_indicator, err_status, var_binds)
+    return _fetched_rows(fetch)
+
+def _observe_walk(poll_objects: List[type], duration: float):
+    # Each walked (or fetched) poll object's data took the whole walk to retrieve.
+    for poll_object in poll_objects:
+        poll_object_duration.observe(duration, poll_object.__name__)
+
+def walk_poll_objects(poll_objects: List[type], target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+    """
+    Walks the table columns of several poll objects in one multi-column
+    walk, then hands each poll object the rows of its own column.
+
+    Positional arguments:
+    poll_objects : list               : BasePollObject subclasses whose OID[0] is a table column.
+    target       : UdpTransportTarget : Target of the walk.
+    community    : CommunityData      : Community data for target.
+
+    Returns:
+    responses : dict : Poll object class -> BasePollObject.process output
+                       (None if the column yielded no varbinds).
+    """
+    start = perf_counter()
+    rows = walk_columns(target, community, [poll_object.OID[0] for poll_object in poll_objects])
+    _observe_walk(poll_objects, perf_counter() - start)
+    return {
+        poll_object: poll_object().process(rows[poll_object.OID[0]])
+        for poll_object in poll_objects
+    }
+
+async def walk_poll_objects_async(poll_objects: List[type], target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+    """Asyncio counterpart of walk_poll_objects."""
+    start = perf_counter()
+    rows = await walk_columns_async(target, community, [poll_object.OID[0] for poll_object in poll_objects])
+    _observe_walk(poll_objects, perf_counter() - start)
+    return {
+        poll_object: poll_object().process(rows[poll_object.OID[0]])
+        for poll_object in poll_objects
+    }
+
+def get_poll_objects(poll_objects: List[type], indexes: Iterable, target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+    """
+    Counterpart of walk_poll_objects fetching only the given rows (e.g.
+    ifIndexes) of each poll object's column, with get_rows.
+
+    Returns:
+    responses : dict : Poll object class -> BasePollObject.process output
+                       (None if the column yielded no varbinds).
+    """
+    start = perf_counter()
+    rows = get_rows(target, community, [poll_object.OID[0] for poll_object in poll_objects], indexes)
+    _observe_walk(poll_objects, perf_counter() - start)
+    return {
+        poll_object: poll_object().process(rows[poll_object.OID[0]])
+        for poll_object in poll_objects
+    }
+
+async def get_poll_objects_async(poll_objects: List[type], indexes: Iterable, target: UdpTransportTarget, community: CommunityData) -> Dict[type, dict | None]:
+    """Asyncio counterpart of get_poll_objects."""
+    start = perf_counter()
+    rows = await get_rows_async(target, community, [poll_object.OID[0] for poll_object in poll_objects], indexes)
+    _observe_walk(poll_objects, perf_counter() - start)
+    return {
+        poll_object: poll_object().process(rows[poll_object.OID[0]])
+        for poll_object in poll_objects
+    }
@@ -0,0 +1,31 @@
+from snmpservice.utils.metrics import metrics
+from snmpservice.trapping.store import trap_datastore
+from snmpservice.trapping.pipeline import trap_pipeline
+from snmpservice.trapping.suppression import trap_suppressor
+from snmpservice.polling.cache import poll_cache
+from snmpservice.polling.scheduler import poll_scheduler
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+# Read from the components' own counters when scraped.
+metrics.gauge("snmp_trap_store_traps", "Traps held by the trap store.", lambda: trap_datastore.stats()["Traps"])
+metrics.gauge("snmp_trap_store_devices", "Devices with a trap subscription.", lambda: trap_datastore.stats()["Devices"])
+metrics.gauge("snmp_trap_queue_depth", "Received traps queued for the trap workers.", lambda: trap_pipeline.stats()["Depth"])
+metrics.collected("snmp_trap_queue_dropped_total", "Received traps dropped as the trap queue was full.", lambda: trap_pipeline.stats()["Dropped"])
+metrics.collected(
+    "snmp_traps_suppressed_total", "Received traps suppressed during storms, by reason.",
+    lambda: {(reason,): count for reason, count in trap_suppressor.stats()["SuppressedBy"].items()}, ("reason",)
+)
+metrics.gauge("snmp_poll_cache_entries", "Poll results held by the poll cache.", lambda: poll_cache.stats()["Entries"])
+metrics.gauge("snmp_poll_scheduled_devices", "Devices scheduled for background polling.", lambda: len(poll_scheduler.devices()))
+
+@router.get('/metrics', response_class=PlainTextResponse,
+    responses = {200: {"content": {"text/plain": {}}, "description": "Metrics in the Prometheus text exposition format."}}
+)
+def metrics_endpoint() -> PlainTextResponse:
+    """Retrieve poll and trap metrics for scraping by Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,19 +1,29 @@
 from snmpservice.polling.strategies.default import DefaultStrategyModel
+from snmpservice.utils.models.polling import BatchPollRequest
 from snmpservice.utils.exceptions import *
 from snmpservice.settings import settings
 from snmpservice.utils.logger import logger
 from snmpservice.utils.helpers import is_ipv4_address
-from snmpservice.polling.poller import poll
+from snmpservice.polling.cache import poll_cache
+from snmpservice.polling.scheduler import poll_scheduler
+from snmpservice.polling.batch import BatchTarget, poll_batch
+from snmpservice.utils.responses import fast_response, dumps
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
 router = APIRouter(
     prefix="/poll",
     tags=["poll"],
     responses = {
         200: {
-            "description": "Poll succeeded. DefaultStrategyModel encoded in payload.",
-            "model": DefaultStrategyModel
+            "description": "Poll succeeded. DefaultStrategyModel encoded in payload. "
+                           "The X-Cache header is SCHEDULED if served from the device's background polling "
+                           "schedule, HIT if served from cache, COALESCED if shared with a concurrent identical "
+                           "request, MISS otherwise. Age gives the result's age in seconds. "
+                           "Sent as MessagePack if the Accept header prefers application/msgpack (and msgpack is installed).",
+            "model": DefaultStrategyModel,
+            "content": {"application/msgpack": {}}
         },
         460: {
             "description": "SNMP inputs are invalid.",
@@ -25,24 +35,85 @@ router = APIRouter(
 )
 
 @router.get('/{ip}')
-def default_poll_endpoint(ip: str, port: int = settings.snmp_poll_port, community: str = settings.snmp_poll_community) -> DefaultStrategyModel:
-    """Request an SNMP poll on the device with IP passed in URI path."""
+async def default_poll_endpoint(request: Request, response: Response, ip: str, port: int = settings.snmp_poll_port, community: str = settings.snmp_poll_community, max_age: float | None = None) -> DefaultStrategyModel:
+    """
+    Request an SNMP poll on the device with IP passed in URI path.
+    If the device is scheduled for background polling, its last polled
+    result is served. Otherwise a recent result may be served from cache.
+    'max_age' sets the oldest result (in seconds) the caller accepts,
+    default any age for scheduled devices and snmp_poll_cache_ttl otherwise.
+    """
     try:
         # Validate inputs
         if is_ipv4_address(ip) == False:
             raise InvalidInput("'ip' input must be a valid IP address.")
         if not isinstance(port, int) or (isinstance(port, str) and not port.isnumeric()):
             raise InvalidInput("'port' input must be an integer.")
+        if max_age is not None and max_age < 0:
+            raise InvalidInput("'max_age' input must not be negative.")
         
         logger.debug(f"Performing SNMP poll with vars:"
                     f"\n| IP: {ip}"
                     f"\n| Port: {port}"
                     f"\n| Community: {community}"
         )
-        poll_response = poll(ip=ip, port=int(port), community=community, strategy="default")
-        print(poll_response)
+        # Serve last known state if the device is polled in the background.
+        scheduled = poll_scheduler.get(ip)
+        if (scheduled is not None and scheduled.last_result is not None 
+                and scheduled.matches(int(port), community, "default")
+                and (max_age is None or scheduled.age() <= max_age)):
+            poll_response = scheduled.last_result
+            response.headers["X-Cache"] = "SCHEDULED"
+            response.headers["Age"] = str(int(scheduled.age()))
+        else:
+            cached = await poll_cache.get_or_poll(ip=ip, port=int(port), community=community, strategy="default", max_age=max_age)
+            poll_response = cached.result
+            response.headers["X-Cache"] = cached.source
+            response.headers["Age"] = str(int(cached.age))
     except InvalidInput as e:
         raise HTTPException(status_code = 460, detail = f"Invalid Input: {e}")
     except DeviceUnreachable as e:
         raise HTTPException(status_code = 461, detail = f"Device Unreachable.")
-    return poll_response
+    if not settings.api_fast_responses:
+        return poll_response
+    # Already assembled from a validated DefaultStrategyModel: serialize as is.
+    return fast_response(poll_response, request.headers.get("accept"), dict(response.headers))
+
+@router.post('/batch',
+    responses = {
+        200: {
+            "description": "Newline-delimited JSON, one line per target, streamed as each device's poll completes. "
+                           "Each line holds IpAddress, Port, Status (200 or the /poll/{ip} error status, "
+                           "504 if the deadline passed), Result (DefaultStrategyModel or null) and Error.",
+            "content": {"application/x-ndjson": {}}
+        },
+        460: {
+            "description": "Batch inputs are invalid.",
+        }
+    }
+)
+async def batch_poll_endpoint(request: BatchPollRequest) -> StreamingResponse:
+    """
+    Request SNMP polls on many devices. Polls run concurrently (bounded by
+    'Concurrency') and each device has 'Deadline' seconds to respond.
+    Per-target failures are reported inline and never fail the batch.
+    """
+    if len(request.Targets) > settings.snmp_poll_batch_max_targets:
+        raise HTTPException(status_code = 460, detail = f"Invalid Input: at most {settings.snmp_poll_batch_max_targets} targets per batch.")
+    concurrency = min(request.Concurrency or settings.snmp_poll_batch_concurrency, settings.snmp_poll_batch_concurrency)
+    deadline = request.Deadline or settings.snmp_poll_batch_deadline
+
+    targets = [
+        BatchTarget(
+            ip = target.IpAddress,
+            port = target.Port or settings.snmp_poll_port,
+            community = target.Community or settings.snmp_poll_community
+        )
+        for target in request.Targets
+    ]
+    logger.debug(f"Performing batch SNMP poll of {len(targets)} targets (concurrency {concurrency}, deadline {deadline}s).")
+
+    async def _stream():
+        async for result in poll_batch(targets, "default", concurrency, deadline):
+            yield dumps(result) + b"\n"
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
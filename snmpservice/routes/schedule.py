@@ -0,0 +1,83 @@
+from snmpservice.utils.models.polling import ScheduledDeviceModel, ScheduleResponse
+from snmpservice.polling.scheduler import poll_scheduler
+from snmpservice.utils.helpers import is_ipv4_address, timestamp
+from snmpservice.settings import settings
+from fastapi import APIRouter, HTTPException
+
+router = APIRouter(
+    prefix="/schedule",
+    tags=["Poll Schedule"]
+)
+
+@router.get('',
+    responses = {
+        200: {
+            "description": "Scheduled devices, soonest due first. NextDue and LastPolled are epoch timestamps.",
+            "model": ScheduleResponse
+        }
+    }
+)
+async def list_schedule_endpoint() -> ScheduleResponse:
+    """List devices scheduled for background polling and when each is next due."""
+    return ScheduleResponse(
+        Timestamp=timestamp(),
+        Devices=[device.to_dict() for device in poll_scheduler.devices()]
+    )
+
+@router.get('/{ip}',
+    responses = {
+        200: {
+            "description": "Device is scheduled for background polling.",
+            "model": ScheduledDeviceModel
+        },
+        404: {
+            "description": "Device is not scheduled."
+        }
+    }
+)
+async def get_schedule_endpoint(ip: str) -> ScheduledDeviceModel:
+    """Get the background polling schedule for device with IP."""
+    device = poll_scheduler.get(ip)
+    if device is None:
+        raise HTTPException(404, detail=f'No schedule exists for IP "{ip}"')
+    return ScheduledDeviceModel(**device.to_dict())
+
+@router.put('/{ip}',
+    status_code = 201,
+    responses = {
+        201: {
+            "description": "Device scheduled for background polling, or its schedule replaced.",
+            "model": ScheduledDeviceModel
+        },
+        460: {
+            "description": "Schedule inputs are invalid.",
+        }
+    }
+)
+async def create_schedule_endpoint(ip: str, interval: float, port: int = settings.snmp_poll_port, community: str = settings.snmp_poll_community) -> ScheduledDeviceModel:
+    """
+    Schedule device with IP to be polled every 'interval' seconds in the background.
+    /poll/{ip} then serves the last polled result for the device.
+    """
+    if not is_ipv4_address(ip):
+        raise HTTPException(status_code = 460, detail = "Invalid Input: 'ip' input must be a valid IP address.")
+    if interval < settings.snmp_poll_scheduler_min_interval:
+        raise HTTPException(status_code = 460, detail = f"Invalid Input: 'interval' must be at least {settings.snmp_poll_scheduler_min_interval}s.")
+    device = poll_scheduler.register(ip=ip, port=port, community=community, strategy="default", interval=interval)
+    return ScheduledDeviceModel(**device.to_dict())
+
+@router.delete('/{ip}',
+    responses = {
+        200: {
+            "description": "Device's background polling schedule deleted."
+        },
+        404: {
+            "description": "Device is not scheduled."
+        }
+    }
+)
+async def delete_schedule_endpoint(ip: str) -> dict:
+    """Stop background polling of device with IP."""
+    if poll_scheduler.unregister(ip):
+        return {"IpAddress": ip, "Timestamp": timestamp(), "Message": f'Schedule for IP "{ip}" successfully deleted.'}
+    raise HTTPException(404, detail=f'No schedule exists for IP "{ip}"')
@@ -0,0 +1,66 @@
+from snmpservice.polling.bulksize import bulk_sizer
+from snmpservice.polling.engine import engine_pool
+from snmpservice.polling.client import snmp_client
+from snmpservice.polling.cache import poll_cache
+from snmpservice.polling.rates import counter_rates
+from snmpservice.polling.differential import static_columns
+from snmpservice.trapping.oids import oid_labels
+from snmpservice.trapping.store import trap_datastore
+from snmpservice.trapping.journal import trap_journal
+from snmpservice.trapping.pipeline import trap_pipeline
+from snmpservice.trapping.sharded import sharded_trap_receiver
+from snmpservice.trapping.stream import trap_broadcaster
+from snmpservice.trapping.suppression import trap_suppressor
+from snmpservice.utils.helpers import timestamp
+from fastapi import APIRouter, HTTPException
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"]
+)
+
+@router.get('/polling')
+def get_polling_stats_endpoint() -> dict:
+    """Retrieve SNMP engine pool, native transport client, poll cache, counter rate and static column cache counters, and learned GETBULK sizing for every device."""
+    return {
+        "Timestamp": timestamp(),
+        "EnginePool": engine_pool.stats(),
+        "Client": snmp_client.stats(),
+        "PollCache": poll_cache.stats(),
+        "CounterRates": counter_rates.stats(),
+        "StaticColumns": static_columns.stats(),
+        "BulkSizing": bulk_sizer.stats(),
+    }
+
+@router.get('/polling/{ip}')
+def get_device_polling_stats_endpoint(ip: str) -> dict:
+    """
+    Retrieve the GETBULK sizing learned for device with IP, keyed on table.
+    Shows the max-repetitions the device's agent tolerates.
+    """
+    stats = bulk_sizer.stats(ip)
+    if ip not in stats:
+        raise HTTPException(404, detail=f'No polling stats recorded for IP "{ip}"')
+    return {"Timestamp": timestamp(), "IpAddress": ip, "BulkSizing": stats[ip]}
+
+@router.get('/trapping')
+def get_trapping_stats_endpoint() -> dict:
+    """Retrieve trap receiver counters, such as queue depth and drops, OID label cache hits and misses, trap store evictions, trap store log writes and traps suppressed during storms."""
+    return {
+        "Timestamp": timestamp(),
+        "Queue": trap_pipeline.stats(),
+        "OidLabels": oid_labels.stats(),
+        "TrapStore": trap_datastore.stats(),
+        "Journal": trap_journal.stats(),
+        "Shards": sharded_trap_receiver.stats(),
+        "Streams": trap_broadcaster.stats(),
+        "Suppression": trap_suppressor.stats(),
+    }
+
+@router.get('/trapping/{ip}')
+def get_device_trapping_stats_endpoint(ip: str) -> dict:
+    """
+    Retrieve the traps from device with IP dropped by storm suppression, 
+    keyed on reason (Source or Interface rate limit, or Flapping).
+    """
+    return {"Timestamp": timestamp(), "IpAddress": ip, "Suppressed": trap_suppressor.stats(ip)}
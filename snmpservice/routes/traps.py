@@ -1,15 +1,23 @@
-from snmpservice.utils.models.trapping import GetTrapsResponse
+from snmpservice.utils.models.trapping import GetTrapsResponse, GetTrapParsersResponse
 from snmpservice.trapping.store import trap_datastore
+from snmpservice.trapping.parsers import trap_parsers
+from snmpservice.trapping.stream import trap_broadcaster, TrapSubscriber, WILDCARD
 from snmpservice.utils.helpers import timestamp
-from fastapi import APIRouter, HTTPException
+from snmpservice.utils.responses import fast_response
+from snmpservice.settings import settings
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+import asyncio
 
 router = APIRouter(
     prefix="/traps",
     tags=["traps"],
     responses = {
         200: {
-            "description": "Succesfully retrieved stored SNMP traps.",
-            "model": GetTrapsResponse
+            "description": "Succesfully retrieved stored SNMP traps. "
+                           "Sent as MessagePack if the Accept header prefers application/msgpack (and msgpack is installed).",
+            "model": GetTrapsResponse,
+            "content": {"application/msgpack": {}}
         },
         404: {
             "description": "Subscription does not exist for IP. Create subscription and try again."
@@ -17,12 +25,121 @@ router = APIRouter(
     }
 )
 
+# Declared before /{ip}, which would otherwise match it.
+@router.get('/parsers',
+    responses = {
+        200: {
+            "description": "Registered trap parsers, keyed on the trap (lexical name or numeric OID) they handle.",
+            "model": GetTrapParsersResponse
+        }
+    }
+)
+async def get_trap_parsers_endpoint() -> GetTrapParsersResponse:
+    """List the trap parsers registered with the trap receiver, and the traps each handles."""
+    return GetTrapParsersResponse(Parsers=trap_parsers.parsers(), Timestamp=timestamp())
+
+async def _event_stream(subscriber: TrapSubscriber):
+    # Server-Sent Events: one "trap" event per stored trap, comment lines as
+    # keep-alives, and an "overflow" event if the client fell too far behind.
+    try:
+        while not subscriber.closed:
+            batch = await subscriber.next_batch(settings.snmp_trap_stream_keepalive)
+            if batch:
+                yield ''.join(f"event: trap\ndata: {data}\n\n" for data in batch)
+            elif not subscriber.closed:
+                yield ": keep-alive\n\n"
+        if subscriber.overflowed:
+            yield "event: overflow\ndata: {}\n\n"
+    finally:
+        trap_broadcaster.unsubscribe(subscriber)
+
+async def _websocket_stream(websocket: WebSocket, subscriber: TrapSubscriber):
+    # WebSocket: one text message (Trap JSON) per stored trap. Closed with
+    # 1013 (try again later) if the client fell too far behind.
+    async def _watch_disconnect():
+        # Messages from the client are ignored. Reading them is how a
+        # disconnect is noticed while no traps are being sent.
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            subscriber.close()
+
+    watcher = asyncio.create_task(_watch_disconnect())
+    try:
+        while not subscriber.closed:
+            for data in await subscriber.next_batch(settings.snmp_trap_stream_keepalive):
+                await websocket.send_text(data)
+        if subscriber.overflowed:
+            await websocket.close(code=1013, reason="Slow consumer")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        trap_broadcaster.unsubscribe(subscriber)
+
+STREAM_RESPONSES = {
+    200: {
+        "description": "Server-Sent Events stream. Each 'trap' event's data is a Trap, as JSON.",
+        "content": {"text/event-stream": {}}
+    }
+}
+
+@router.get('/stream', responses = STREAM_RESPONSES)
+async def stream_all_traps_endpoint() -> StreamingResponse:
+    """
+    Stream SNMP traps of every subscribed device as they are stored, as
+    Server-Sent Events. Also served as a WebSocket on the same path.
+    """
+    subscriber = trap_broadcaster.subscribe(WILDCARD)
+    return StreamingResponse(_event_stream(subscriber), media_type="text/event-stream")
+
+@router.websocket('/stream')
+async def stream_all_traps_websocket(websocket: WebSocket):
+    await websocket.accept()
+    await _websocket_stream(websocket, trap_broadcaster.subscribe(WILDCARD))
+
+@router.get('/{ip}/stream', responses = STREAM_RESPONSES)
+async def stream_traps_endpoint(ip: str) -> StreamingResponse:
+    """
+    Stream SNMP traps of device with IP as they are stored, as Server-Sent
+    Events. Also served as a WebSocket on the same path. Clients falling
+    more than snmp_trap_stream_buffer traps behind are disconnected.
+    """
+    if not await trap_datastore.has_subscription(ip):
+        raise HTTPException(404, detail=f'No subscription exists for IP "{ip}"')
+    subscriber = trap_broadcaster.subscribe(ip)
+    return StreamingResponse(_event_stream(subscriber), media_type="text/event-stream")
+
+@router.websocket('/{ip}/stream')
+async def stream_traps_websocket(websocket: WebSocket, ip: str):
+    if not await trap_datastore.has_subscription(ip):
+        await websocket.close(code=1008, reason=f'No subscription exists for IP "{ip}"')
+        return
+    await websocket.accept()
+    await _websocket_stream(websocket, trap_broadcaster.subscribe(ip))
+
 @router.get('/{ip}')
-async def get_traps_endpoint(ip:str) -> GetTrapsResponse | None:
+async def get_traps_endpoint(request: Request, ip:str, since: int = 0, limit: int | None = None) -> GetTrapsResponse | None:
     """
-    Retrieve the stored SNMP traps for device with IP. 
+    Retrieve the stored SNMP traps for device with IP, oldest first.
     Will not auto-create a trap subscription if one does not exist.
+
+    Every stored trap has a Sequence number, increasing as traps are stored.
+    Pass the previous response's 'Next' as 'since' to retrieve only traps 
+    stored since, at most 'limit' at a time.
     """
+    if since < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code = 460, detail = "Invalid Input: 'since' must be at least 0 and 'limit' at least 1.")
     if await trap_datastore.has_subscription(ip):
-        return GetTrapsResponse(Traps=await trap_datastore.get_traps(ip), Timestamp=timestamp())
+        traps = await trap_datastore.get_traps(ip, since=since, limit=limit)
+        next_sequence = traps[-1].Sequence if traps else since
+        if settings.api_fast_responses:
+            # Stored traps are already validated: serialize them as is, in GetTrapsResponse field order.
+            return fast_response(
+                dict(Timestamp=timestamp(), Traps=traps, Next=next_sequence), request.headers.get("accept")
+            )
+        return GetTrapsResponse(Traps=traps, Next=next_sequence, Timestamp=timestamp())
     raise HTTPException(404, detail=f'No subscription exists for IP "{ip}"')
\ No newline at end of file
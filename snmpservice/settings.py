@@ -1,4 +1,5 @@
 from pydantic import BaseSettings
+from typing import Literal
 
 # This isn't the best way of providing configuration for this service.
 # Realistically, we should be parsing environment variables and using
@@ -22,6 +23,36 @@ class Settings(BaseSettings):
     snmp_trap_port: int = 162
     snmp_trap_community: str  = "public"
     snmp_trap_mib_modules: tuple = ('SNMPv2-MIB', 'SNMP-COMMUNITY-MIB', 'IF-MIB', 'LLDP-MIB')
+    snmp_trap_oid_cache_size: int = 65536 # Numeric OID -> label translations memoized (LRU evicted).
+    snmp_trap_oid_cache_prewarm: bool = True # Index every node of snmp_trap_mib_modules at startup.
+    snmp_trap_store_max_per_device: int = 1000 # Traps held per device (oldest evicted). 0 = unbounded.
+    snmp_trap_store_max_age: float = 86400.0 # Seconds a stored trap is held for. 0 = forever.
+    snmp_trap_store_max_traps: int = 100000 # Traps held across all devices (oldest evicted). 0 = unbounded.
+    snmp_trap_store_path: str = "" # Append-only log persisting trap subscriptions and stored traps across restarts. "" = memory only.
+    snmp_trap_store_fsync: bool = False # fsync the trap store log after every batch written.
+    snmp_trap_store_batch_size: int = 512 # Trap store log records which trigger a write.
+    snmp_trap_store_flush_interval: float = 0.1 # Longest a trap store log record is held before being written, in seconds.
+    snmp_trap_store_compact_ratio: float = 4.0 # Compact the trap store log once it holds this many records per stored trap.
+    snmp_trap_rate_source: float = 100.0 # Traps/s sustained per source address before traps are suppressed. 0 = unlimited.
+    snmp_trap_rate_source_burst: int = 500 # Traps a source address may send at once.
+    snmp_trap_rate_interface: float = 2.0 # Traps/s sustained per source interface before traps are suppressed. 0 = unlimited.
+    snmp_trap_rate_interface_burst: int = 20 # Traps a source interface may send at once.
+    snmp_trap_flap_traps: tuple = ('linkUp', 'linkDown', '1.3.6.1.6.3.1.1.5.4', '1.3.6.1.6.3.1.1.5.3') # Traps (names or OIDs) damped as interface state changes.
+    snmp_trap_flap_penalty: float = 1000.0 # Flap damping penalty added per interface state change. 0 = no damping.
+    snmp_trap_flap_suppress: float = 3000.0 # Penalty beyond which an interface is flapping, and its traps suppressed.
+    snmp_trap_flap_reuse: float = 750.0 # Penalty below which a flapping interface's traps are stored again.
+    snmp_trap_flap_half_life: float = 60.0 # Seconds for a flap damping penalty to halve.
+    snmp_trap_flap_max_suppress: float = 600.0 # Longest an interface stays suppressed once it stops flapping, in seconds.
+    snmp_trap_flap_sweep_interval: float = 1.0 # Seconds between checks for interfaces which stopped flapping, whose last state is then stored.
+    snmp_trap_suppression_max_keys: int = 65536 # Sources and interfaces tracked for rate limits and damping (LRU evicted).
+    snmp_trap_workers: int = 2 # Worker threads parsing and storing received traps.
+    snmp_trap_queue_size: int = 10000 # Received traps queued for the workers.
+    snmp_trap_queue_overflow: str = "drop-oldest" # "drop-oldest" or "drop-newest" when the queue is full.
+    snmp_trap_shards: int = 0 # Receiver processes sharing snmp_trap_port via SO_REUSEPORT. 0 = one in-process receiver.
+    snmp_trap_shard_batch_size: int = 256 # Parsed traps a shard sends to the trap store per message.
+    snmp_trap_shard_flush_interval: float = 0.05 # Longest a shard holds a part-filled batch, in seconds.
+    snmp_trap_stream_buffer: int = 1000 # Traps buffered per stream client before it is disconnected as too slow.
+    snmp_trap_stream_keepalive: float = 15.0 # Seconds between keep-alives on an idle trap stream.
 
     # =================================
     # SNMP Polling Mechanism Config
@@ -29,12 +60,40 @@ class Settings(BaseSettings):
     snmp_poll_community: str = "visualisation"
     snmp_poll_strategy: str = "default"
     snmp_poll_port: int  = 161
+    snmp_poll_engine_pool_size: int = 8 # Max SnmpEngines shared by concurrent polls.
+    snmp_poll_engine_max_uses: int = 1000 # Commands served before an engine is rebuilt. 0 = never.
+    snmp_poll_engine_pool_timeout: float = 30.0 # Seconds to wait for a free engine.
+    snmp_poll_max_repetitions: int = 50 # Initial (and largest) GETBULK max-repetitions.
+    snmp_poll_min_repetitions: int = 1 # Smallest max-repetitions to back off to on tooBig/timeouts.
+    snmp_poll_repetitions_ttl: float = 3600.0 # Seconds a learned max-repetitions is remembered.
+    snmp_poll_batch_concurrency: int = 100 # Default (and maximum) polls in flight per /poll/batch request.
+    snmp_poll_batch_deadline: float = 30.0 # Default seconds each device in a batch may take.
+    snmp_poll_batch_max_targets: int = 10000 # Maximum targets accepted per /poll/batch request.
+    snmp_poll_cache_ttl: float = 10.0 # Default max age of a cached /poll/{ip} result. 0 = coalesce only.
+    snmp_poll_cache_max_entries: int = 1024 # Maximum cached poll results (LRU evicted).
+    snmp_poll_cache_max_stale: float = 300.0 # Cached results older than this are never served.
+    snmp_poll_scheduler_concurrency: int = 200 # Maximum scheduled polls in flight at once.
+    snmp_poll_scheduler_jitter: float = 0.1 # Fraction of a device's interval its due times vary by.
+    snmp_poll_scheduler_max_backoff: float = 900.0 # Longest delay between polls of an unreachable device.
+    snmp_poll_scheduler_min_interval: float = 10.0 # Shortest poll interval a device may be scheduled at.
+    snmp_poll_rate_samples: int = 8 # Octet counter samples kept per device for InBps/OutBps.
+    snmp_poll_rate_max_devices: int = 4096 # Devices whose counter samples are kept (LRU evicted).
+    snmp_poll_differential: bool = True # Re-walk static columns only when change markers move.
+    snmp_poll_static_max_age: float = 3600.0 # Static columns are re-walked at least this often.
+    snmp_poll_static_max_devices: int = 4096 # Devices whose static columns are cached (LRU evicted).
+    snmp_poll_data_interfaces: tuple = (r'((gigabit|fast)ethernet|gi|fa)[0-9]+(/[0-9]+)+', r'(ge|et|xe)-[0-9]+(/[0-9]+)+') # Regexes (case-insensitive, whole name) of data interface names. Others are left out of polls and link traps.
+    snmp_poll_pushdown: bool = True # Fetch ifTable/ifXTable columns for data interfaces only, with GETs, when cheaper than walking them.
+    snmp_poll_get_max_varbinds: int = 40 # Varbinds per GET when fetching selected rows of table columns.
+    snmp_poll_transport: Literal["pysnmp", "native"] = "pysnmp" # "pysnmp", or "native": built-in SNMPv2c codec, with every request multiplexed over one UDP socket.
+    snmp_poll_client_resolution: float = 0.01 # Timeout and retry timer resolution of the native transport, in seconds.
+    snmp_poll_client_receive_buffer: int = 4194304 # Receive buffer (SO_RCVBUF) of the native transport's socket, in bytes.
 
     # =================================
     # Miscellaneous Config
     # =================================
     log_level: str  = "DEBUG"
     log_filename: str = "/tmp/dataservice.log"
+    api_fast_responses: bool = True # Serialize /poll/{ip} and /traps/{ip} results straight to JSON (orjson if installed) or MessagePack, skipping response model validation.
 
 settings = Settings()
 
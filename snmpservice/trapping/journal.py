@@ -0,0 +1,241 @@
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable, Iterable
+import mmap
+import os
+
+# Journal record kinds. A record is one line: kind, ip, then any payload, space separated.
+SUBSCRIBE = b"S"
+UNSUBSCRIBE = b"U"
+TRAP = b"T"
+
+# Smallest log considered for compaction, in records.
+COMPACT_MIN_RECORDS = 1024
+
+class TrapJournal:
+    """
+    Object persisting TrapDatastore changes to an append-only log file, so
+    subscriptions and stored traps survive a restart.
+
+    Records are appended to an in-memory batch by the writers of the store,
+    and written out by a single background thread once 'batch_size' records
+    are pending, or every 'flush_interval' seconds. With 'fsync' set, each
+    batch is fsynced before the next, bounding loss on power failure to one
+    batch; without it, only a crash of the host (not the service) loses data.
+
+    Evicted traps are not journaled. Instead, once the log holds
+    'compact_ratio' records per trap still stored, it is rewritten from a
+    snapshot of the store, taken atomically with respect to new records.
+
+    On startup, replay reads the log through a memory map, and truncates a
+    partially written final record left by a crash.
+
+    Positional arguments:
+    path           : str   : Log file path.
+    fsync          : bool  : fsync the log after every batch.
+    batch_size     : int   : Pending records which trigger a write.
+    flush_interval : float : Longest a record is held before being written, in seconds.
+    compact_ratio  : float : Records per stored trap which trigger compaction.
+
+    Methods:
+    replay : Call a function with every record in the log.
+    start  : Open the log for appending, and start the writer thread.
+    append : Queue a record to be written.
+    cut    : Discard pending records covered by a compaction snapshot.
+    close  : Write any pending records and stop the writer thread.
+    stats  : Return journal counters.
+    """
+    def __init__(self, path: str, fsync: bool, batch_size: int, flush_interval: float, compact_ratio: float):
+        self.path = path
+        self._fsync = fsync
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(0.001, flush_interval)
+        self._compact_ratio = max(1.0, compact_ratio)
+        self._file = None
+        self._snapshot = None
+        self._stored = None
+        self._pending = []
+        self._covered = [] # Pending records covered by the snapshot being compacted.
+        self._lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self._thread = None
+        self._records = 0 # Records in the log file, or pending.
+        self._bytes = 0
+        self._batches = 0
+        self._compactions = 0
+        self._replayed = 0
+        self._replay_seconds = 0.0
+
+    def replay(self, apply: Callable[[bytes, str, bytes], None]) -> int:
+        """
+        Calls apply(kind, ip, payload) for every complete record in the log, in order.
+
+        Returns:
+        Number of records replayed.
+        """
+        start = monotonic()
+        replayed = end = 0
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "r+b") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                position = 0
+                while (end := data.find(b"\n", position)) >= 0:
+                    kind, ip, payload = (data[position:end].split(b" ", 2) + [b""])[:3]
+                    try:
+                        apply(kind, ip.decode(), payload)
+                    except Exception as e:
+                        logger.error(f"[TrapJournal] Skipping unreadable record at byte {position} of {self.path}: {e}")
+                    replayed += 1
+                    position = end + 1
+                end, size = position, len(data)
+            if end < size:
+                logger.warning(f"[TrapJournal] Truncating {size - end} byte(s) of a partially written record from {self.path}.")
+                os.truncate(self.path, end)
+
+        self._records = self._replayed = replayed
+        self._bytes = end
+        self._replay_seconds = monotonic() - start
+        logger.info(f"[TrapJournal] Replayed {replayed} record(s) from {self.path} in {self._replay_seconds:.3f}s.")
+        return replayed
+
+    def start(self, snapshot: Callable[[], Iterable[tuple]], stored: Callable[[], int]):
+        """
+        Opens the log for appending, and starts the writer thread.
+
+        Positional arguments:
+        snapshot : Callable : Returns (kind, ip, payload) records recreating
+                              the store. Must call cut() while the store's
+                              writers are held off.
+        stored   : Callable : Returns the number of traps stored.
+        """
+        if self._thread:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._snapshot = snapshot
+        self._stored = stored
+        self._stopped.clear()
+        self._thread = Thread(target=self._write, name="TrapJournal", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def encode(kind: bytes, ip: str, payload: bytes = b"") -> bytes:
+        """Returns the log line for a record."""
+        return kind + b" " + ip.encode() + (b" " + payload if payload else b"") + b"\n"
+
+    def append(self, kind: bytes, ip: str, payload: bytes = b""):
+        """
+        Queues a record to be written. Never blocks on disk. Records must be
+        appended in the order they were applied to the store.
+        """
+        with self._lock:
+            self._pending.append(self.encode(kind, ip, payload))
+            self._records += 1
+            if len(self._pending) >= self._batch_size:
+                self._wake.set()
+
+    def cut(self):
+        """
+        Discards pending records, as covered by the snapshot being taken.
+        Must be called by the snapshot, with the store's writers held off.
+        """
+        with self._lock:
+            self._covered, self._pending = self._pending, []
+            self._records = 0
+
+    def _write(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            self._flush()
+            self._maybe_compact()
+        self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        data = b"".join(batch)
+        try:
+            self._file.write(data)
+            self._file.flush()
+            if self._fsync:
+                os.fsync(self._file.fileno())
+        except OSError as e:
+            logger.error(f"[TrapJournal] Failed writing {len(batch)} record(s) to {self.path}: {e}")
+            return
+        self._bytes += len(data)
+        self._batches += 1
+
+    def _maybe_compact(self):
+        records = self._records
+        if records < COMPACT_MIN_RECORDS or records < self._compact_ratio * self._stored():
+            return
+        start = monotonic()
+        temporary = self.path + ".compact"
+        written = 0
+        try:
+            with open(temporary, "wb") as file:
+                for record in self._snapshot():
+                    file.write(self.encode(*record))
+                    written += 1
+                file.flush()
+                os.fsync(file.fileno())
+            self._file.close()
+            os.replace(temporary, self.path)
+        except OSError as e:
+            # The old log is intact, but lacks the records cut from the batch.
+            logger.error(f"[TrapJournal] Failed compacting {self.path}: {e}")
+            with self._lock:
+                self._pending[:0] = self._covered
+                self._records += records
+            return
+        finally:
+            self._covered = []
+            if self._file.closed:
+                self._file = open(self.path, "ab")
+        with self._lock:
+            self._records += written
+        self._bytes = self._file.tell()
+        self._compactions += 1
+        logger.info(f"[TrapJournal] Compacted {records} record(s) to {written} in {monotonic() - start:.3f}s.")
+
+    def close(self):
+        """Writes any pending records, then stops the writer thread."""
+        if not self._thread:
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def stats(self) -> dict:
+        """Returns a dictionary of journal counters."""
+        with self._lock:
+            pending = len(self._pending)
+        return dict(
+            Path=self.path,
+            Fsync=self._fsync,
+            Records=self._records,
+            Pending=pending,
+            Bytes=self._bytes,
+            Batches=self._batches,
+            Compactions=self._compactions,
+            Replayed=self._replayed,
+            ReplaySeconds=round(self._replay_seconds, 3),
+        )
+
+trap_journal = TrapJournal(
+    path = settings.snmp_trap_store_path,
+    fsync = settings.snmp_trap_store_fsync,
+    batch_size = settings.snmp_trap_store_batch_size,
+    flush_interval = settings.snmp_trap_store_flush_interval,
+    compact_ratio = settings.snmp_trap_store_compact_ratio,
+)
@@ -0,0 +1,114 @@
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from pysnmp.smi import rfc1902, view
+from pyasn1.type.univ import ObjectIdentifier
+from collections import OrderedDict
+from threading import Lock
+from re import compile
+
+# Dotted-decimal OID string, e.g. "1.3.6.1.2.1.1.3.0"
+NUMERIC_OID_RGX = compile(r"^\d+(\.\d+)+$")
+
+class OidLabelCache:
+    """
+    Object translating numeric OIDs to the label of the MIB node they fall
+    under (e.g. 1.3.6.1.2.1.31.1.1.1.1.3 -> ifName), memoizing the results.
+
+    Translated OIDs are held in a bounded LRU keyed on the numeric OID.
+    When pre-warmed, every node of the loaded MIB modules is indexed up
+    front, and a miss is resolved by longest-prefix lookup in that index
+    rather than through the MIB view controller. Values that are not OIDs
+    (integers, strings...) are returned as strings without any lookup.
+
+    Positional arguments:
+    max_entries : int : Translated OIDs held.
+
+    Methods:
+    load  : Attach the MIB view controller to resolve with, optionally pre-warming.
+    label : Translate a varbind name or value.
+    stats : Return cache counters.
+    """
+    def __init__(self, max_entries: int):
+        self._max_entries = max(1, max_entries)
+        self._entries = OrderedDict() # numeric OID tuple -> label
+        self._nodes = {} # MIB node OID tuple -> label
+        self._mib_view_controller = None
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._short_circuits = 0
+
+    def load(self, mib_view_controller: view.MibViewController, prewarm: bool = True):
+        """
+        Sets the MIB view controller used to resolve OIDs. If prewarm, indexes
+        every node of the modules it has loaded.
+        """
+        nodes = {}
+        if prewarm:
+            oid, label, _ = mib_view_controller.getFirstNodeName()
+            while True:
+                nodes[tuple(oid)] = str(label[-1])
+                try:
+                    oid, label, _ = mib_view_controller.getNextNodeName(oid)
+                except Exception:
+                    break
+        with self._lock:
+            self._mib_view_controller = mib_view_controller
+            self._nodes = nodes
+            self._entries.clear()
+        logger.debug(f"[OidLabelCache] Indexed {len(nodes)} MIB nodes.")
+
+    def _resolve(self, oid: tuple) -> str:
+        # Longest-prefix match against the pre-warmed nodes, falling back to the MIB view controller.
+        for length in range(len(oid), 0, -1):
+            label = self._nodes.get(oid[:length])
+            if label is not None:
+                return label
+        try:
+            return str(rfc1902.ObjectIdentity(oid).resolveWithMib(self._mib_view_controller).getLabel()[-1])
+        except Exception:
+            return '.'.join(map(str, oid))
+
+    def label(self, value) -> str:
+        """
+        Attempts to translate value to the human-friendly representation.
+        e.g. 1.3.6.1.2.1.1.2 -> sysObjectID
+
+        Anything that is not an OID is returned as str(value).
+        """
+        if isinstance(value, ObjectIdentifier):
+            oid = value.asTuple()
+        elif isinstance(value, str) and NUMERIC_OID_RGX.match(value):
+            oid = tuple(map(int, value.split('.')))
+        else:
+            self._short_circuits += 1
+            return str(value)
+
+        with self._lock:
+            label = self._entries.get(oid)
+            if label is not None:
+                self._hits += 1
+                self._entries.move_to_end(oid)
+                return label
+            self._misses += 1
+
+        label = self._resolve(oid)
+        with self._lock:
+            self._entries[oid] = label
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return label
+
+    def stats(self) -> dict:
+        """Returns a dictionary of cache counters."""
+        with self._lock:
+            return dict(
+                Entries=len(self._entries),
+                MibNodes=len(self._nodes),
+                Hits=self._hits,
+                Misses=self._misses,
+                ShortCircuited=self._short_circuits
+            )
+
+oid_labels = OidLabelCache(max_entries = settings.snmp_trap_oid_cache_size)
@@ -1,16 +1,15 @@
 from snmpservice.trapping.parsers.base import BaseTrapParser
+from snmpservice.trapping.parsers.registry import trap_parsers, trap_parser
 from snmpservice.trapping.parsers.link import *
-from inspect import isclass
 
-def get_parser_for_trap(trap: str) -> BaseTrapParser | None:
+# Built-in parsers register themselves on import. Add any installed third-party ones.
+trap_parsers.load_entry_points()
+
+def get_parser_for_trap(trap: str | None) -> BaseTrapParser | None:
     """
-    Iterates over globals to find derived classes of BaseTrapParser
-    and checks if any match name of given 'trap' variable. 
+    Looks up the parser class registered for 'trap', the lexical name or
+    numeric OID of an incoming trap's snmpTrapOID.
 
-    Returns class if found, else None.
+    Returns class if found, else None (including when trap is None).
     """
-    for var in globals().values():
-        if isclass(var) and issubclass(var, BaseTrapParser):
-            if var.__name__.lower() == trap.lower():
-                return var
-    return None
\ No newline at end of file
+    return trap_parsers.get(trap)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from snmpservice.trapping.parsers.base import BaseTrapParser
+from snmpservice.trapping.parsers.registry import trap_parser
 from snmpservice.utils.helpers import is_data_intf
 from typing import Tuple
 
@@ -21,9 +22,11 @@ class LinkStateParser(BaseTrapParser):
 
         return int_name, dict(State=change, Interface=int_name)
 
-# Human-readable OIDs of the traps that trigger this parser.
+# Human-readable and numeric OIDs of the traps that trigger this parser.
+@trap_parser("linkUp", "1.3.6.1.6.3.1.1.5.4")
 class linkUp(LinkStateParser):
     pass
 
+@trap_parser("linkDown", "1.3.6.1.6.3.1.1.5.3")
 class linkDown(LinkStateParser):
     pass
@@ -0,0 +1,106 @@
+from snmpservice.trapping.parsers.base import BaseTrapParser
+from snmpservice.utils.logger import logger
+
+from importlib.metadata import entry_points
+from inspect import isclass
+from threading import Lock
+from typing import List
+
+# Package entry point group third-party parsers register under. Each entry
+# point either names a BaseTrapParser subclass, registered for the trap named
+# by the entry point, or a module whose parsers register themselves with the
+# trap_parser decorator when imported. e.g. in a third-party pyproject.toml:
+#
+# [project.entry-points."snmpservice.trap_parsers"]
+# bgpEstablishedNotification = "myparsers.bgp:BgpStateParser"
+ENTRY_POINT_GROUP = "snmpservice.trap_parsers"
+
+class TrapParserRegistry:
+    """
+    Object mapping trap identifiers to the parser class handling them.
+
+    A trap is identified by its snmpTrapOID, which the trap receiver
+    translates to a lexical name when the defining MIB is loaded (e.g.
+    "linkDown"), and otherwise leaves numeric (e.g. "1.3.6.1.6.3.1.1.5.3").
+    Parsers are registered under either or both forms, and looked up with
+    a single dictionary access per trap. Lexical names are case-insensitive.
+
+    Methods:
+    register          : Register a parser class for one or more traps.
+    get               : Get the parser class for a trap.
+    load_entry_points : Register parsers advertised by installed packages.
+    parsers           : List registrations.
+    """
+    def __init__(self):
+        self._parsers = {} # normalised trap identifier -> (trap identifier, parser class, source)
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(trap: str) -> str:
+        return str(trap).strip().lower()
+
+    def register(self, parser: type, *traps: str, source: str = "builtin"):
+        """
+        Registers parser for each of traps. A later registration for the
+        same trap replaces the earlier one.
+
+        Raises:
+        TypeError : parser is not a BaseTrapParser subclass.
+        """
+        if not (isclass(parser) and issubclass(parser, BaseTrapParser)):
+            raise TypeError(f"{parser!r} is not a BaseTrapParser subclass.")
+        with self._lock:
+            for trap in traps:
+                replaced = self._parsers.get(self._key(trap))
+                if replaced is not None and replaced[1] is not parser:
+                    logger.warning(f"[TrapParserRegistry] {parser.__name__} replaces {replaced[1].__name__} for trap '{trap}'.")
+                self._parsers[self._key(trap)] = (trap, parser, source)
+
+    def get(self, trap: str | None) -> type | None:
+        """Returns the parser class registered for trap, or None."""
+        if not trap:
+            return None
+        entry = self._parsers.get(self._key(trap))
+        return entry[1] if entry is not None else None
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP):
+        """Loads and registers the parsers advertised under the entry point group."""
+        for entry_point in entry_points(group=group):
+            try:
+                loaded = entry_point.load()
+            except Exception as e:
+                logger.error(f"[TrapParserRegistry] Failed to load trap parser entry point '{entry_point.name}': {e}")
+                continue
+            # Modules register their parsers on import, via the trap_parser decorator.
+            if isclass(loaded):
+                try:
+                    self.register(loaded, entry_point.name, source=entry_point.value)
+                except TypeError as e:
+                    logger.error(f"[TrapParserRegistry] Entry point '{entry_point.name}': {e}")
+
+    def parsers(self) -> List[dict]:
+        """Returns every registration, sorted by trap."""
+        with self._lock:
+            entries = sorted(self._parsers.values(), key=lambda entry: self._key(entry[0]))
+        return [
+            dict(Trap=trap, Parser=f"{parser.__module__}.{parser.__name__}", TrapName=parser.TRAP_NAME, Source=source)
+            for trap, parser, source in entries
+        ]
+
+trap_parsers = TrapParserRegistry()
+
+def trap_parser(*traps: str):
+    """
+    Class decorator registering a BaseTrapParser subclass for the given
+    traps (lexical names and/or numeric OIDs). Without arguments, the
+    class is registered under its own name.
+
+    Usage:
+    @trap_parser("linkDown", "1.3.6.1.6.3.1.1.5.3")
+    class linkDown(LinkStateParser):
+        pass
+    """
+    def _register(parser: type) -> type:
+        trap_parsers.register(parser, *(traps or (parser.__name__,)), source=parser.__module__)
+        return parser
+    return _register
@@ -0,0 +1,145 @@
+from snmpservice.utils.logger import logger
+from snmpservice.utils.exceptions import *
+from snmpservice.settings import settings
+
+from collections import deque
+from threading import Condition, Lock, Thread
+from time import monotonic
+from typing import Callable
+
+# Overflow policies for a full TrapPipeline queue.
+DROP_OLDEST = "drop-oldest" # Discard the longest-queued trap to make room.
+DROP_NEWEST = "drop-newest" # Discard the incoming trap.
+
+class TrapPipeline:
+    """
+    Object decoupling trap reception from trap processing.
+
+    The trap receiver's dispatcher thread only submits the raw notification
+    (peer address, varbinds, receive time) to a bounded queue, and returns
+    to reading the socket. A pool of worker threads takes notifications off
+    the queue and runs the handler on them (OID translation, parsing and
+    storing). When the queue is full, 'overflow' decides which trap is lost.
+
+    The queue is sharded per worker on the peer address, so every trap from
+    a device is handled by the same worker in the order received (e.g. a
+    linkDown is never stored after the linkUp that followed it).
+
+    Positional arguments:
+    workers  : int : Worker threads processing queued traps.
+    max_size : int : Traps the queue holds, split evenly across the workers.
+    overflow : str : DROP_OLDEST or DROP_NEWEST.
+
+    Methods:
+    start  : Start the worker threads.
+    submit : Queue a received trap.
+    stats  : Return queue depth, drop and latency counters.
+    """
+    def __init__(self, workers: int, max_size: int, overflow: str):
+        if overflow not in (DROP_OLDEST, DROP_NEWEST):
+            raise InvalidInput(f"Trap queue overflow policy must be '{DROP_OLDEST}' or '{DROP_NEWEST}', not '{overflow}'.")
+        self._workers = max(1, workers)
+        self._max_size = max(self._workers, max_size)
+        self._shard_size = self._max_size // self._workers
+        self._overflow = overflow
+        self._queues = [deque() for _ in range(self._workers)]
+        self._conditions = [Condition() for _ in range(self._workers)]
+        self._lock = Lock()
+        self._handler = None
+        self._threads = []
+        self._enqueued = 0
+        self._dropped = 0
+        self._processed = 0
+        self._errors = 0
+        self._max_depth = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def start(self, handler: Callable):
+        """
+        Starts the worker threads, each calling handler(peer_address, var_binds)
+        for queued traps.
+        """
+        with self._lock:
+            if self._threads:
+                return
+            self._handler = handler
+            self._threads = [
+                Thread(target=self._work, args=(index,), name=f"TrapWorker-{index}", daemon=True)
+                for index in range(self._workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Running {self._workers} trap worker(s)...")
+
+    def submit(self, peer_address: str, var_binds: list) -> bool:
+        """
+        Queues a received trap. Never blocks.
+
+        Returns:
+        False if the trap was dropped (queue full under DROP_NEWEST). True otherwise.
+        """
+        item = (peer_address, var_binds, monotonic())
+        shard = hash(peer_address) % self._workers
+        queue, condition = self._queues[shard], self._conditions[shard]
+        with condition:
+            if len(queue) >= self._shard_size:
+                self._dropped += 1
+                if self._overflow == DROP_NEWEST:
+                    return False
+                queue.popleft()
+            queue.append(item)
+            self._enqueued += 1
+            self._max_depth = max(self._max_depth, len(queue))
+            condition.notify()
+        return True
+
+    def _work(self, shard: int):
+        queue, condition = self._queues[shard], self._conditions[shard]
+        while True:
+            with condition:
+                while not queue:
+                    condition.wait()
+                peer_address, var_binds, received = queue.popleft()
+
+            try:
+                self._handler(peer_address, var_binds)
+            except Exception as e:
+                logger.error(f"[TrapPipeline] Error processing trap from {peer_address}: {e}")
+                error = True
+            else:
+                error = False
+
+            # Latency covers time queued as well as time processing.
+            latency = monotonic() - received
+            with self._lock:
+                self._processed += 1
+                self._errors += error
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+
+    def stats(self) -> dict:
+        """
+        Returns a dictionary of queue counters. MaxDepth is the deepest any
+        worker's shard has been. Latencies are in milliseconds.
+        """
+        with self._lock:
+            return dict(
+                Workers=len(self._threads),
+                Depth=sum(len(queue) for queue in self._queues),
+                MaxDepth=self._max_depth,
+                MaxSize=self._max_size,
+                Overflow=self._overflow,
+                Enqueued=self._enqueued,
+                Dropped=self._dropped,
+                Processed=self._processed,
+                Errors=self._errors,
+                LatencyAvgMs=round(self._latency_total / self._processed * 1000, 3) if self._processed else 0.0,
+                LatencyMaxMs=round(self._latency_max * 1000, 3),
+            )
+
+trap_pipeline = TrapPipeline(
+    workers = settings.snmp_trap_workers,
+    max_size = settings.snmp_trap_queue_size,
+    overflow = settings.snmp_trap_queue_overflow,
+)
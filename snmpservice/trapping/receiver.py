@@ -2,20 +2,148 @@ from snmpservice.utils.logger import logger
 from snmpservice.settings import settings
 from snmpservice.trapping.store import trap_datastore
 from snmpservice.trapping.parsers import get_parser_for_trap
+from snmpservice.trapping.oids import oid_labels
+from snmpservice.trapping.pipeline import trap_pipeline
+from snmpservice.trapping.suppression import trap_suppressor, SUPPRESSED, FLAPPING, DAMPED
+from snmpservice.utils.models.trapping import Trap
+from snmpservice.utils.metrics import traps_received, traps_parsed, traps_stored
+from snmpservice.utils.exceptions import *
 
-from pysnmp.smi import builder, view, rfc1902
+from pysnmp.smi import builder, view
 from pysnmp.entity import config
 from pysnmp.carrier.asyncore.dgram import udp
 from pysnmp.entity.rfc3413 import ntfrcv
 from pysnmp.hlapi import SnmpEngine
 
 from threading import Thread
+import socket
 
 # 
 # NOTE: For this to function correctly, you must 
 # pip3 install pysnmp-mibs
 #
 
+def parse_trap(peer_address: str, var_binds: list) -> Trap | None:
+    """
+    Translates and parses a received SNMP trap, unless the TrapSuppressor
+    drops it first (a storm from the source or interface, or a flapping
+    interface).
+
+    Positional arguments:
+    peer_address : str  : IP address the trap was received from.
+    var_binds    : list : Raw (name, value) varbinds of the notification.
+
+    Returns:
+    Trap if a parser handles the trap and parses it. None otherwise.
+    If the trap's interface just started flapping, the Trap's TrapData is
+    marked with Flapping=True and Flaps, the number of state changes.
+    Traps of a flapping interface are parsed but held by the TrapSuppressor
+    (None is returned), to store once it settles (see store_settled_traps).
+    """
+    trap = {}
+
+    # Translate numeric OIDs to human-friendly textual OIDs
+    for name, val in var_binds:
+        trap[oid_labels.label(name)] = oid_labels.label(val)
+    
+    trap_oid = trap.get("snmpTrapOID")
+    interface = trap.get("ifIndex", trap.get("ifName"))
+    verdict, flaps = trap_suppressor.check(peer_address, trap_oid, interface)
+    if verdict == SUPPRESSED:
+        return None
+
+    # Parse desired information from the trap, if applicable.
+    parser = get_parser_for_trap(trap_oid)
+    if not parser:
+        return None
+    parsed_trap = parser().parse(peer_address, trap)
+    if parsed_trap and verdict in (FLAPPING, DAMPED):
+        trap_suppressor.hold(peer_address, interface, parsed_trap)
+        if verdict == DAMPED:
+            return None
+        # The held trap is copied when settled, so this one can be marked.
+        parsed_trap = parsed_trap.copy(update={"TrapData": {**parsed_trap.TrapData, "Flapping": True, "Flaps": flaps}})
+    if parsed_trap:
+        traps_parsed.inc(parsed_trap.TrapName)
+    return parsed_trap
+
+def process_trap(peer_address: str, var_binds: list) -> bool | None:
+    """
+    Translates, parses and stores a received SNMP trap. Runs on the
+    TrapPipeline's worker threads.
+
+    Returns:
+    TrapDatastore.store_trap output if the trap was parsed. None otherwise.
+    """
+    parsed_trap_data = parse_trap(peer_address, var_binds)
+    if parsed_trap_data:
+        stored = trap_datastore.store_trap(peer_address, parsed_trap_data)
+        if stored:
+            traps_stored.inc(parsed_trap_data.TrapName)
+        return stored
+
+    # No data stored.
+    return None
+
+def store_settled_traps(*_):
+    """
+    Stores the last state of interfaces which stopped flapping (see
+    TrapSuppressor.sweep). Registered as a trap receiver dispatcher timer.
+    """
+    for peer_address, trap in trap_suppressor.sweep():
+        if trap_datastore.store_trap(peer_address, trap):
+            traps_stored.inc(trap.TrapName)
+
+def get_peer_address(snmp_engine: SnmpEngine) -> str:
+    """Pulls the sender's IP address of the notification being received from the execution context."""
+    exec_context = snmp_engine.observer.getExecutionContext('rfc3412.receiveMessage:request')
+    peer_address, _ = exec_context["transportAddress"]
+    return peer_address
+
+def create_trap_engine(ip: str, port: int, community: str, reuse_port: bool = False) -> SnmpEngine:
+    """
+    Creates an SnmpEngine listening on given ip/port for SNMP traps using
+    given community, and loads the MIB modules used to translate them.
+
+    Keyword arguments:
+    reuse_port : bool : Bind with SO_REUSEPORT, so several engines (in
+                        separate processes) can share the port, the kernel
+                        spreading traps between them. Default=False.
+
+    Raises:
+    InvalidInput : reuse_port is set but the platform lacks SO_REUSEPORT.
+    """
+    global mib_view_controller
+    snmp_engine = SnmpEngine()
+    
+    logger.info(f'Initialising TrapEngine with vars:\n'
+                f'| IP: {ip}\n| Port: {port}\n'
+                f'| Community: {community}\n'
+                f'| SNMP Engine ID: {id(snmp_engine)}')
+
+    logger.debug(f'[TrapEngine] MIB Modules: {settings.snmp_trap_mib_modules}')
+    mib_builder = builder.MibBuilder()
+    mib_view_controller = view.MibViewController(mib_builder)
+    mib_builder.loadModules(*settings.snmp_trap_mib_modules)
+    oid_labels.load(mib_view_controller, prewarm=settings.snmp_trap_oid_cache_prewarm)
+
+    # Setup UDP transport
+    sock = None
+    if reuse_port:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise InvalidInput("SO_REUSEPORT is not supported on this platform.")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, udp.UdpTransport.bufferSize)
+    config.addTransport(
+        snmp_engine,
+        udp.domainName + (1,),
+        udp.UdpTransport(sock=sock).openServerMode((ip, port))
+    )
+    
+    config.addV1System(snmp_engine, 'snmp-service', community)
+    return snmp_engine
+
 def dispatch_trap_receiver(*, ip: str, port: int, community: str):
     """
     Spawns a daemon thread listening on given ip/port for SNMP traps using given community.
@@ -34,36 +162,15 @@ def dispatch_trap_receiver(*, ip: str, port: int, community: str):
             var_binds, 
             callback_context:None
         ) -> None:
-        def numeric_to_lexical_oid(oid) -> str:
-            """
-            Attempts to translate OID to the human-friendly representation.
-            e.g. 1.3.6.1.2.1.1.2 -> sysObjectID
-            """
-            try:
-                return str(rfc1902.ObjectIdentity(oid).resolveWithMib(mib_view_controller).getLabel()[-1])
-            except Exception as e:
-                return str(oid)
-
-        """Callback function to process recieved SNMP trap notifications."""
-        trap = {}
-
-        # Pull sender's IP address from the execution context
-        exec_context = snmp_engine.observer.getExecutionContext('rfc3412.receiveMessage:request')
-        peer_address, _ = exec_context["transportAddress"]
-
-        logger.debug(f"Recieved SNMP notification from {peer_address}")
-        # Translate numeric OIDs to human-friendly textual OIDs
-        for name, val in var_binds:
-            trap[numeric_to_lexical_oid(name)] = numeric_to_lexical_oid(val)
-        
-        # Parse desired information from the trap, if applicable, and store it.
-        parser = get_parser_for_trap(trap.get("snmpTrapOID"))
-        if parser:
-            parsed_trap_data = parser().parse(peer_address, trap) 
-            if parsed_trap_data:
-                return trap_datastore.store_trap(peer_address, parsed_trap_data)
-
-        # No data stored.
+        """
+        Callback function to receive SNMP trap notifications. Processing is
+        left to the TrapPipeline's workers, so the dispatcher thread can get
+        back to reading the socket.
+        """
+        traps_received.inc()
+        peer_address = get_peer_address(snmp_engine)
+        if not trap_pipeline.submit(peer_address, var_binds):
+            logger.debug(f"Trap queue full. Dropped SNMP notification from {peer_address}")
         return None
 
     def _dispatch():
@@ -75,27 +182,8 @@ def dispatch_trap_receiver(*, ip: str, port: int, community: str):
         finally:
             snmp_engine.transportDispatcher.closeDispatcher()
 
-    global mib_view_controller
     global snmp_engine
-    snmp_engine = SnmpEngine()
-    
-    logger.info(f'Initialising TrapEngine with vars:\n'
-                f'| IP: {ip}\n| Port: {port}\n'
-                f'| Community: {community}\n'
-                f'| SNMP Engine ID: {id(snmp_engine)}')
-
-    logger.debug(f'[TrapEngine] MIB Modules: {settings.snmp_trap_mib_modules}')
-    mib_builder = builder.MibBuilder()
-    mib_view_controller = view.MibViewController(mib_builder)
-    mib_builder.loadModules(*settings.snmp_trap_mib_modules)
-
-
-    # Setup UDP transport
-    config.addTransport(
-        snmp_engine,
-        udp.domainName + (1,),
-        udp.UdpTransport().openServerMode((ip, port))
-    )
-    
-    config.addV1System(snmp_engine, 'snmp-service', community)
+    snmp_engine = create_trap_engine(ip, port, community)
+    snmp_engine.transportDispatcher.registerTimerCbFun(store_settled_traps, settings.snmp_trap_flap_sweep_interval)
+    trap_pipeline.start(process_trap)
     Thread(target=_dispatch, daemon=True).start()
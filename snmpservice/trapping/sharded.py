@@ -0,0 +1,168 @@
+from snmpservice.utils.logger import logger, setup_logger
+from snmpservice.utils.models.trapping import Trap
+from snmpservice.trapping.receiver import create_trap_engine, get_peer_address, parse_trap
+from snmpservice.trapping.store import trap_datastore
+from snmpservice.trapping.suppression import trap_suppressor
+from snmpservice.utils.metrics import traps_received, traps_parsed, traps_stored
+from snmpservice.settings import settings
+
+from pysnmp.entity.rfc3413 import ntfrcv
+from multiprocessing import get_context
+from multiprocessing.connection import Connection, wait
+from threading import Lock, Thread
+
+def _run_shard(index: int, ip: str, port: int, community: str, conn: Connection,
+               batch_size: int, flush_interval: float):
+    """
+    Entrypoint of a receiver shard process. Receives and parses traps on its
+    own SO_REUSEPORT socket and SnmpEngine, sending parsed traps to the
+    parent in batches of up to batch_size, at least every flush_interval seconds.
+    Each batch also carries the traps received and the shard's suppression
+    counts since the last (see TrapSuppressor.drain), so a batch may hold no traps.
+    The last state of interfaces which stopped flapping is sent as parsed traps.
+    """
+    setup_logger(loglevel=settings.log_level, filename=settings.log_filename)
+    trap_suppressor.track_deltas()
+    batch = []
+    received = 0
+
+    def _flush(*_):
+        nonlocal received
+        suppression = trap_suppressor.drain()
+        if batch or received or suppression:
+            conn.send((batch[:], received, suppression))
+            batch.clear()
+            received = 0
+
+    def _sweep(*_):
+        # Interfaces which stopped flapping: store their last state (see TrapSuppressor.sweep).
+        batch.extend((peer_address, trap.dict()) for peer_address, trap in trap_suppressor.sweep())
+
+    def _callback(snmp_engine, state_reference, context_engine_id, context_name, var_binds, callback_context):
+        nonlocal received
+        received += 1
+        peer_address = get_peer_address(snmp_engine)
+        try:
+            trap = parse_trap(peer_address, var_binds)
+        except Exception as e:
+            logger.error(f"[TrapShard-{index}] Error processing trap from {peer_address}: {e}")
+            return
+        if trap:
+            batch.append((peer_address, trap.dict()))
+            if len(batch) >= batch_size:
+                _flush()
+
+    snmp_engine = create_trap_engine(ip, port, community, reuse_port=True)
+    dispatcher = snmp_engine.transportDispatcher
+    dispatcher.setTimerResolution(flush_interval)
+    dispatcher.registerTimerCbFun(_flush)
+    dispatcher.registerTimerCbFun(_sweep, settings.snmp_trap_flap_sweep_interval)
+    try:
+        logger.info(f"Running trap receiver shard {index}...")
+        ntfrcv.NotificationReceiver(snmp_engine, _callback)
+        dispatcher.jobStarted(1)
+        dispatcher.runDispatcher()
+    finally:
+        dispatcher.closeDispatcher()
+        conn.close()
+
+class ShardedTrapReceiver:
+    """
+    Object running several trap receivers in separate processes, all bound
+    to the same ip/port with SO_REUSEPORT, so that trap ingest is spread
+    across cores by the kernel rather than capped by one thread under the GIL.
+
+    Each shard process has its own SnmpEngine, and does the OID translation
+    and parsing itself. Parsed traps are pickled and sent back in batches
+    over a one-way multiprocessing pipe (an os.pipe() on POSIX, not a
+    socket), and stored in the shared TrapDatastore by a collector thread
+    in this process, which also adds the shards' suppression counts to
+    this process's TrapSuppressor. The kernel picks a shard by hashing the
+    sender's address, so traps from one device keep their order.
+
+    Positional arguments:
+    shards         : int   : Receiver processes.
+    batch_size     : int   : Parsed traps a shard sends per message.
+    flush_interval : float : Longest a shard holds a part-filled batch, in seconds.
+
+    Methods:
+    start : Start the shard processes and the collector thread.
+    stats : Return shard and IPC counters.
+    """
+    def __init__(self, shards: int, batch_size: int, flush_interval: float):
+        self._shards = max(1, shards)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(0.01, flush_interval) # Finest resolution pysnmp's dispatcher accepts.
+        self._processes = []
+        self._lock = Lock()
+        self._batches = 0
+        self._received = 0
+        self._traps = 0
+        self._stored = 0
+
+    def start(self, *, ip: str, port: int, community: str):
+        """Starts the shard processes listening on ip/port, and the collector thread."""
+        if self._processes:
+            return
+        # Spawn rather than fork: this process already runs threads.
+        context = get_context("spawn")
+        connections = {} # Pipe -> shard index
+        for index in range(self._shards):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_run_shard, name=f"TrapShard-{index}", daemon=True,
+                args=(index, ip, port, community, sender, self._batch_size, self._flush_interval)
+            )
+            process.start()
+            sender.close()
+            self._processes.append(process)
+            connections[receiver] = index
+        logger.info(f"Started {self._shards} trap receiver shard(s) on {ip}:{port}.")
+        Thread(target=self._collect, args=(connections,), name="TrapShardCollector", daemon=True).start()
+
+    def _collect(self, connections: dict):
+        while connections:
+            for conn in wait(list(connections)):
+                try:
+                    batch, received, suppression = conn.recv()
+                except (EOFError, OSError):
+                    logger.critical("[ShardedTrapReceiver] A trap receiver shard exited.")
+                    del connections[conn]
+                    continue
+                if received:
+                    traps_received.inc(amount=received)
+                    with self._lock:
+                        self._received += received
+                if suppression:
+                    trap_suppressor.merge(connections[conn], *suppression)
+                if not batch:
+                    continue
+                stored = 0
+                for peer_address, trap in batch:
+                    # Already validated by the shard's parser.
+                    traps_parsed.inc(trap["TrapName"])
+                    if trap_datastore.store_trap(peer_address, Trap.construct(**trap)):
+                        traps_stored.inc(trap["TrapName"])
+                        stored += 1
+                with self._lock:
+                    self._batches += 1
+                    self._traps += len(batch)
+                    self._stored += stored
+
+    def stats(self) -> dict:
+        """Returns a dictionary of shard and IPC counters."""
+        with self._lock:
+            return dict(
+                Shards=len(self._processes),
+                Alive=sum(process.is_alive() for process in self._processes),
+                Batches=self._batches,
+                Received=self._received,
+                Traps=self._traps,
+                Stored=self._stored
+            )
+
+sharded_trap_receiver = ShardedTrapReceiver(
+    shards = settings.snmp_trap_shards,
+    batch_size = settings.snmp_trap_shard_batch_size,
+    flush_interval = settings.snmp_trap_shard_flush_interval,
+)
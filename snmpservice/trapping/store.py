@@ -1,23 +1,117 @@
 from snmpservice.utils.exceptions import NoSNMPTrapSubscription
 from snmpservice.utils.models.trapping import Trap
 from snmpservice.utils.logger import logger
+from snmpservice.utils.helpers import timestamp
+from snmpservice.trapping.journal import TrapJournal, SUBSCRIBE, UNSUBSCRIBE, TRAP
+from snmpservice.settings import settings
+from collections import OrderedDict
+from itertools import chain
+from bisect import bisect_right
 from threading import Lock
+from typing import List
+import json
+
+class TrapSequenceIndex:
+    """
+    Index of a device's stored traps by Sequence, answering "traps newer
+    than sequence N" with a binary search rather than a scan.
+
+    Sequences are only ever appended in increasing order. Removed sequences
+    are dropped from the lookup dict straight away, and from the sorted list
+    once they make up half of it, keeping removal O(1) amortised.
+    """
+    def __init__(self):
+        self._sequences = [] # Sorted. May hold removed sequences.
+        self._traps = {} # Live sequence -> Trap
+
+    def add(self, trap: Trap):
+        self._sequences.append(trap.Sequence)
+        self._traps[trap.Sequence] = trap
+
+    def remove(self, trap: Trap):
+        self._traps.pop(trap.Sequence, None)
+        if len(self._sequences) > 2 * len(self._traps) + 32:
+            self._sequences = [sequence for sequence in self._sequences if sequence in self._traps]
+
+    def since(self, sequence: int, limit: int | None = None) -> List[Trap]:
+        """Returns traps with a Sequence greater than sequence, oldest first, up to limit."""
+        traps = []
+        for index in range(bisect_right(self._sequences, sequence), len(self._sequences)):
+            trap = self._traps.get(self._sequences[index])
+            if trap is not None:
+                traps.append(trap)
+                if limit is not None and len(traps) >= limit:
+                    break
+        return traps
 
 class TrapDatastore:
     """
     Object representing a dictionary datastore for storing and accessing 
     SNMP traps in a shared memory space.
 
+    Each subscribed device holds its traps in an insertion-ordered dict keyed
+    on TrapId, so storing or replacing a trap is O(1). A replaced trap moves
+    to the end, as the device's most recent. Every stored (or replaced) trap
+    is given the next Sequence number from a store-wide counter, and indexed
+    by it so clients can fetch only the traps newer than one they have seen.
+    Retention is bounded by:
+    - max_per_device : a device's oldest traps are evicted beyond this count,
+    - max_age        : traps older than this many seconds are evicted,
+    - max_traps      : a ceiling on traps held across every device, beyond
+                       which the oldest traps of any device are evicted.
+
+    The store lives in memory. Opening a TrapJournal restores subscriptions
+    and traps from its log, then records every change to it, so they
+    survive a restart.
+
+    Positional arguments:
+    max_per_device : int   : Traps held per device. 0 = unbounded.
+    max_age        : float : Seconds a trap is held for. 0 = forever.
+    max_traps      : int   : Traps held across all devices. 0 = unbounded.
+
     Methods:
     create_subscription : Create SNMP trap subscription for device.
     check_subscription  : Checks whether a device has an SNMP trap subscription.
     delete_subscription : Deletes SNMP trap subscription for device.
     get_traps           : Get all stored SNMP traps for a given device.
     store_trap          : Store an SNMP trap for a given device.
+    add_listener        : Register a callback for every stored trap.
+    open_journal        : Restore the store from a TrapJournal, and persist changes to it.
+    close_journal       : Write pending changes to the journal and stop persisting.
+    stats               : Return store and eviction counters.
     """
-    def __init__(self):
-        self._data = {}
+    def __init__(self, max_per_device: int = 0, max_age: float = 0, max_traps: int = 0):
+        self._data = {} # ip -> OrderedDict(TrapId -> Trap)
+        self._indexes = {} # ip -> TrapSequenceIndex
+        self._sequence = 0
+        self._order = OrderedDict() # (ip, TrapId) -> None, oldest first across every device.
         self._lock = Lock()
+        self._listeners = []
+        self._journal = None
+        self._max_per_device = max_per_device
+        self._max_age = max_age
+        self._max_traps = max_traps
+        self._evicted_capacity = 0
+        self._evicted_expired = 0
+        self._evicted_ceiling = 0
+
+    def _evict(self, ip: str, trap_id: str):
+        # Removes a trap from the device's traps, its index and the global order. Must be called with self._lock held.
+        trap = self._data[ip].pop(trap_id, None)
+        if trap is not None:
+            self._indexes[ip].remove(trap)
+        self._order.pop((ip, trap_id), None)
+
+    def _expire(self, now: int):
+        # Evicts expired traps, oldest first. Must be called with self._lock held.
+        if not self._max_age:
+            return
+        while self._order:
+            ip, trap_id = next(iter(self._order))
+            if now - self._data[ip][trap_id].Timestamp <= self._max_age:
+                break
+            self._evict(ip, trap_id)
+            self._evicted_expired += 1
     
     async def create_subscription(self, ip:str) -> bool:
         """
@@ -35,7 +129,10 @@ class TrapDatastore:
             # Create a lock on the data to prevent race conditions.
             with self._lock:
                 logger.debug(f"Creating subscription for {ip}.")
-                self._data[str(ip)] = []
+                self._data[str(ip)] = OrderedDict()
+                self._indexes[str(ip)] = TrapSequenceIndex()
+                if self._journal:
+                    self._journal.append(SUBSCRIBE, str(ip))
             return True
         return False
     
@@ -58,20 +155,27 @@ class TrapDatastore:
             # Create a lock on the data to prevent race conditions.
             with self._lock:
                 logger.debug(f"Deleting subscription for {ip}.")
-                self._data.pop(str(ip))
+                for trap_id in self._data.pop(str(ip)):
+                    self._order.pop((str(ip), trap_id), None)
+                self._indexes.pop(str(ip), None)
+                if self._journal:
+                    self._journal.append(UNSUBSCRIBE, str(ip))
             return True
         return False
 
-    async def get_traps(self, device_id:str) -> dict | None:
+    async def get_traps(self, device_id:str, since: int = 0, limit: int | None = None) -> List[Trap] | None:
         """
         Retrieves stored SNMP traps for device with device_id.
 
         Positional arguments:
         device_id : str : ID for device.
 
+        Keyword arguments:
+        since : int : Only return traps with a greater Sequence. Default=0 (all).
+        limit : int : Return at most this many traps. Default=None (no limit).
+
         Returns:
-        traps : dict : Dictionary of all stored traps for device_id.
-                       Key = trap names, Values = trap data.
+        traps : list : Stored traps for device_id, oldest (lowest Sequence) first.
         OR
         None if no device subscription created.
 
@@ -83,9 +187,14 @@ class TrapDatastore:
             raise NoSNMPTrapSubscription()
         # Create a lock on the data to prevent race conditions.
         with self._lock:
+            self._expire(timestamp())
             # Retrieve traps for device, if any.
-            traps = self._data.get(str(device_id), False)
-        return traps
+            traps = self._data.get(str(device_id))
+            if traps is None:
+                return False
+            if not since and limit is None:
+                return list(traps.values())
+            return self._indexes[str(device_id)].since(since, limit)
     
     def store_trap(self, ip: str, new_trap: Trap) -> bool:
         """
@@ -99,15 +208,115 @@ class TrapDatastore:
         true if the trap is stored. false if no device subscription active.
         """
         logger.debug(f"Adding trap {new_trap} to datastore for device {ip}.")
-        if ip in self._data:
-            for index, trap in enumerate(self._data[ip]):
-                if new_trap.TrapId == trap.TrapId:
-                    with self._lock:
-                        self._data[ip][index] = new_trap
-                        return True
-            with self._lock:
-                self._data[ip].append(new_trap)
-                return True
-        return False
+        with self._lock:
+            traps = self._data.get(ip)
+            if traps is None:
+                return False
+
+            self._sequence += 1
+            new_trap.Sequence = self._sequence
+            self._put(ip, traps, new_trap)
+            if self._journal:
+                self._journal.append(TRAP, ip, new_trap.json().encode())
+
+        # Notify listeners outside the lock, so they cannot stall other writers.
+        for listener in self._listeners:
+            try:
+                listener(ip, new_trap)
+            except Exception as e:
+                logger.error(f"Trap datastore listener {listener} raised error {e}")
+        return True
+
+    def _put(self, ip: str, traps: OrderedDict, trap: Trap):
+        # Stores, or replaces, a trap as the device's (and the store's) newest,
+        # then enforces retention. Must be called with self._lock held.
+        key = (ip, trap.TrapId)
+        index = self._indexes[ip]
+        replaced = traps.get(trap.TrapId)
+        if replaced is not None:
+            index.remove(replaced)
+        index.add(trap)
+        traps[trap.TrapId] = trap
+        traps.move_to_end(trap.TrapId)
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+        self._expire(timestamp())
+        while self._max_per_device and len(traps) > self._max_per_device:
+            self._evict(ip, next(iter(traps)))
+            self._evicted_capacity += 1
+        while self._max_traps and len(self._order) > self._max_traps:
+            self._evict(*next(iter(self._order)))
+            self._evicted_ceiling += 1
+
+    def _replay(self, kind: bytes, ip: str, payload: bytes):
+        # Applies a journal record. Called with self._lock held.
+        if kind == SUBSCRIBE:
+            self._data.setdefault(ip, OrderedDict())
+            self._indexes.setdefault(ip, TrapSequenceIndex())
+        elif kind == UNSUBSCRIBE:
+            for trap_id in self._data.pop(ip, ()):
+                self._order.pop((ip, trap_id), None)
+            self._indexes.pop(ip, None)
+        elif kind == TRAP and ip in self._data:
+            # Written by this store, so already validated.
+            trap = Trap.construct(**json.loads(payload))
+            self._sequence = max(self._sequence, trap.Sequence)
+            self._put(ip, self._data[ip], trap)
+
+    def _snapshot(self):
+        # Returns journal records recreating the store, taken atomically with
+        # respect to writers. Serialized lazily, after the lock is released:
+        # stored traps are never modified.
+        with self._lock:
+            self._expire(timestamp())
+            subscriptions = list(self._data)
+            traps = [(ip, self._data[ip][trap_id]) for ip, trap_id in self._order]
+            self._journal.cut()
+        return chain(
+            ((SUBSCRIBE, ip, b"") for ip in subscriptions),
+            ((TRAP, ip, trap.json().encode()) for ip, trap in traps),
+        )
+
+    def open_journal(self, journal: TrapJournal):
+        """
+        Restores subscriptions and traps from journal's log, then records
+        every change to it. Must be called before traps are received.
+        """
+        with self._lock:
+            journal.replay(self._replay)
+            self._journal = journal
+        journal.start(self._snapshot, lambda: len(self._order))
+        logger.info(f"Restored {len(self._order)} trap(s) for {len(self._data)} subscription(s) from {journal.path}.")
+
+    def close_journal(self):
+        """Writes pending changes to the journal, and stops recording them."""
+        with self._lock:
+            journal, self._journal = self._journal, None
+        if journal:
+            journal.close()
+
+    def add_listener(self, listener):
+        """
+        Registers listener(ip, trap) to be called with every stored trap, on
+        the thread storing it. Listeners must return quickly.
+        """
+        self._listeners.append(listener)
+
+    def stats(self) -> dict:
+        """Returns a dictionary of store and eviction counters."""
+        with self._lock:
+            return dict(
+                Devices=len(self._data),
+                Traps=len(self._order),
+                Sequence=self._sequence,
+                EvictedCapacity=self._evicted_capacity,
+                EvictedExpired=self._evicted_expired,
+                EvictedCeiling=self._evicted_ceiling
+            )
 
-trap_datastore = TrapDatastore()
\ No newline at end of file
+trap_datastore = TrapDatastore(
+    max_per_device = settings.snmp_trap_store_max_per_device,
+    max_age = settings.snmp_trap_store_max_age,
+    max_traps = settings.snmp_trap_store_max_traps,
+)
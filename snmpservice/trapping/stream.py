@@ -0,0 +1,143 @@
+from snmpservice.trapping.store import trap_datastore
+from snmpservice.utils.models.trapping import Trap
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from collections import deque
+from threading import Lock
+from typing import List
+import asyncio
+
+# Subscription key receiving the traps of every device.
+WILDCARD = "*"
+
+class TrapSubscriber:
+    """
+    Object representing one streaming client: a bounded buffer of
+    serialized traps waiting to be sent, living on the client's event loop.
+
+    A client that lets 'max_buffered' traps pile up is a slow consumer. It is
+    closed (and its traps dropped) rather than allowed to hold memory.
+
+    Positional arguments:
+    key          : str                       : Device IP, or WILDCARD.
+    loop         : asyncio.AbstractEventLoop : Loop the client is served on.
+    max_buffered : int                       : Traps buffered before closing.
+    """
+    def __init__(self, key: str, loop: asyncio.AbstractEventLoop, max_buffered: int):
+        self.key = key
+        self.loop = loop
+        self.closed = False
+        self.overflowed = False
+        self._max_buffered = max_buffered
+        self._buffer = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, data: str):
+        """Buffers a serialized trap. Must be called on self.loop."""
+        if self.closed:
+            return
+        if len(self._buffer) >= self._max_buffered:
+            self.closed = self.overflowed = True
+            self._buffer.clear()
+        else:
+            self._buffer.append(data)
+        self._ready.set()
+
+    def close(self):
+        """Closes the subscriber, waking any pending next_batch. Must be called on self.loop."""
+        self.closed = True
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> List[str]:
+        """
+        Waits up to timeout seconds for traps, returning every buffered trap
+        (oldest first). Returns an empty list on timeout, or once closed.
+        """
+        if not self._buffer and not self.closed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = list(self._buffer)
+        self._buffer.clear()
+        return batch
+
+class TrapBroadcaster:
+    """
+    Object fanning out newly stored traps to streaming clients.
+
+    Registered as a TrapDatastore listener, so publish runs on whichever
+    thread stored the trap. It never waits on clients: each trap is
+    serialized once, then handed to each client event loop with a single
+    call_soon_threadsafe, where it is appended to the clients' buffers.
+
+    Positional arguments:
+    max_buffered : int : Traps buffered per client before it is disconnected.
+
+    Methods:
+    subscribe   : Create a subscriber for a device (or WILDCARD) on the running loop.
+    unsubscribe : Remove a subscriber.
+    publish     : Fan a stored trap out to its device's and WILDCARD subscribers.
+    stats       : Return subscriber counters.
+    """
+    def __init__(self, max_buffered: int):
+        self._max_buffered = max(1, max_buffered)
+        self._subscribers = {} # key -> set of TrapSubscriber
+        self._lock = Lock()
+        self._published = 0
+        self._disconnected = 0
+
+    def subscribe(self, key: str) -> TrapSubscriber:
+        """Creates a subscriber to traps of device 'key' (or WILDCARD), served on the running loop."""
+        subscriber = TrapSubscriber(key, asyncio.get_running_loop(), self._max_buffered)
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add(subscriber)
+        logger.debug(f"[TrapBroadcaster] New stream subscriber for {key}.")
+        return subscriber
+
+    def unsubscribe(self, subscriber: TrapSubscriber):
+        """Removes subscriber. Safe to call more than once."""
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.key)
+            if subscribers is not None and subscriber in subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(subscriber.key)
+                self._disconnected += subscriber.overflowed
+
+    def publish(self, ip: str, trap: Trap):
+        """Hands trap to every subscriber of ip and WILDCARD. Never blocks on clients."""
+        with self._lock:
+            subscribers = [*self._subscribers.get(ip, ()), *self._subscribers.get(WILDCARD, ())]
+            if not subscribers:
+                return
+            self._published += 1
+
+        data = trap.json()
+        by_loop = {}
+        for subscriber in subscribers:
+            by_loop.setdefault(subscriber.loop, []).append(subscriber)
+        for loop, loop_subscribers in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, loop_subscribers, data)
+            except RuntimeError:
+                pass # Loop closed. Its subscribers are gone.
+
+    @staticmethod
+    def _deliver(subscribers: List[TrapSubscriber], data: str):
+        for subscriber in subscribers:
+            subscriber.push(data)
+
+    def stats(self) -> dict:
+        """Returns a dictionary of subscriber counters."""
+        with self._lock:
+            return dict(
+                Subscribers=sum(len(subscribers) for subscribers in self._subscribers.values()),
+                Published=self._published,
+                SlowConsumersDisconnected=self._disconnected
+            )
+
+trap_broadcaster = TrapBroadcaster(max_buffered = settings.snmp_trap_stream_buffer)
+trap_datastore.add_listener(trap_broadcaster.publish)
@@ -0,0 +1,321 @@
+from snmpservice.utils.logger import logger
+from snmpservice.settings import settings
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, List, Tuple
+
+# TrapSuppressor.check verdicts.
+PASS = "pass" # Parse and store the trap.
+SUPPRESSED = "suppressed" # Drop the trap before parsing.
+FLAPPING = "flapping" # Interface just started flapping: store the trap, marked as such, then suppress.
+DAMPED = "damped" # Interface is flapping: drop the trap, but parse it and hold it, so its state is stored once settled.
+
+class TokenBucket:
+    """Token bucket holding up to 'burst' tokens, refilled at 'rate' tokens a second."""
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> bool:
+        """Takes a token if there is one. Returns False if the bucket is empty."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class FlapState:
+    """Flap damping state of one interface, as in BGP route flap damping (RFC 2439)."""
+    __slots__ = ("penalty", "updated", "state", "flaps", "damped", "held")
+
+    def __init__(self, state: str, now: float):
+        self.penalty = 0.0
+        self.updated = now
+        self.state = state
+        self.flaps = 0
+        self.damped = False
+        self.held = None # Last parsed trap while damped, stored once the interface settles.
+
+class TrapSuppressor:
+    """
+    Object protecting the trap ingest path during trap storms, by deciding
+    which received traps are dropped before they are parsed and stored.
+
+    - Flap damping: every change of an interface's state (e.g. linkUp after
+      linkDown) adds 'flap_penalty' to the interface's penalty, which decays
+      exponentially with 'flap_half_life'. Once the penalty exceeds
+      'flap_suppress', the interface is flapping: the trap is stored once,
+      marked Flapping, replacing the interface's state, and its traps are
+      suppressed until the penalty decays below 'flap_reuse'. The penalty is
+      capped so that damping lasts at most 'flap_max_suppress' seconds
+      after the flapping stops. Suppressed traps of a flapping interface are
+      still parsed, and the last one held (hold): once the interface has
+      settled, sweep returns it, marked Flapping=False, to store as the
+      interface's final state.
+    - Rate limits: a token bucket per source address, then per source
+      interface, each with a sustained rate (traps/s) and a burst.
+
+    Traps without an interface (no ifIndex or ifName varbind) are only rate
+    limited per source. Damping applies to the traps in 'flap_traps'. With
+    sharded receivers, each shard process suppresses the traps it receives
+    (every source lands on one shard), and sends the counts since its last
+    batch (drain) to the parent process, which adds them to its own (merge).
+
+    Positional arguments:
+    source_rate       : float : Traps/s sustained per source. 0 = unlimited.
+    source_burst      : int   : Traps a source may send at once.
+    interface_rate    : float : Traps/s sustained per interface. 0 = unlimited.
+    interface_burst   : int   : Traps an interface may send at once.
+    flap_traps        : tuple : Trap names or OIDs signalling an interface state.
+    flap_penalty      : float : Penalty added per state change. 0 = no damping.
+    flap_suppress     : float : Penalty beyond which an interface is flapping.
+    flap_reuse        : float : Penalty below which it stops flapping.
+    flap_half_life    : float : Seconds for a penalty to halve.
+    flap_max_suppress : float : Longest an interface stays damped once stable, in seconds.
+    max_keys          : int   : Sources and interfaces tracked (LRU evicted).
+
+    Methods:
+    check        : Decide whether a received trap is suppressed.
+    hold         : Hold the last parsed trap of a flapping interface.
+    sweep        : Return the held traps of interfaces which stopped flapping.
+    stats        : Return suppression counters, overall or per source.
+    track_deltas : Keep the counts since the last drain.
+    drain        : Return and reset the counts since the last drain.
+    merge        : Add counts drained by another process.
+    """
+    def __init__(self, source_rate: float, source_burst: int, interface_rate: float, interface_burst: int,
+                 flap_traps: tuple, flap_penalty: float, flap_suppress: float, flap_reuse: float,
+                 flap_half_life: float, flap_max_suppress: float, max_keys: int):
+        self._source_rate = source_rate
+        self._source_burst = max(1, source_burst)
+        self._interface_rate = interface_rate
+        self._interface_burst = max(1, interface_burst)
+        self._flap_traps = frozenset(flap_traps)
+        self._flap_penalty = flap_penalty
+        self._flap_suppress = flap_suppress
+        self._flap_reuse = flap_reuse
+        self._flap_half_life = max(0.001, flap_half_life)
+        # A penalty any higher would take over flap_max_suppress to decay to flap_reuse.
+        self._flap_ceiling = flap_reuse * 2 ** (flap_max_suppress / self._flap_half_life)
+        self._max_keys = max(1, max_keys)
+        self._buckets = OrderedDict() # source, or (source, interface) -> TokenBucket
+        self._flaps = OrderedDict() # (source, interface) -> FlapState
+        self._damped = {} # (source, interface) -> FlapState, of flapping interfaces.
+        self._suppressed = OrderedDict() # source -> {reason: count}
+        self._lock = Lock()
+        self._passed = 0
+        self._counts = {"Source": 0, "Interface": 0, "Flapping": 0}
+        self._deltas = None # source -> {reason: count} since the last drain, if tracked.
+        self._passed_delta = 0
+        self._remote_flapping = {} # Process key -> flapping interfaces, from merge.
+
+    def _lru(self, entries: OrderedDict, key, factory):
+        # Returns entries[key], creating it with factory() if missing. Must be called with self._lock held.
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = factory()
+            if len(entries) > self._max_keys:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+        return entry
+
+    def _suppress(self, source: str, reason: str) -> Tuple[str, int]:
+        # Counts a suppressed trap. Must be called with self._lock held.
+        self._counts[reason] += 1
+        counts = self._lru(self._suppressed, source, dict)
+        counts[reason] = counts.get(reason, 0) + 1
+        if self._deltas is not None:
+            counts = self._deltas.setdefault(source, {})
+            counts[reason] = counts.get(reason, 0) + 1
+        return SUPPRESSED, 0
+
+    def _damp(self, source: str, interface: str, trap: str, now: float) -> str | None:
+        # Applies flap damping. Returns a verdict, or None to continue. Must be called with self._lock held.
+        flap = self._lru(self._flaps, (source, interface), lambda: FlapState(trap, now))
+        flap.penalty *= 2 ** ((flap.updated - now) / self._flap_half_life)
+        flap.updated = now
+        if flap.damped and flap.penalty < self._flap_reuse:
+            # Settled before a sweep noticed: this trap is stored instead of the held one.
+            self._undamp((source, interface), flap)
+
+        if trap != flap.state:
+            flap.state = trap
+            flap.flaps += 1
+            flap.penalty = min(flap.penalty + self._flap_penalty, self._flap_ceiling)
+            if not flap.damped and flap.penalty > self._flap_suppress:
+                flap.damped = True
+                self._damped[(source, interface)] = flap
+                logger.info(f"[TrapSuppressor] Interface {interface} of {source} is flapping. Suppressing its traps.")
+                return FLAPPING
+        return DAMPED if flap.damped else None
+
+    def _undamp(self, key: tuple, flap: FlapState) -> Tuple[Any, int]:
+        # Ends an interface's flapping, returning its held trap and flaps. Must be called with self._lock held.
+        held, flaps = flap.held, flap.flaps
+        flap.damped, flap.held, flap.flaps = False, None, 0
+        self._damped.pop(key, None)
+        logger.info(f"[TrapSuppressor] Interface {key[1]} of {key[0]} stopped flapping.")
+        return held, flaps
+
+    def check(self, source: str, trap: str | None, interface: str | None = None) -> Tuple[str, int]:
+        """
+        Decides whether a received trap is parsed and stored.
+
+        Positional arguments:
+        source    : str : Address the trap was received from.
+        trap      : str : The trap's snmpTrapOID, as a name or numeric OID.
+        interface : str : ifIndex or ifName the trap concerns, if any.
+
+        Returns:
+        (verdict, flaps) : verdict is PASS, SUPPRESSED, FLAPPING or DAMPED. flaps
+                           is the interface's state changes while FLAPPING, else 0.
+                           FLAPPING and DAMPED traps are to be passed to hold once parsed.
+        """
+        now = monotonic()
+        with self._lock:
+            if interface is not None and self._flap_penalty and trap in self._flap_traps:
+                verdict = self._damp(source, str(interface), trap, now)
+                if verdict == FLAPPING:
+                    self._passed += 1
+                    self._passed_delta += 1
+                    return FLAPPING, self._flaps[(source, str(interface))].flaps
+                if verdict == DAMPED:
+                    self._suppress(source, "Flapping")
+                    return DAMPED, 0
+
+            if self._source_rate and not self._lru(
+                self._buckets, source, lambda: TokenBucket(self._source_burst, now)
+            ).take(self._source_rate, self._source_burst, now):
+                return self._suppress(source, "Source")
+
+            if interface is not None and self._interface_rate and not self._lru(
+                self._buckets, (source, str(interface)), lambda: TokenBucket(self._interface_burst, now)
+            ).take(self._interface_rate, self._interface_burst, now):
+                return self._suppress(source, "Interface")
+
+            self._passed += 1
+            self._passed_delta += 1
+            return PASS, 0
+
+    def stats(self, source: str | None = None) -> dict:
+        """
+        Returns a dictionary of suppression counters. With source, returns
+        the traps suppressed from that source by reason (empty if none).
+        """
+        with self._lock:
+            if source is not None:
+                return dict(self._suppressed.get(source, {}))
+            return dict(
+                Passed=self._passed,
+                Suppressed=sum(self._counts.values()),
+                SuppressedBy=dict(self._counts),
+                FlappingInterfaces=self._flapping() + sum(self._remote_flapping.values()),
+            )
+
+    def _flapping(self) -> int:
+        # Must be called with self._lock held.
+        return len(self._damped)
+
+    def hold(self, source: str, interface: str, trap: Any):
+        """
+        Holds the parsed trap of a FLAPPING or DAMPED verdict as the
+        interface's last state, replacing any held before. Not copied: the
+        trap must not be changed afterwards.
+        """
+        with self._lock:
+            flap = self._damped.get((source, str(interface)))
+            if flap is not None:
+                flap.held = trap
+
+    def sweep(self) -> List[Tuple[str, Any]]:
+        """
+        Ends the flapping of interfaces whose penalty has decayed below
+        flap_reuse. To be called periodically, as no more traps may arrive
+        from an interface which settled.
+
+        Returns:
+        [(source, trap)] : The interfaces' held traps, copied with TrapData
+                           marked Flapping=False and Flaps, their state changes
+                           while flapping, to store as their final state.
+        """
+        now = monotonic()
+        settled = []
+        with self._lock:
+            for key, flap in list(self._damped.items()):
+                flap.penalty *= 2 ** ((flap.updated - now) / self._flap_half_life)
+                flap.updated = now
+                if flap.penalty >= self._flap_reuse:
+                    continue
+                if self._flaps.get(key) is not flap:
+                    # Evicted, and possibly tracked afresh since: its held trap may be stale.
+                    del self._damped[key]
+                    continue
+                held, flaps = self._undamp(key, flap)
+                if held is not None:
+                    settled.append((key[0], held.copy(update={"TrapData": {**held.TrapData, "Flapping": False, "Flaps": flaps}})))
+        return settled
+
+    def track_deltas(self):
+        """Starts keeping the counts since the last drain, as a trap receiver shard reports them."""
+        with self._lock:
+            if self._deltas is None:
+                self._deltas = {}
+                self._passed_delta = 0
+
+    def drain(self) -> Tuple[int, dict, int] | None:
+        """
+        Returns the counts since the last drain and resets them, if track_deltas
+        was called and any trap was checked since.
+
+        Returns:
+        (passed, suppressed, flapping) : traps passed, traps suppressed as
+                                         {source: {reason: count}}, and
+                                         interfaces flapping now.
+        OR
+        None if there is nothing to report.
+        """
+        with self._lock:
+            if self._deltas is None or not (self._passed_delta or self._deltas):
+                return None
+            drained = (self._passed_delta, self._deltas, self._flapping())
+            self._passed_delta, self._deltas = 0, {}
+            return drained
+
+    def merge(self, key, passed: int, suppressed: dict, flapping: int):
+        """
+        Adds counts drained by another process (e.g. a trap receiver shard).
+
+        Positional arguments:
+        key        : Any  : Identifies the process, whose flapping count replaces its previous one.
+        passed     : int  : Traps passed.
+        suppressed : dict : Traps suppressed, as {source: {reason: count}}.
+        flapping   : int  : Interfaces flapping now.
+        """
+        with self._lock:
+            self._passed += passed
+            for source, reasons in suppressed.items():
+                counts = self._lru(self._suppressed, source, dict)
+                for reason, count in reasons.items():
+                    self._counts[reason] += count
+                    counts[reason] = counts.get(reason, 0) + count
+            self._remote_flapping[key] = flapping
+
+trap_suppressor = TrapSuppressor(
+    source_rate = settings.snmp_trap_rate_source,
+    source_burst = settings.snmp_trap_rate_source_burst,
+    interface_rate = settings.snmp_trap_rate_interface,
+    interface_burst = settings.snmp_trap_rate_interface_burst,
+    flap_traps = settings.snmp_trap_flap_traps,
+    flap_penalty = settings.snmp_trap_flap_penalty,
+    flap_suppress = settings.snmp_trap_flap_suppress,
+    flap_reuse = settings.snmp_trap_flap_reuse,
+    flap_half_life = settings.snmp_trap_flap_half_life,
+    flap_max_suppress = settings.snmp_trap_flap_max_suppress,
+    max_keys = settings.snmp_trap_suppression_max_keys,
+)
@@ -57,4 +57,7 @@ class InvalidInput(BaseException):
     pass
 
 class InvalidInputType(InvalidInput):
-    pass
\ No newline at end of file
+    pass
+
+class MalformedPDU(BaseException):
+    pass
@@ -1,14 +1,20 @@
 from snmpservice.utils.exceptions import *
+from snmpservice.settings import settings
 
 from ipaddress import IPv4Address, AddressValueError
 from datetime import datetime
-from re import match
+from typing import Iterable
+import re
 
-DATA_INTF_REGEX = r"^(((gigabit|fast)ethernet|gi|fa)[0-9]+(/[0-9]+)+)|((ge|et|xe)-[0-9]+(/[0-9]+)+)$"
+def compile_patterns(patterns: Iterable[str]) -> re.Pattern:
+    """Compiles a set of regexes into one, case-insensitive, matched against whole strings with fullmatch."""
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+DATA_INTF_RGX = compile_patterns(settings.snmp_poll_data_interfaces)
 
 def is_data_intf(intf_name:str) -> bool:
-    """Is given intf_name a data interface? Matches against DATA_INTF_REGEX."""
-    return match(DATA_INTF_REGEX, str(intf_name).lower())
+    """Is given intf_name a data interface? Matches against settings.snmp_poll_data_interfaces."""
+    return intf_name is not None and DATA_INTF_RGX.fullmatch(str(intf_name)) is not None
 
 def is_ipv4_address(val: str) -> bool:
     """Is 'val' a valid IPv4 address?"""
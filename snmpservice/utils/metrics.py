@@ -0,0 +1,221 @@
+from pysnmp.proto.errind import RequestTimedOut
+from bisect import bisect_left
+from threading import Lock, local
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Default histogram buckets, in seconds: sub-millisecond parsing up to SNMP timeouts.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    """
+    Base of the metrics recorded by a MetricsRegistry.
+
+    Values are kept in a dict per recording thread, keyed on label values,
+    so recording an event takes no lock and never contends with other
+    threads. The dicts are merged when the registry is scraped.
+
+    Positional arguments:
+    name   : str   : Metric name, e.g. snmp_requests_total.
+    help   : str   : Description, exposed as # HELP.
+    labels : tuple : Label names. Label values are passed positionally when recording.
+    """
+    TYPE = None
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = local()
+        self._shards = [] # Every thread's dict of label values -> value.
+        self._lock = Lock()
+
+    def _shard(self) -> dict:
+        # Returns the calling thread's dict, registering it on the thread's first event.
+        # Recording methods inline the fast path.
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def _merged(self) -> Dict[tuple, object]:
+        # Sums every thread's values. Copying a dict's items is atomic under the GIL.
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                merged[labels] = self._add(merged.get(labels), value)
+        return merged
+
+    def _add(self, total, value):
+        return value if total is None else total + value
+
+    def samples(self) -> Iterable[str]:
+        """Yields the metric's exposition lines, without # HELP and # TYPE."""
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. of requests sent."""
+    TYPE = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        """Adds amount to the count for the given label values."""
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._shard()
+        values[labels] = values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._merged().items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, e.g. latencies, counted into buckets.
+
+    Keyword arguments:
+    buckets : tuple : Ascending bucket upper bounds. Default=LATENCY_BUCKETS.
+    """
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        """Records value for the given label values."""
+        try:
+            entry = self._local.values[labels]
+        except (AttributeError, KeyError):
+            # Count per bucket (non-cumulative), then above the last bucket, then the sum.
+            entry = self._shard().setdefault(labels, [0] * (len(self.buckets) + 2))
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def _add(self, total, value):
+        value = list(value)
+        return value if total is None else [a + b for a, b in zip(total, value)]
+
+    def samples(self) -> Iterable[str]:
+        for labels, entry in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), entry[:-1]):
+                cumulative += count
+                le = 'le="' + (bound if bound == "+Inf" else _format_value(bound)) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(entry[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+class Gauge(Metric):
+    """
+    Current value read when scraped, e.g. a store's size.
+
+    Positional arguments:
+    collect : Callable : Returns {label values tuple: value}, or a single value if there are no labels.
+    """
+    TYPE = "gauge"
+
+    def __init__(self, name: str, help: str, collect: Callable, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._collect = collect
+
+    def samples(self) -> Iterable[str]:
+        values = self._collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+class CollectedCounter(Gauge):
+    """Count read when scraped from a component's own counters, e.g. traps dropped."""
+    TYPE = "counter"
+
+class MetricsRegistry:
+    """
+    Object holding the service's metrics, and rendering them in the
+    Prometheus text exposition format.
+
+    Methods:
+    counter   : Create and register a Counter.
+    histogram : Create and register a Histogram.
+    gauge     : Create and register a Gauge.
+    collected : Create and register a CollectedCounter.
+    render    : Return every metric in the Prometheus text format.
+    """
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._lock = Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Metric {metric.name} is already registered.")
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, collect: Callable, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, collect, labels))
+
+    def collected(self, name: str, help: str, collect: Callable, labels: Tuple[str, ...] = ()) -> CollectedCounter:
+        return self._register(CollectedCounter(name, help, collect, labels))
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# Polling
+poll_object_duration = metrics.histogram(
+    "snmp_poll_object_duration_seconds", "Time taken to retrieve a poll object's data, by poll object.", ("object",))
+poll_strategy_duration = metrics.histogram(
+    "snmp_poll_strategy_duration_seconds", "Time taken to run a poll strategy against a device, by strategy.", ("strategy",))
+snmp_requests = metrics.counter(
+    "snmp_requests_total", "SNMP GET and GETBULK requests sent, by device.", ("device",))
+snmp_timeouts = metrics.counter(
+    "snmp_request_timeouts_total", "SNMP requests which timed out, by device.", ("device",))
+device_unreachable = metrics.counter(
+    "snmp_poll_device_unreachable_total", "Polls which failed as the device was unreachable, by device.", ("device",))
+
+def record_snmp_request(device: str, error_indication):
+    """Counts an SNMP request sent to device, and whether it timed out, from its error_indication."""
+    snmp_requests.inc(device)
+    if isinstance(error_indication, RequestTimedOut):
+        snmp_timeouts.inc(device)
+
+# Trapping
+traps_received = metrics.counter(
+    "snmp_traps_received_total", "SNMP notifications received by the trap receiver(s).")
+traps_parsed = metrics.counter(
+    "snmp_traps_parsed_total", "Received traps parsed, by parser TrapName.", ("parser",))
+traps_stored = metrics.counter(
+    "snmp_traps_stored_total", "Parsed traps stored for a subscribed device, by parser TrapName.", ("parser",))
@@ -10,3 +10,31 @@ class BaseStrategyModel(BaseModel):
     
     def __setitem__(self, attr, item):
         self.__dict__[attr] = item
+
+####### API Endpoint Response Models #######
+
+class ScheduledDeviceModel(BaseModel):
+    IpAddress: str
+    Port: int
+    Strategy: str
+    Interval: float
+    NextDue: int
+    LastPolled: int | None
+    ConsecutiveFailures: int
+    LastError: str | None
+
+class ScheduleResponse(BaseModel):
+    Timestamp: int
+    Devices: List[ScheduledDeviceModel] = []
+
+####### API Endpoint Request Models #######
+
+class BatchPollTarget(BaseModel):
+    IpAddress: str
+    Port: int | None = None
+    Community: str | None = None
+
+class BatchPollRequest(BaseModel):
+    Targets: List[BatchPollTarget]
+    Concurrency: int | None = None
+    Deadline: float | None = None
@@ -9,13 +9,25 @@ class Trap(BaseModel):
     Timestamp: int
     TrapName: str
     TrapData: dict
+    Sequence: int = 0 # Assigned by TrapDatastore when stored.
 
 ####### API Endpoint Response Models #######
 
 class GetTrapsResponse(BaseModel):
     Timestamp: int
     Traps: List[Trap] = []
+    Next: int # Pass as 'since' to fetch only traps stored after these.
     
+class TrapParserModel(BaseModel):
+    Trap: str
+    Parser: str
+    TrapName: str | None
+    Source: str
+
+class GetTrapParsersResponse(BaseModel):
+    Timestamp: int
+    Parsers: List[TrapParserModel] = []
+
 class SubscriptionResponse(BaseModel):
     IpAddress: str
     Timestamp: int
@@ -0,0 +1,97 @@
+from pydantic import BaseModel
+from fastapi.responses import Response
+from typing import Any, Mapping
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Fast response path: results assembled as plain dicts/lists (poll results,
+# stored traps) are serialized straight to bytes, with orjson if installed,
+# instead of being validated against the endpoint's response model and run
+# through jsonable_encoder first. Returning a Response from an endpoint
+# skips both; the response model still documents the payload.
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+def _default(obj: Any) -> Any:
+    # Encodes pydantic models met in content (e.g. stored Traps) as their fields,
+    # without copying them as BaseModel.dict() would. Nested models recurse here.
+    if isinstance(obj, BaseModel):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+def dumps(content: Any) -> bytes:
+    """Serializes content to compact UTF-8 JSON bytes, with orjson if installed."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """JSON response serialized with dumps(). Content may hold pydantic models."""
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class MsgPackResponse(Response):
+    """MessagePack response. Requires msgpack. Content may hold pydantic models."""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_default)
+
+def prefers_msgpack(accept: str | None) -> bool:
+    """
+    Does an Accept header rank MessagePack above JSON? Always False if
+    msgpack is not installed. Unranked or equally ranked types favour JSON.
+    """
+    if msgpack is None or not accept or "msgpack" not in accept:
+        return False
+    msgpack_q = json_q = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > json_q
+
+def fast_response(content: Any, accept: str | None = None, headers: Mapping[str, str] | None = None,
+                  status_code: int = 200) -> Response:
+    """
+    Returns content serialized as MessagePack if the Accept header prefers
+    it (and msgpack is installed), as JSON otherwise, with a Vary: Accept header.
+
+    Positional arguments:
+    content : Any : Dicts, lists, scalars and pydantic models.
+
+    Keyword arguments:
+    accept      : str  : Request's Accept header. Default=None, JSON.
+    headers     : dict : Response headers. Default=None.
+    status_code : int  : Default=200.
+    """
+    response_class = MsgPackResponse if prefers_msgpack(accept) else FastJSONResponse
+    response = response_class(content, status_code=status_code, headers=headers)
+    response.headers["Vary"] = "Accept"
+    return response